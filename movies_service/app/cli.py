@@ -0,0 +1,90 @@
+import argparse
+import sys
+from .database import SessionLocal, DEFAULT_CINEMA_ID, init_db, shard_for_cinema
+from .repositories.db_movie_repo import MovieRepo
+from .repositories.occupancy_writer import occupancy_writers
+from .repositories.shard_router import shard_router
+from .services.bulk_import import BulkImporter, IMPORT_KINDS, IMPORT_FORMATS, IMPORT_BATCH_SIZE
+from .services.sample_data import seed_sample_data
+
+
+def import_command(args) -> int:
+    fmt = args.format or ('csv' if args.path.endswith('.csv') else 'ndjson')
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.path == '-':
+            result = BulkImporter(MovieRepo(db), args.batch_size, shard_router).run(args.kind, fmt, sys.stdin)
+        else:
+            with open(args.path, encoding='utf-8', newline='') as feed:
+                result = BulkImporter(MovieRepo(db), args.batch_size, shard_router).run(args.kind, fmt, feed)
+    finally:
+        db.close()
+        _stop_writers()
+
+    print(result.model_dump_json(indent=2))
+    return 1 if result.failed else 0
+
+
+def _stop_writers():
+    for writer in occupancy_writers.values():
+        writer.stop()
+
+
+def _seed_shard(repo: MovieRepo) -> bool:
+    # Тестовые сеансы относятся к основному кинотеатру
+    seeded = seed_sample_data(repo, with_sessions=shard_for_cinema(DEFAULT_CINEMA_ID) == repo.shard)
+    # Витрину пересобираем и при уже заполненном каталоге: команда заодно чистит прошедшие сеансы
+    repo.refresh_now_showing()
+    return seeded
+
+
+def seed_command(args) -> int:
+    init_db()
+    try:
+        seeded = any(list(shard_router.fan_out(_seed_shard).values()))
+    finally:
+        _stop_writers()
+    print("Sample catalog seeded" if seeded else "Catalog is not empty, nothing to seed")
+    return 0
+
+
+def refresh_now_showing_command(args) -> int:
+    shard_router.fan_out(lambda repo: repo.refresh_now_showing())
+    print("now_showing refreshed")
+    return 0
+
+
+def rebuild_occupancy_command(args) -> int:
+    init_db()
+    rows = sum(shard_router.fan_out(lambda repo: repo.rebuild_occupancy()).values())
+    print(f"Occupancy rollups rebuilt: {rows} rows")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Служебные команды сервиса фильмов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Массовая загрузка фильмов или сеансов через COPY")
+    import_parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    import_parser.add_argument("path", help="Путь к NDJSON/CSV файлу или '-' для stdin")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    import_parser.set_defaults(handler=import_command)
+
+    seed_parser = commands.add_parser("seed", help="Заполнить пустой каталог тестовыми данными (повторный запуск безопасен)")
+    seed_parser.set_defaults(handler=seed_command)
+
+    refresh_parser = commands.add_parser("refresh-now-showing", help="Пересобрать витрину \"сейчас в прокате\"")
+    refresh_parser.set_defaults(handler=refresh_now_showing_command)
+
+    rebuild_parser = commands.add_parser("rebuild-occupancy", help="Пересчитать агрегаты заполняемости из сеансов и заказов")
+    rebuild_parser.set_defaults(handler=rebuild_occupancy_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
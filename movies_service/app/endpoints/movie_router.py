@@ -1,31 +1,208 @@
+import io
+import os
+from email.utils import format_datetime, parsedate_to_datetime
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, datetime, timezone
+from typing import Callable, List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from ..database import DEFAULT_CINEMA_ID
 from ..services.movie_service import MovieService
+from ..services.streaming import STREAM_MEDIA_TYPES
 from ..models.movie import (
-    MoviesListResponse, ScheduleListResponse, OrderRequest,
-    OrderResponse, ScheduleUpdateRequest, UpdateMovieRequest
+    Movie, Session, MoviesListResponse, MovieSearchResponse, ScheduleListResponse, OrderRequest,
+    OrderResponse, ScheduleUpdateRequest, UpdateMovieRequest,
+    SeatHoldRequest, SeatHoldResponse, ImportResult,
+    ScheduleGenerateRequest, ScheduleGenerateResponse, NowShowingResponse,
+    BatchLookupRequest, MoviesBatchResponse, SessionsBatchResponse,
+    Order, OrdersListResponse, PricingRule, CreatePricingRuleRequest,
+    SeatAvailabilityRequest, SeatAvailabilityResponse, SimilarMoviesResponse,
+    Hall, HallCapacityRequest, OccupancyReport, OccupancyDimension
 )
 
 movie_router = APIRouter(prefix='/movies', tags=['Movies'])
 
+# Карточка фильма меняется редко; сеансы и расписание несут остаток мест и всегда перепроверяются
+MOVIE_CACHE_CONTROL = os.getenv("MOVIE_CACHE_CONTROL", "public, max-age=60")
+SESSION_CACHE_CONTROL = os.getenv("SESSION_CACHE_CONTROL", "public, no-cache")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _http_date(value: datetime) -> str:
+    # В БД локальное время без зоны
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _not_modified(request: Request, etag: str, modified_at: datetime | None) -> bool:
+    # If-None-Match главнее: If-Modified-Since смотрим, только если его нет
+    if request.headers.get("if-none-match"):
+        return _etag_matches(request, etag)
+    header = request.headers.get("if-modified-since")
+    if not header or modified_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # В Last-Modified нет долей секунды
+    return modified_at.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def _cache_headers(etag: str, modified_at: datetime | None, cache_control: str) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if modified_at is not None:
+        headers["Last-Modified"] = _http_date(modified_at)
+    return headers
+
+
+def _cached_json(request: Request, render: Callable[[], BaseModel], etag: str, modified_at: datetime | None,
+                 cache_control: str) -> Response:
+    # Модель ответа собирается и сериализуется только для 200
+    headers = _cache_headers(etag, modified_at, cache_control)
+    if _not_modified(request, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+    return Response(content=render().model_dump_json(), media_type="application/json", headers=headers)
+
+
 @movie_router.get('/', response_model=MoviesListResponse)
 def get_all_movies(
+    request: Request,
     movie_service: MovieService = Depends(MovieService)
 ):
     try:
-        movies = movie_service.get_all_movies()
-        return MoviesListResponse(movies=movies)
+        body, etag = movie_service.get_catalog()
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
 @movie_router.get('/schedule', response_model=ScheduleListResponse)
 def get_schedule(
+    request: Request,
     movie_id: UUID = Query(None, description="ID фильма для фильтрации"),
+    date_from: datetime = Query(None, alias="from", description="Начало периода (включительно)"),
+    date_to: datetime = Query(None, alias="to", description="Конец периода (не включительно)"),
+    hall_name: str = Query(None, alias="hall", description="Название зала"),
+    cinema_id: str = Query(None, alias="cinema", description="ID кинотеатра; без него - все кинотеатры"),
+    cursor: str = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(100, ge=1, le=500),
     movie_service: MovieService = Depends(MovieService)
 ):
     try:
-        schedule = movie_service.get_movie_schedule(movie_id)
-        return ScheduleListResponse(schedule=schedule)
+        schedule, next_cursor = movie_service.get_schedule_page(
+            movie_id, date_from, date_to, hall_name, cursor, limit, cinema_id
+        )
+        etag, modified_at = movie_service.schedule_validators(schedule, next_cursor)
+        return _cached_json(
+            request, lambda: ScheduleListResponse(schedule=schedule, next_cursor=next_cursor),
+            etag, modified_at, SESSION_CACHE_CONTROL
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/export')
+def export_movies(
+    fmt: Literal['ndjson', 'json'] = Query('ndjson', alias="format"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    # Выгрузка всего каталога потоком, память не зависит от размера каталога
+    try:
+        return StreamingResponse(movie_service.stream_movies(fmt), media_type=STREAM_MEDIA_TYPES[fmt])
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/schedule/export')
+def export_schedule(
+    fmt: Literal['ndjson', 'json'] = Query('ndjson', alias="format"),
+    movie_id: UUID = Query(None, description="ID фильма для фильтрации"),
+    date_from: datetime = Query(None, alias="from", description="Начало периода (включительно)"),
+    date_to: datetime = Query(None, alias="to", description="Конец периода (не включительно)"),
+    hall_name: str = Query(None, alias="hall", description="Название зала"),
+    cinema_id: str = Query(None, alias="cinema", description="ID кинотеатра; без него - все кинотеатры"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return StreamingResponse(
+            movie_service.stream_schedule(fmt, movie_id, date_from, date_to, hall_name, cinema_id),
+            media_type=STREAM_MEDIA_TYPES[fmt]
+        )
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/now-showing', response_model=NowShowingResponse)
+def get_now_showing(
+    days: int = Query(7, ge=1, le=31, description="На сколько дней вперёд показывать сеансы"),
+    sessions_per_movie: int = Query(5, ge=1, le=50),
+    cinema_id: str = Query(None, alias="cinema", description="ID кинотеатра; без него - все кинотеатры"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return NowShowingResponse(movies=movie_service.get_now_showing(days, sessions_per_movie, cinema_id))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/search', response_model=MovieSearchResponse)
+def search_movies(
+    q: str = Query(None, max_length=200, description="Поиск по названию и описанию"),
+    genre: List[str] = Query(None, description="Жанры фильма"),
+    genre_match: str = Query("all", pattern="^(all|any)$", description="Все жанры или любой из них"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        movies, has_more = movie_service.search_movies(q, genre, genre_match == "all", page, page_size)
+        return MovieSearchResponse(movies=movies, page=page, page_size=page_size, has_more=has_more)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/batch', response_model=MoviesBatchResponse)
+def get_movies_batch(
+    request: BatchLookupRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        movies, missing = movie_service.get_movies_batch(request.ids)
+        return MoviesBatchResponse(movies=movies, missing=missing)
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/sessions/batch', response_model=SessionsBatchResponse)
+def get_sessions_batch(
+    request: BatchLookupRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        sessions, missing = movie_service.get_sessions_batch(request.ids)
+        return SessionsBatchResponse(sessions=sessions, missing=missing)
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/sessions/availability', response_model=SeatAvailabilityResponse)
+def get_seat_availability_batch(
+    request: SeatAvailabilityRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        seats, missing = movie_service.get_seat_availability_batch(request)
+        return SeatAvailabilityResponse(seats=seats, missing=missing)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
@@ -43,6 +220,65 @@ def create_order(
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
+@movie_router.post('/admin/schedule/generate', response_model=ScheduleGenerateResponse)
+def generate_schedule(
+    request: ScheduleGenerateRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.generate_schedule(request)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/orders', response_model=OrdersListResponse)
+def get_user_orders(
+    user_id: UUID = Query(..., description="ID пользователя"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        orders, total_items, total_pages = movie_service.get_user_orders(user_id, page, page_size)
+        return OrdersListResponse(
+            items=orders,
+            page=page,
+            page_size=page_size,
+            total_items=total_items,
+            total_pages=total_pages
+        )
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/orders/{order_id}', response_model=Order)
+def get_order(
+    order_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.get_order_by_id(order_id)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/orders/{order_id}/pay', response_model=Order)
+def confirm_order(
+    order_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.confirm_order(order_id)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
 @movie_router.put('/admin/schedule/{session_id}')
 def update_schedule(
     session_id: UUID,
@@ -51,35 +287,150 @@ def update_schedule(
 ):
     try:
         return movie_service.update_schedule(session_id, request)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
     except KeyError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
-@movie_router.get('/{movie_id}')
+@movie_router.get('/{movie_id}', response_model=Movie)
 def get_movie(
     movie_id: UUID,
+    request: Request,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        # Сначала только отметка изменения: при совпадении фильм не читается целиком
+        etag, modified_at = MovieService.validators(
+            movie_id, modified_at=movie_service.get_movie_modified_at(movie_id)
+        )
+        if _not_modified(request, etag, modified_at):
+            return Response(status_code=304, headers=_cache_headers(etag, modified_at, MOVIE_CACHE_CONTROL))
+        movie = movie_service.get_movie_by_id(movie_id)
+        return _cached_json(
+            request, lambda: movie,
+            *MovieService.validators(movie_id, modified_at=movie.updated_at or movie.created_at),
+            MOVIE_CACHE_CONTROL
+        )
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/{movie_id}/similar', response_model=SimilarMoviesResponse)
+def get_similar_movies(
+    movie_id: UUID,
+    k: int = Query(10, ge=1, le=50),
     movie_service: MovieService = Depends(MovieService)
 ):
     try:
-        return movie_service.get_movie_by_id(movie_id)
+        return SimilarMoviesResponse(movie_id=movie_id, similar=movie_service.get_similar_movies(movie_id, k))
     except KeyError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
-@movie_router.get('/sessions/{session_id}')
+@movie_router.get('/sessions/{session_id}', response_model=Session)
 def get_session(
     session_id: UUID,
+    request: Request,
     movie_service: MovieService = Depends(MovieService)
 ):
     try:
-        return movie_service.get_session_by_id(session_id)
+        etag, modified_at = MovieService.validators(
+            session_id, modified_at=movie_service.get_session_modified_at(session_id)
+        )
+        if _not_modified(request, etag, modified_at):
+            return Response(status_code=304, headers=_cache_headers(etag, modified_at, SESSION_CACHE_CONTROL))
+        session = movie_service.get_session_by_id(session_id)
+        return _cached_json(
+            request, lambda: session,
+            *MovieService.validators(session_id, modified_at=session.updated_at or session.created_at),
+            SESSION_CACHE_CONTROL
+        )
     except KeyError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
+@movie_router.get('/sessions/{session_id}/seats')
+def get_seat_availability(
+    session_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    # Отдаём битовую карту занятых мест как есть: бит i = место i, 1 - занято
+    try:
+        bitmap, capacity, row_length = movie_service.get_seat_availability(session_id)
+        return Response(
+            content=bitmap,
+            media_type="application/octet-stream",
+            headers={"X-Seat-Capacity": str(capacity), "X-Seat-Row-Length": str(row_length)}
+        )
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/sessions/{session_id}/seats/hold', response_model=SeatHoldResponse)
+def hold_seats(
+    session_id: UUID,
+    request: SeatHoldRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.hold_seats(session_id, request)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/sessions/{session_id}/seats/holds/{hold_id}/confirm')
+def confirm_hold(
+    session_id: UUID,
+    hold_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.confirm_hold(session_id, hold_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.delete('/sessions/{session_id}/seats/holds/{hold_id}')
+def release_hold(
+    session_id: UUID,
+    hold_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.release_hold(session_id, hold_id)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/admin/import/{kind}', response_model=ImportResult)
+def import_feed(
+    kind: str,
+    file: UploadFile = File(..., description="NDJSON или CSV с фильмами или сеансами"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        # Файл читается построчно и уходит в COPY пачками, целиком в память не загружается
+        lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+        return movie_service.import_feed(kind, format, lines)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
 @movie_router.put('/admin/movies/{movie_id}')
 def update_movie(
     movie_id: UUID,
@@ -91,4 +442,94 @@ def update_movie(
     except KeyError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
-        raise HTTPException(500, f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.put('/admin/sessions/{session_id}/hot')
+def enable_hot_session(
+    session_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.set_hot_session(session_id, True)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.delete('/admin/sessions/{session_id}/hot')
+def disable_hot_session(
+    session_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.set_hot_session(session_id, False)
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/admin/pricing-rules', response_model=List[PricingRule])
+def get_pricing_rules(movie_service: MovieService = Depends(MovieService)):
+    try:
+        return movie_service.get_pricing_rules()
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.post('/admin/pricing-rules', response_model=PricingRule)
+def create_pricing_rule(
+    request: CreatePricingRuleRequest,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.create_pricing_rule(request)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.delete('/admin/pricing-rules/{rule_id}')
+def delete_pricing_rule(
+    rule_id: UUID,
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.delete_pricing_rule(rule_id)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/admin/halls', response_model=List[Hall])
+def get_halls(
+    cinema_id: str = Query(None, alias="cinema", description="ID кинотеатра; без него - все кинотеатры"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.get_halls(cinema_id)
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.put('/admin/halls/{hall_name}', response_model=Hall)
+def set_hall_capacity(
+    hall_name: str,
+    request: HallCapacityRequest,
+    cinema_id: str = Query(DEFAULT_CINEMA_ID, alias="cinema", min_length=1),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.set_hall_capacity(hall_name, request.capacity, cinema_id)
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
+
+@movie_router.get('/admin/analytics/occupancy', response_model=OccupancyReport)
+def get_occupancy_report(
+    dimension: OccupancyDimension = Query("day"),
+    key: str = Query(None, description="Кинотеатр, зал (cinema/hall вне основного кинотеатра) или ID фильма; без него - все ключи разреза"),
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    movie_service: MovieService = Depends(MovieService)
+):
+    try:
+        return movie_service.get_occupancy_report(dimension, date_from, date_to, key)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Internal server error: {str(e)}")
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from prometheus_client import make_asgi_app
 from .endpoints.movie_router import movie_router
 from .database import init_db
 
@@ -10,14 +11,35 @@ app = FastAPI(
 
 @app.on_event("startup")
 def startup():
+    # Только схема: тестовые данные и витрина заполняются командой `python -m app.cli seed`
     init_db()
-    # Добавляем тестовые данные
-    from .services.movie_service import MovieService
-    movie_service = MovieService()
-    movie_service.add_sample_data()
+    # Возврат мест из просроченных неоплаченных заказов
+    from .services.hold_sweeper import hold_sweepers
+    for sweeper in hold_sweepers:
+        sweeper.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    # Дописываем заявки горячих сеансов и заказы, оставшиеся в очередях
+    from .repositories.order_writer import order_writers
+    from .repositories.occupancy_writer import occupancy_writers
+    from .repositories.shard_router import shard_router
+    from .services.hot_sessions import hot_sessions
+    from .services.hold_sweeper import hold_sweepers
+    for sweeper in hold_sweepers:
+        sweeper.stop()
+    hot_sessions.stop()
+    for writer in order_writers.values():
+        writer.stop()
+    for writer in occupancy_writers.values():
+        writer.stop()
+    shard_router.close()
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "movies"}
 
-app.include_router(movie_router, prefix='/api')
\ No newline at end of file
+app.include_router(movie_router, prefix='/api')
+
+metrics_app = make_asgi_app()
+app.mount("/metrics", metrics_app)
@@ -1,7 +1,8 @@
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, date, time
 from pydantic import BaseModel, ConfigDict, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
+from ..database import DEFAULT_CINEMA_ID
 
 
 class Movie(BaseModel):
@@ -26,6 +27,7 @@ class Session(BaseModel):
     hall_name: str
     available_seats: int = Field(ge=0)
     created_at: datetime
+    cinema_id: str = DEFAULT_CINEMA_ID
     updated_at: Optional[datetime] = None
 
 
@@ -34,12 +36,59 @@ class OrderRequest(BaseModel):
     session_id: UUID
     selected_seats: List[str]
     ticket_count: int = Field(gt=0)
+    hold_id: Optional[UUID] = None
 
 
 class OrderResponse(BaseModel):
     order_id: UUID
     status: str
     total_amount: float
+    expires_at: Optional[datetime] = None
+
+
+class OrderItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    line_no: int
+    seat_label: Optional[str] = None
+    price: float
+
+
+class OrderHold(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    hold_id: UUID
+    order_id: UUID
+    session_id: UUID
+    ticket_count: int
+    seats: List[str] = []
+    expires_at: datetime
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class Order(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    order_id: UUID
+    user_id: UUID
+    session_id: UUID
+    ticket_count: int
+    total_amount: float
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    items: List[OrderItem] = []
+    hold: Optional[OrderHold] = None
+
+
+class OrdersListResponse(BaseModel):
+    items: List[Order]
+    page: int
+    page_size: int
+    total_items: int
+    total_pages: int
 
 
 class ScheduleUpdateRequest(BaseModel):
@@ -47,12 +96,106 @@ class ScheduleUpdateRequest(BaseModel):
     hall_name: str
 
 
+class HallSpec(BaseModel):
+    hall_name: str
+    # Если не задано, берётся вместимость зала из справочника
+    seats: Optional[int] = Field(None, gt=0)
+
+
+class SlotRules(BaseModel):
+    opening_time: time = time(10, 0)
+    closing_time: time = time(23, 30)
+    cleanup_minutes: int = Field(15, ge=0)
+    slot_step_minutes: int = Field(5, gt=0, le=60)
+    weekdays: List[int] = Field(default_factory=lambda: list(range(7)))
+
+
+class ScheduleGenerateRequest(BaseModel):
+    cinema_id: str = Field(DEFAULT_CINEMA_ID, min_length=1)
+    movie_ids: List[UUID] = Field(min_length=1)
+    halls: List[HallSpec] = Field(min_length=1)
+    date_from: date
+    date_to: date
+    rules: SlotRules = Field(default_factory=SlotRules)
+
+
+class ScheduleGenerateResponse(BaseModel):
+    created: int
+    skipped_conflicts: int
+    sessions: List[Session]
+
+
+class NowShowingSession(BaseModel):
+    session_id: UUID
+    cinema_id: str = DEFAULT_CINEMA_ID
+    start_time: datetime
+    hall_name: str
+    available_seats: int
+
+
+class NowShowingMovie(BaseModel):
+    film_id: UUID
+    title: str
+    poster_url: str
+    genre: List[str]
+    duration_minutes: int
+    sessions: List[NowShowingSession]
+
+
+class NowShowingResponse(BaseModel):
+    movies: List[NowShowingMovie]
+
+
+class BatchLookupRequest(BaseModel):
+    ids: List[UUID] = Field(min_length=1, max_length=500)
+
+
+class MoviesBatchResponse(BaseModel):
+    movies: List[Movie]
+    missing: List[UUID]
+
+
+class SessionsBatchResponse(BaseModel):
+    sessions: List[Session]
+    missing: List[UUID]
+
+
+class SeatAvailabilityRequest(BaseModel):
+    session_ids: Optional[List[UUID]] = Field(None, min_length=1, max_length=500)
+    movie_id: Optional[UUID] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+class SeatAvailabilityResponse(BaseModel):
+    seats: Dict[UUID, int]
+    missing: List[UUID] = []
+
+
+class SimilarMovie(BaseModel):
+    movie: Movie
+    score: float
+
+
+class SimilarMoviesResponse(BaseModel):
+    movie_id: UUID
+    similar: List[SimilarMovie]
+
+
 class MoviesListResponse(BaseModel):
     movies: List[Movie]
 
 
+class MovieSearchResponse(BaseModel):
+    movies: List[Movie]
+    page: int
+    page_size: int
+    has_more: bool
+
+
 class ScheduleListResponse(BaseModel):
     schedule: List[Session]
+    next_cursor: Optional[str] = None
 
 
 class UpdateMovieRequest(BaseModel):
@@ -60,4 +203,112 @@ class UpdateMovieRequest(BaseModel):
     description: Optional[str] = None
     duration_minutes: Optional[int] = Field(None, gt=0)
     genre: Optional[List[str]] = None
-    poster_url: Optional[str] = None
\ No newline at end of file
+    poster_url: Optional[str] = None
+
+
+class SeatHoldRequest(BaseModel):
+    seats: List[str] = Field(min_length=1)
+    ttl_seconds: int = Field(300, gt=0, le=3600)
+
+
+class SeatHoldResponse(BaseModel):
+    hold_id: UUID
+    session_id: UUID
+    seats: List[str]
+    expires_at: datetime
+
+
+
+class MovieImportRow(BaseModel):
+    film_id: Optional[UUID] = None
+    title: str
+    description: str
+    duration_minutes: int = Field(gt=0)
+    genre: List[str]
+    poster_url: str
+
+
+class SessionImportRow(BaseModel):
+    session_id: Optional[UUID] = None
+    movie_id: UUID
+    cinema_id: str = Field(DEFAULT_CINEMA_ID, min_length=1)
+    start_time: datetime
+    hall_name: str
+    available_seats: int = Field(ge=0)
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    kind: str
+    imported: int
+    failed: int
+    errors: List[ImportLineError]
+
+
+TimeSlot = Literal['morning', 'day', 'evening', 'night']
+
+
+class PricingRule(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    rule_id: UUID
+    hall_name: Optional[str] = None
+    movie_id: Optional[UUID] = None
+    weekday: Optional[int] = Field(None, ge=0, le=6)
+    time_slot: Optional[TimeSlot] = None
+    price: float = Field(ge=0)
+    priority: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class CreatePricingRuleRequest(BaseModel):
+    hall_name: Optional[str] = None
+    movie_id: Optional[UUID] = None
+    weekday: Optional[int] = Field(None, ge=0, le=6)
+    time_slot: Optional[TimeSlot] = None
+    price: float = Field(ge=0)
+    priority: int = 0
+
+
+class Hall(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    cinema_id: str = DEFAULT_CINEMA_ID
+    hall_name: str
+    capacity: int = Field(gt=0)
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class HallCapacityRequest(BaseModel):
+    capacity: int = Field(gt=0)
+
+
+OccupancyDimension = Literal['day', 'cinema', 'hall', 'movie']
+
+
+class OccupancyRow(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    key: str
+    day: date
+    sessions: int
+    seats_offered: int
+    seats_sold: int
+    fill_rate: float = 0.0
+
+
+class OccupancyReport(BaseModel):
+    dimension: OccupancyDimension
+    date_from: date
+    date_to: date
+    sessions: int
+    seats_offered: int
+    seats_sold: int
+    fill_rate: float
+    rows: List[OccupancyRow]
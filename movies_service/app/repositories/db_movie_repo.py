@@ -1,23 +1,124 @@
-from uuid import UUID
+import io
+import os
+from typing import Iterator
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, select, delete, tuple_, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session as SASession
-from ..database import get_db
-from ..models.movie import Movie, Session
-from ..schemas.movie import Movie as DBMovie, Session as DBSession
+from ..database import get_db, get_shard_db, PRIMARY_SHARD
+from ..models.movie import (
+    Movie, Session, SeatHoldResponse, NowShowingMovie, NowShowingSession, Order, OrderItem, OrderHold,
+    PricingRule, Hall, OccupancyRow
+)
+from ..schemas.movie import (
+    Movie as DBMovie, Session as DBSession, SeatMap as DBSeatMap, SeatHold as DBSeatHold,
+    NowShowing as DBNowShowing, Order as DBOrder, OrderItem as DBOrderItem,
+    PricingRule as DBPricingRule, HotSession as DBHotSession, OrderHold as DBOrderHold,
+    Hall as DBHall, OccupancyRollup as DBOccupancyRollup, search_vector
+)
+from .order_writer import order_writers
+from .occupancy_writer import occupancy_writers, OCCUPANCY_DIMENSIONS
+from ..services.seat_bitmap import (
+    empty_bitmap, make_mask, mask_labels, bit_or, bit_clear, intersects, count_bits
+)
 
+SEAT_ROW_LENGTH = int(os.getenv("SEAT_ROW_LENGTH", "20"))
+# Ключ advisory-блокировки, под которой сидируется пустой каталог
+SEED_LOCK_ID = 7_310_001
+# Размер пачки серверного курсора при потоковой выгрузке
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
 
+
+# Репозиторий одного шарда. Каталог фильмов есть в каждом шарде, сеансы, заказы
+# и агрегаты - только в шарде своего кинотеатра.
 class MovieRepo:
-    def __init__(self):
-        self.db: SASession = next(get_db())
+    def __init__(self, db: SASession = None, shard: str = PRIMARY_SHARD):
+        self.shard = shard
+        if db is None:
+            db = next(get_db()) if shard == PRIMARY_SHARD else next(get_shard_db(shard))
+        self.db: SASession = db
+        self._order_writer = order_writers[shard]
+        self._occupancy = occupancy_writers[shard]
 
     def get_all_movies(self) -> list[Movie]:
         movies = self.db.query(DBMovie).all()
-        return [Movie.from_orm(movie) for movie in movies]
+        return [Movie.model_validate(movie) for movie in movies]
+
+    def iter_movies(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Movie]:
+        # Серверный курсор: в памяти только текущая пачка строк
+        query = self.db.query(DBMovie).order_by(DBMovie.title, DBMovie.film_id).yield_per(batch_size)
+        for movie in query:
+            yield Movie.model_validate(movie)
+            # Объект больше не нужен сессии, иначе identity map растёт со всей выгрузкой
+            self.db.expunge(movie)
+
+    def has_movies(self) -> bool:
+        return self.db.query(DBMovie.film_id).limit(1).first() is not None
+
+    def seed_catalog(self, movies: list[Movie], sessions: list[Session]) -> bool:
+        # Одна транзакция на весь набор; блокировка и повторная проверка защищают
+        # от двойного сидирования, если команду запустили одновременно
+        try:
+            self.db.execute(select(func.pg_advisory_xact_lock(SEED_LOCK_ID)))
+            if self.has_movies():
+                self.db.rollback()
+                return False
+            self.db.execute(insert(DBMovie), [movie.model_dump() for movie in movies])
+            if sessions:
+                self.db.execute(insert(DBSession), [session.model_dump() for session in sessions])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.record_sessions_offered(sessions)
+        return True
 
     def get_movie_by_id(self, movie_id: UUID) -> Movie:
         movie = self.db.query(DBMovie).filter(DBMovie.film_id == movie_id).first()
         if movie is None:
             raise KeyError(f"Movie with id={movie_id} not found")
-        return Movie.from_orm(movie)
+        return Movie.model_validate(movie)
+
+    def get_movie_modified_at(self, movie_id: UUID) -> datetime:
+        # Только отметка времени для валидаторов кеша, без описания и прочих колонок
+        modified_at = self.db.query(func.coalesce(DBMovie.updated_at, DBMovie.created_at)).filter(
+            DBMovie.film_id == movie_id
+        ).scalar()
+        if modified_at is None:
+            raise KeyError(f"Movie with id={movie_id} not found")
+        return modified_at
+
+    def get_movies_by_ids(self, movie_ids: list[UUID]) -> list[Movie]:
+        movies = self.db.query(DBMovie).filter(DBMovie.film_id.in_(movie_ids)).all()
+        return [Movie.model_validate(movie) for movie in movies]
+
+    def search_movies(
+        self,
+        text: str = None,
+        genres: list[str] = None,
+        match_all_genres: bool = True,
+        limit: int = 20,
+        offset: int = 0
+    ) -> list[Movie]:
+        query = self.db.query(DBMovie)
+        order_by = [DBMovie.title, DBMovie.film_id]
+
+        if text:
+            # Тот же вектор, что и в GIN-индексе ix_movies_search
+            vector = search_vector(DBMovie.title, DBMovie.description)
+            ts_query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), text)
+            query = query.filter(vector.op('@@')(ts_query))
+            order_by.insert(0, func.ts_rank_cd(vector, ts_query).desc())
+        if genres:
+            # @> и && по массиву обслуживаются индексом ix_movies_genre
+            if match_all_genres:
+                query = query.filter(DBMovie.genre.contains(genres))
+            else:
+                query = query.filter(DBMovie.genre.overlap(genres))
+
+        movies = query.order_by(*order_by).offset(offset).limit(limit).all()
+        return [Movie.model_validate(movie) for movie in movies]
 
     def get_schedule(self, movie_id: UUID = None) -> list[Session]:
         query = self.db.query(DBSession)
@@ -25,48 +126,803 @@ class MovieRepo:
             query = query.filter(DBSession.movie_id == movie_id)
 
         sessions = query.all()
-        return [Session.from_orm(session) for session in sessions]
+        return [Session.model_validate(session) for session in sessions]
+
+    def get_schedule_page(
+        self,
+        movie_id: UUID = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        hall_name: str = None,
+        after: tuple[datetime, UUID] = None,
+        limit: int = 100,
+        cinema_id: str = None
+    ) -> list[Session]:
+        query = self.db.query(DBSession)
+        if cinema_id:
+            query = query.filter(DBSession.cinema_id == cinema_id)
+        if movie_id:
+            query = query.filter(DBSession.movie_id == movie_id)
+        if date_from:
+            query = query.filter(DBSession.start_time >= date_from)
+        if date_to:
+            query = query.filter(DBSession.start_time < date_to)
+        if hall_name:
+            query = query.filter(DBSession.hall_name == hall_name)
+        if after:
+            # Keyset-пагинация: продолжаем строго после последнего отданного сеанса
+            query = query.filter(tuple_(DBSession.start_time, DBSession.session_id) > tuple_(*after))
+
+        sessions = query.order_by(DBSession.start_time, DBSession.session_id).limit(limit).all()
+        return [Session.model_validate(session) for session in sessions]
+
+    def iter_schedule(
+        self,
+        movie_id: UUID = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        hall_name: str = None,
+        cinema_id: str = None,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[Session]:
+        # Порядок тот же, что у страниц расписания, поэтому выгрузки шардов сливаются без сортировки
+        query = self.db.query(DBSession)
+        if movie_id:
+            query = query.filter(DBSession.movie_id == movie_id)
+        if date_from:
+            query = query.filter(DBSession.start_time >= date_from)
+        if date_to:
+            query = query.filter(DBSession.start_time < date_to)
+        if hall_name:
+            query = query.filter(DBSession.hall_name == hall_name)
+        if cinema_id:
+            query = query.filter(DBSession.cinema_id == cinema_id)
+        for session in query.order_by(DBSession.start_time, DBSession.session_id).yield_per(batch_size):
+            yield Session.model_validate(session)
+            self.db.expunge(session)
+
+    def get_hall_bookings(
+        self,
+        cinema_id: str,
+        hall_names: list[str],
+        date_from: datetime,
+        date_to: datetime,
+        exclude_session_id: UUID = None
+    ) -> list[tuple[UUID, str, datetime, int]]:
+        # Сеанс, начавшийся за сутки до периода, ещё может его задевать
+        query = self.db.query(
+            DBSession.session_id, DBSession.hall_name, DBSession.start_time, DBMovie.duration_minutes
+        ).join(DBMovie, DBMovie.film_id == DBSession.movie_id).filter(
+            DBSession.cinema_id == cinema_id,
+            DBSession.hall_name.in_(hall_names),
+            DBSession.start_time >= date_from - timedelta(days=1),
+            DBSession.start_time < date_to
+        )
+        if exclude_session_id:
+            query = query.filter(DBSession.session_id != exclude_session_id)
+        return [tuple(row) for row in query.all()]
+
+    def get_sessions_by_ids(self, session_ids: list[UUID]) -> list[Session]:
+        sessions = self.db.query(DBSession).filter(DBSession.session_id.in_(session_ids)).all()
+        return [Session.model_validate(session) for session in sessions]
 
     def get_session_by_id(self, session_id: UUID) -> Session:
         session = self.db.query(DBSession).filter(DBSession.session_id == session_id).first()
         if session is None:
             raise KeyError(f"Session with id={session_id} not found")
-        return Session.from_orm(session)
+        return Session.model_validate(session)
+
+    def get_session_modified_at(self, session_id: UUID) -> datetime:
+        # updated_at меняется и при каждом списании мест
+        modified_at = self.db.query(func.coalesce(DBSession.updated_at, DBSession.created_at)).filter(
+            DBSession.session_id == session_id
+        ).scalar()
+        if modified_at is None:
+            raise KeyError(f"Session with id={session_id} not found")
+        return modified_at
 
     def create_movie(self, movie: Movie) -> Movie:
-        db_movie = DBMovie(**movie.dict())
+        db_movie = DBMovie(**movie.model_dump())
         self.db.add(db_movie)
         self.db.commit()
         self.db.refresh(db_movie)
-        return Movie.from_orm(db_movie)
+        return Movie.model_validate(db_movie)
 
     def create_session(self, session: Session) -> Session:
-        db_session = DBSession(**session.dict())
+        db_session = DBSession(**session.model_dump())
         self.db.add(db_session)
         self.db.commit()
         self.db.refresh(db_session)
-        return Session.from_orm(db_session)
+        self.record_sessions_offered([session])
+        return Session.model_validate(db_session)
+
+    def copy_rows(self, table: str, columns: list[str], rows: list[tuple], upsert_key: str = None):
+        # COPY ... FROM STDIN в формате CSV: в разы быстрее построчных INSERT.
+        # С upsert_key строки идут через временную таблицу и INSERT ... ON CONFLICT:
+        # повтор той же пачки обновляет уже записанные строки, а не падает на ключе
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(','.join(_copy_field(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        column_list = ', '.join(columns)
+        try:
+            cursor = self.db.connection().connection.cursor()
+            target = table
+            if upsert_key is not None:
+                target = f"{table}_import"
+                cursor.execute(f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.copy_expert(f"COPY {target} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            if upsert_key is not None:
+                updates = ', '.join(
+                    f"{column} = EXCLUDED.{column}" for column in columns if column not in (upsert_key, 'created_at')
+                )
+                cursor.execute(
+                    f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {target} "
+                    f"ON CONFLICT ({upsert_key}) DO UPDATE SET {updates}"
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def create_sessions(self, sessions: list[Session]) -> list[Session]:
+        # Все сеансы одной пачкой в одной транзакции
+        if sessions:
+            try:
+                self.db.execute(insert(DBSession), [session.model_dump() for session in sessions])
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            self.record_sessions_offered(sessions)
+        return sessions
+
+    def record_sessions_offered(self, sessions: list[Session]):
+        # Новые сеансы добавляют в агрегаты предложенные места
+        for session in sessions:
+            self._occupancy.record(
+                session.movie_id, session.hall_name, session.start_time,
+                sessions=1, seats_offered=session.available_seats, cinema_id=session.cinema_id
+            )
+
+    def upsert_movie(self, movie: Movie) -> Movie:
+        # Копия фильма из основного шарда: повтор и догоняющая запись не падают на ключе
+        values = movie.model_dump()
+        stmt = pg_insert(DBMovie).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBMovie.film_id],
+            set_={key: stmt.excluded[key] for key in values if key not in ('film_id', 'created_at')}
+        ).returning(*DBMovie.__table__.columns)
+        try:
+            row = self.db.execute(stmt).first()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return Movie(**row._mapping)
 
     def update_movie(self, movie: Movie) -> Movie:
         db_movie = self.db.query(DBMovie).filter(DBMovie.film_id == movie.film_id).first()
         if db_movie is None:
             raise KeyError(f"Movie with id={movie.film_id} not found")
 
-        for key, value in movie.dict().items():
+        for key, value in movie.model_dump().items():
             setattr(db_movie, key, value)
 
         self.db.commit()
         self.db.refresh(db_movie)
-        return Movie.from_orm(db_movie)
+        return Movie.model_validate(db_movie)
 
     def update_session(self, session: Session) -> Session:
         db_session = self.db.query(DBSession).filter(DBSession.session_id == session.session_id).first()
         if db_session is None:
             raise KeyError(f"Session with id={session.session_id} not found")
+        old = Session.model_validate(db_session)
 
-        for key, value in session.dict().items():
+        for key, value in session.model_dump().items():
             setattr(db_session, key, value)
 
         self.db.commit()
         self.db.refresh(db_session)
-        return Session.from_orm(db_session)
\ No newline at end of file
+        updated = Session.model_validate(db_session)
+        if (old.hall_name, old.start_time.date()) != (updated.hall_name, updated.start_time.date()):
+            self._move_occupancy(old, updated)
+        return updated
+
+    def _move_occupancy(self, old: Session, new: Session):
+        # Перенос сеанса в другой зал или день переносит его места между строками агрегатов
+        sold = self._sold_seats(old.session_id)
+        offered = new.available_seats + sold
+        self._occupancy.record(old.movie_id, old.hall_name, old.start_time,
+                               sessions=-1, seats_offered=-offered, seats_sold=-sold, cinema_id=old.cinema_id)
+        self._occupancy.record(new.movie_id, new.hall_name, new.start_time,
+                               sessions=1, seats_offered=offered, seats_sold=sold, cinema_id=new.cinema_id)
+
+    def _sold_seats(self, session_id: UUID) -> int:
+        return self.db.query(func.coalesce(func.sum(DBOrder.ticket_count), 0)).filter(
+            DBOrder.session_id == session_id,
+            DBOrder.status.in_(('pending', 'paid'))
+        ).scalar()
+
+    def _decrement_seats(self, session_id: UUID, ticket_count: int) -> Session:
+        # Один условный UPDATE: места списываются только если их хватает,
+        # поэтому параллельные заказы не теряют обновления и не продают лишнее
+        stmt = (
+            update(DBSession)
+            .where(
+                DBSession.session_id == session_id,
+                DBSession.available_seats >= ticket_count
+            )
+            .values(
+                available_seats=DBSession.available_seats - ticket_count,
+                updated_at=datetime.now()
+            )
+            .returning(*DBSession.__table__.columns)
+        )
+        row = self.db.execute(stmt).first()
+
+        if row is None:
+            exists = self.db.query(DBSession.session_id).filter(DBSession.session_id == session_id).first()
+            if exists is None:
+                raise KeyError(f"Session with id={session_id} not found")
+            raise ValueError("Not enough available seats")
+
+        session = Session(**row._mapping)
+        self._sync_now_showing_seats(session_id, session.available_seats)
+        return session
+
+    def _sync_now_showing_seats(self, session_id: UUID, available_seats: int):
+        # Обновление по первичному ключу в той же транзакции, что и списание мест
+        self.db.execute(
+            update(DBNowShowing)
+            .where(DBNowShowing.session_id == session_id)
+            .values(available_seats=available_seats)
+        )
+
+    def refresh_now_showing(self, session_ids: list[UUID] = None, movie_id: UUID = None):
+        # INSERT ... SELECT ... ON CONFLICT: одна команда и для новых, и для изменённых сеансов
+        now = datetime.now()
+        source = select(
+            DBSession.session_id, DBSession.movie_id, DBMovie.title, DBMovie.poster_url,
+            DBMovie.genre, DBMovie.duration_minutes, DBSession.start_time, DBSession.cinema_id,
+            DBSession.hall_name, DBSession.available_seats
+        ).join(DBMovie, DBMovie.film_id == DBSession.movie_id).where(DBSession.start_time >= now)
+        if session_ids is not None:
+            source = source.where(DBSession.session_id.in_(session_ids))
+        if movie_id is not None:
+            source = source.where(DBSession.movie_id == movie_id)
+
+        columns = [
+            'session_id', 'movie_id', 'title', 'poster_url', 'genre',
+            'duration_minutes', 'start_time', 'cinema_id', 'hall_name', 'available_seats'
+        ]
+        stmt = pg_insert(DBNowShowing).from_select(columns, source)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBNowShowing.session_id],
+            set_={column: stmt.excluded[column] for column in columns[1:]}
+        )
+
+        try:
+            if session_ids is not None:
+                # Сеанс мог переехать в прошлое, поэтому его строка пересоздаётся целиком
+                self.db.execute(delete(DBNowShowing).where(DBNowShowing.session_id.in_(session_ids)))
+            elif movie_id is None:
+                self.db.execute(delete(DBNowShowing).where(DBNowShowing.start_time < now))
+            self.db.execute(stmt)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def get_now_showing(self, date_from: datetime, date_to: datetime, sessions_per_movie: int,
+                        cinema_id: str = None) -> list[NowShowingMovie]:
+        query = self.db.query(DBNowShowing).filter(
+            DBNowShowing.start_time >= date_from,
+            DBNowShowing.start_time < date_to
+        )
+        if cinema_id:
+            query = query.filter(DBNowShowing.cinema_id == cinema_id)
+        rows = query.order_by(DBNowShowing.start_time).all()
+
+        movies: dict[UUID, NowShowingMovie] = {}
+        for row in rows:
+            movie = movies.get(row.movie_id)
+            if movie is None:
+                movie = movies[row.movie_id] = NowShowingMovie(
+                    film_id=row.movie_id,
+                    title=row.title,
+                    poster_url=row.poster_url,
+                    genre=row.genre,
+                    duration_minutes=row.duration_minutes,
+                    sessions=[]
+                )
+            if len(movie.sessions) < sessions_per_movie:
+                movie.sessions.append(NowShowingSession(
+                    session_id=row.session_id,
+                    cinema_id=row.cinema_id,
+                    start_time=row.start_time,
+                    hall_name=row.hall_name,
+                    available_seats=row.available_seats
+                ))
+        return list(movies.values())
+
+    def get_available_seats(self, session_ids: list[UUID]) -> dict[UUID, int]:
+        rows = self.db.query(DBSession.session_id, DBSession.available_seats).filter(
+            DBSession.session_id.in_(session_ids)
+        ).all()
+        return {row.session_id: row.available_seats for row in rows}
+
+    def get_available_seats_window(self, movie_id: UUID | None, date_from: datetime, date_to: datetime) -> dict[UUID, int]:
+        # Окно читается из витрины: она обновляется вместе со счётчиком и не мешает заказам
+        query = self.db.query(DBNowShowing.session_id, DBNowShowing.available_seats).filter(
+            DBNowShowing.start_time >= date_from,
+            DBNowShowing.start_time < date_to
+        )
+        if movie_id is not None:
+            query = query.filter(DBNowShowing.movie_id == movie_id)
+        return {row.session_id: row.available_seats for row in query.order_by(DBNowShowing.start_time).all()}
+
+    def reserve_seats(self, session_id: UUID, ticket_count: int) -> Session:
+        try:
+            session = self._decrement_seats(session_id, ticket_count)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_sold(session, ticket_count)
+        return session
+
+    def _record_sold(self, session: Session, ticket_count: int):
+        self._occupancy.record(session.movie_id, session.hall_name, session.start_time,
+                               seats_sold=ticket_count, cinema_id=session.cinema_id)
+
+    def get_hot_session_ids(self) -> list[UUID]:
+        return [row.session_id for row in self.db.query(DBHotSession.session_id).all()]
+
+    def set_hot_session(self, session_id: UUID, enabled: bool):
+        # Список горячих сеансов общий и лежит в основном шарде; существование
+        # сеанса проверяет сервис в шарде его кинотеатра
+        try:
+            if enabled:
+                self.db.execute(
+                    pg_insert(DBHotSession)
+                    .values(session_id=session_id, enabled_at=datetime.now())
+                    .on_conflict_do_nothing(index_elements=[DBHotSession.session_id])
+                )
+            else:
+                self.db.query(DBHotSession).filter(DBHotSession.session_id == session_id).delete()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _lock_seat_map(self, session_id: UUID) -> DBSeatMap:
+        query = self.db.query(DBSeatMap).filter(DBSeatMap.session_id == session_id)
+        seat_map = query.with_for_update().first()
+        if seat_map is None:
+            # Карта создаётся при первом обращении. Вместимость - размер зала: свободных
+            # мест может быть уже меньше, если часть продана без выбора мест
+            session = self.db.query(DBSession.cinema_id, DBSession.hall_name, DBSession.available_seats).filter(
+                DBSession.session_id == session_id
+            ).first()
+            if session is None:
+                raise KeyError(f"Session with id={session_id} not found")
+            capacity = self.db.query(DBHall.capacity).filter(
+                DBHall.cinema_id == session.cinema_id,
+                DBHall.hall_name == session.hall_name
+            ).scalar()
+            if capacity is None:
+                # Зал не заведён в halls: свободные места плюс уже проданные
+                capacity = session.available_seats + self._sold_seats(session_id)
+            self.db.execute(
+                pg_insert(DBSeatMap)
+                .values(
+                    session_id=session_id,
+                    capacity=capacity,
+                    row_length=SEAT_ROW_LENGTH,
+                    sold=empty_bitmap(capacity),
+                    held=empty_bitmap(capacity)
+                )
+                .on_conflict_do_nothing(index_elements=[DBSeatMap.session_id])
+            )
+            seat_map = query.with_for_update().one()
+
+        now = datetime.now()
+        if seat_map.next_hold_expiry is not None and seat_map.next_hold_expiry <= now:
+            held, next_expiry = self._live_holds(seat_map, now, delete_expired=True)
+            seat_map.held = held
+            seat_map.next_hold_expiry = next_expiry
+        return seat_map
+
+    def _live_holds(self, seat_map: DBSeatMap, now: datetime, delete_expired: bool = False):
+        held = empty_bitmap(seat_map.capacity)
+        next_expiry = None
+        holds = self.db.query(DBSeatHold).filter(DBSeatHold.session_id == seat_map.session_id).all()
+        for hold in holds:
+            if hold.expires_at <= now:
+                if delete_expired:
+                    self.db.delete(hold)
+                continue
+            held = bit_or(held, hold.seats)
+            if next_expiry is None or hold.expires_at < next_expiry:
+                next_expiry = hold.expires_at
+        return held, next_expiry
+
+    def _get_hold(self, session_id: UUID, hold_id: UUID) -> DBSeatHold:
+        hold = self.db.query(DBSeatHold).filter(
+            DBSeatHold.hold_id == hold_id,
+            DBSeatHold.session_id == session_id
+        ).first()
+        if hold is None:
+            raise KeyError(f"Seat hold with id={hold_id} not found or expired")
+        return hold
+
+    def get_seat_availability(self, session_id: UUID) -> tuple[bytes, int, int]:
+        seat_map = self.db.query(DBSeatMap).filter(DBSeatMap.session_id == session_id).first()
+        if seat_map is None:
+            seat_map = self._lock_seat_map(session_id)
+            self.db.commit()
+
+        held = seat_map.held
+        now = datetime.now()
+        if seat_map.next_hold_expiry is not None and seat_map.next_hold_expiry <= now:
+            held, _ = self._live_holds(seat_map, now)
+        return bit_or(seat_map.sold, held), seat_map.capacity, seat_map.row_length
+
+    def hold_seats(self, session_id: UUID, seats: list[str], ttl_seconds: int) -> SeatHoldResponse:
+        try:
+            seat_map = self._lock_seat_map(session_id)
+            mask = make_mask(seats, seat_map.row_length, seat_map.capacity)
+            if intersects(mask, bit_or(seat_map.sold, seat_map.held)):
+                raise ValueError("Selected seats are not available")
+
+            now = datetime.now()
+            hold = DBSeatHold(
+                hold_id=uuid4(),
+                session_id=session_id,
+                seats=mask,
+                expires_at=now + timedelta(seconds=ttl_seconds),
+                created_at=now
+            )
+            self.db.add(hold)
+            seat_map.held = bit_or(seat_map.held, mask)
+            if seat_map.next_hold_expiry is None or hold.expires_at < seat_map.next_hold_expiry:
+                seat_map.next_hold_expiry = hold.expires_at
+            seat_map.updated_at = now
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        return SeatHoldResponse(
+            hold_id=hold.hold_id,
+            session_id=session_id,
+            seats=mask_labels(mask, seat_map.row_length),
+            expires_at=hold.expires_at
+        )
+
+    def confirm_hold(self, session_id: UUID, hold_id: UUID, ticket_count: int = None,
+                     seats: list[str] = None) -> tuple[Session, list[str]]:
+        # Возвращает и сеанс, и метки выкупленных мест: заказ должен держать именно их
+        try:
+            seat_map = self._lock_seat_map(session_id)
+            hold = self._get_hold(session_id, hold_id)
+            seat_count = count_bits(hold.seats)
+            if ticket_count is not None and ticket_count != seat_count:
+                raise ValueError("ticket_count does not match the held seats")
+            if seats and make_mask(seats, seat_map.row_length, seat_map.capacity) != hold.seats:
+                raise ValueError("Selected seats do not match the held seats")
+            held_seats = mask_labels(hold.seats, seat_map.row_length)
+
+            session = self._decrement_seats(session_id, seat_count)
+            seat_map.sold = bit_or(seat_map.sold, hold.seats)
+            seat_map.held = bit_clear(seat_map.held, hold.seats)
+            seat_map.updated_at = datetime.now()
+            self.db.delete(hold)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_sold(session, seat_count)
+        return session, held_seats
+
+    def release_hold(self, session_id: UUID, hold_id: UUID):
+        try:
+            seat_map = self._lock_seat_map(session_id)
+            hold = self._get_hold(session_id, hold_id)
+            seat_map.held = bit_clear(seat_map.held, hold.seats)
+            seat_map.updated_at = datetime.now()
+            self.db.delete(hold)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def book_seats(self, session_id: UUID, seats: list[str], ticket_count: int) -> Session:
+        try:
+            seat_map = self._lock_seat_map(session_id)
+            mask = make_mask(seats, seat_map.row_length, seat_map.capacity)
+            # Заказ и его возврат считают ticket_count мест: списать нужно ровно столько же
+            if count_bits(mask) != ticket_count:
+                raise ValueError("Number of selected seats does not match ticket_count")
+            if intersects(mask, bit_or(seat_map.sold, seat_map.held)):
+                raise ValueError("Selected seats are not available")
+
+            session = self._decrement_seats(session_id, count_bits(mask))
+            seat_map.sold = bit_or(seat_map.sold, mask)
+            seat_map.updated_at = datetime.now()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_sold(session, count_bits(mask))
+        return session
+
+    def _increment_seats(self, session_id: UUID, ticket_count: int, seats: list[str] = None) -> Session:
+        if seats:
+            seat_map = self._lock_seat_map(session_id)
+            seat_map.sold = bit_clear(seat_map.sold, make_mask(seats, seat_map.row_length, seat_map.capacity))
+            seat_map.updated_at = datetime.now()
+        row = self.db.execute(
+            update(DBSession)
+            .where(DBSession.session_id == session_id)
+            .values(
+                available_seats=DBSession.available_seats + ticket_count,
+                updated_at=datetime.now()
+            )
+            .returning(*DBSession.__table__.columns)
+        ).first()
+        if row is None:
+            raise KeyError(f"Session with id={session_id} not found")
+        session = Session(**row._mapping)
+        self._sync_now_showing_seats(session_id, session.available_seats)
+        return session
+
+    def release_seats(self, session_id: UUID, ticket_count: int, seats: list[str] = None) -> int:
+        # Возврат мест (отмена заказа): счётчик и, если места были выбраны, биты карты
+        try:
+            session = self._increment_seats(session_id, ticket_count, seats)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self._record_sold(session, -ticket_count)
+        return session.available_seats
+
+    def confirm_order(self, order_id: UUID) -> Order:
+        # Оплата подтверждает бронь; строка брони блокируется, чтобы не разойтись со сборщиком
+        try:
+            hold = self.db.query(DBOrderHold).filter(DBOrderHold.order_id == order_id).with_for_update().first()
+            order = self.db.query(DBOrder).filter(DBOrder.order_id == order_id).first()
+            if order is None:
+                raise KeyError(f"Order with id={order_id} not found")
+            if hold is not None:
+                if hold.status != 'active' or hold.expires_at <= datetime.now():
+                    raise ValueError("Order hold has expired")
+                hold.status = 'confirmed'
+                hold.updated_at = datetime.now()
+            elif order.status != 'pending':
+                raise ValueError(f"Order is already {order.status}")
+            order.status = 'paid'
+            order.updated_at = datetime.now()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return self._load_order_items([order])[0]
+
+    def release_expired_order_holds(self, limit: int) -> tuple[int, float]:
+        # SKIP LOCKED: несколько реплик разбирают разные брони и не ждут друг друга
+        now = datetime.now()
+        try:
+            holds = (
+                self.db.query(DBOrderHold)
+                .filter(DBOrderHold.status == 'active', DBOrderHold.expires_at <= now)
+                .order_by(DBOrderHold.expires_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not holds:
+                self.db.rollback()
+                return 0, 0.0
+            lag = (now - holds[0].expires_at).total_seconds()
+
+            released: dict[UUID, tuple[int, list[str]]] = {}
+            for hold in holds:
+                count, seats = released.get(hold.session_id, (0, []))
+                released[hold.session_id] = (count + hold.ticket_count, seats + list(hold.seats or []))
+                hold.status = 'expired'
+                hold.updated_at = now
+            # Сеансы в одном порядке во всех репликах, чтобы не ловить взаимные блокировки
+            returned = []
+            for session_id in sorted(released, key=str):
+                count, seats = released[session_id]
+                try:
+                    returned.append((self._increment_seats(session_id, count, seats), count))
+                except KeyError:
+                    # Сеанс удалён - возвращать места некуда, бронь всё равно закрываем
+                    pass
+            self.db.execute(
+                update(DBOrder)
+                .where(DBOrder.order_id.in_([hold.order_id for hold in holds]), DBOrder.status == 'pending')
+                .values(status='expired', updated_at=now)
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        for session, count in returned:
+            self._record_sold(session, -count)
+        return len(holds), lag
+
+    def create_order(self, order: Order) -> Order:
+        # Запись идёт через общий буфер и группируется с заказами других запросов
+        self._order_writer.write(order)
+        return order
+
+    def _load_order_items(self, orders: list[DBOrder]) -> list[Order]:
+        items: dict[UUID, list[OrderItem]] = {order.order_id: [] for order in orders}
+        if items:
+            rows = self.db.query(DBOrderItem).filter(
+                DBOrderItem.order_id.in_(list(items))
+            ).order_by(DBOrderItem.order_id, DBOrderItem.line_no).all()
+            for row in rows:
+                items[row.order_id].append(OrderItem.model_validate(row))
+
+        holds: dict[UUID, OrderHold] = {}
+        if items:
+            for row in self.db.query(DBOrderHold).filter(DBOrderHold.order_id.in_(list(items))).all():
+                holds[row.order_id] = OrderHold.model_validate(row)
+
+        result = []
+        for order in orders:
+            model = Order.model_validate(order)
+            model.items = items[order.order_id]
+            model.hold = holds.get(order.order_id)
+            result.append(model)
+        return result
+
+    def get_order_by_id(self, order_id: UUID) -> Order:
+        order = self.db.query(DBOrder).filter(DBOrder.order_id == order_id).first()
+        if order is None:
+            raise KeyError(f"Order with id={order_id} not found")
+        return self._load_order_items([order])[0]
+
+    def get_user_orders(self, user_id: UUID, page: int, page_size: int):
+        query = self.db.query(DBOrder).filter(DBOrder.user_id == user_id).order_by(DBOrder.created_at.desc())
+        total_items = query.count()
+        total_pages = (total_items + page_size - 1) // page_size
+        orders = query.offset((page - 1) * page_size).limit(page_size).all()
+        return self._load_order_items(orders), total_items, total_pages
+
+    def get_pricing_rules(self) -> list[PricingRule]:
+        rules = self.db.query(DBPricingRule).all()
+        return [PricingRule.model_validate(rule) for rule in rules]
+
+    def get_pricing_rules_version(self) -> tuple:
+        # Дешёвая проверка изменений: число правил и время последней правки
+        return tuple(self.db.query(
+            func.count(DBPricingRule.rule_id),
+            func.max(func.coalesce(DBPricingRule.updated_at, DBPricingRule.created_at))
+        ).one())
+
+    def create_pricing_rule(self, rule: PricingRule) -> PricingRule:
+        db_rule = DBPricingRule(**rule.model_dump())
+        self.db.add(db_rule)
+        self.db.commit()
+        self.db.refresh(db_rule)
+        return PricingRule.model_validate(db_rule)
+
+    def delete_pricing_rule(self, rule_id: UUID):
+        deleted = self.db.query(DBPricingRule).filter(DBPricingRule.rule_id == rule_id).delete()
+        if not deleted:
+            self.db.rollback()
+            raise KeyError(f"Pricing rule with id={rule_id} not found")
+        self.db.commit()
+
+    def get_halls(self, cinema_id: str = None) -> list[Hall]:
+        query = self.db.query(DBHall)
+        if cinema_id:
+            query = query.filter(DBHall.cinema_id == cinema_id)
+        return [Hall.model_validate(hall) for hall in query.order_by(DBHall.cinema_id, DBHall.hall_name).all()]
+
+    def get_hall_capacities(self, cinema_id: str, hall_names: list[str]) -> dict[str, int]:
+        rows = self.db.query(DBHall.hall_name, DBHall.capacity).filter(
+            DBHall.cinema_id == cinema_id,
+            DBHall.hall_name.in_(hall_names)
+        ).all()
+        return {row.hall_name: row.capacity for row in rows}
+
+    def upsert_halls(self, cinema_id: str, capacities: dict[str, int]) -> list[Hall]:
+        now = datetime.now()
+        stmt = pg_insert(DBHall).values([
+            {'cinema_id': cinema_id, 'hall_name': hall_name, 'capacity': capacity, 'created_at': now}
+            for hall_name, capacity in sorted(capacities.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBHall.cinema_id, DBHall.hall_name],
+            set_={'capacity': stmt.excluded.capacity, 'updated_at': now}
+        ).returning(*DBHall.__table__.columns)
+        try:
+            halls = [Hall(**row._mapping) for row in self.db.execute(stmt)]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return halls
+
+    def get_occupancy(self, dimension: str, date_from, date_to, key: str = None) -> list[OccupancyRow]:
+        query = self.db.query(DBOccupancyRollup).filter(
+            DBOccupancyRollup.dimension == dimension,
+            DBOccupancyRollup.day >= date_from,
+            DBOccupancyRollup.day <= date_to
+        )
+        if key is not None:
+            query = query.filter(DBOccupancyRollup.key == key)
+        rows = query.order_by(DBOccupancyRollup.day, DBOccupancyRollup.key).all()
+        return [OccupancyRow.model_validate(row) for row in rows]
+
+    def rebuild_occupancy(self) -> int:
+        # Полный пересчёт агрегатов из сеансов и заказов: для первичного заполнения и сверки
+        self._occupancy.flush()
+        sold = (
+            select(DBOrder.session_id, func.sum(DBOrder.ticket_count).label('sold'))
+            .where(DBOrder.status.in_(('pending', 'paid')))
+            .group_by(DBOrder.session_id)
+            .subquery()
+        )
+        sold_seats = func.coalesce(sold.c.sold, 0)
+        day = func.date(DBSession.start_time)
+        groups = self.db.execute(
+            select(
+                DBSession.movie_id, DBSession.cinema_id, DBSession.hall_name, day.label('day'),
+                func.count().label('sessions'),
+                func.sum(DBSession.available_seats + sold_seats).label('offered'),
+                func.sum(sold_seats).label('sold')
+            )
+            .select_from(DBSession)
+            .outerjoin(sold, sold.c.session_id == DBSession.session_id)
+            .group_by(DBSession.movie_id, DBSession.cinema_id, DBSession.hall_name, day)
+        ).all()
+
+        totals: dict[tuple, list[int]] = {}
+        for group in groups:
+            for dimension, key in OCCUPANCY_DIMENSIONS.items():
+                row = totals.setdefault((dimension, key(group.movie_id, group.cinema_id, group.hall_name), group.day), [0, 0, 0])
+                row[0] += group.sessions
+                row[1] += int(group.offered)
+                row[2] += int(group.sold)
+
+        now = datetime.now()
+        try:
+            self.db.query(DBOccupancyRollup).delete()
+            if totals:
+                self.db.execute(insert(DBOccupancyRollup), [
+                    {
+                        'dimension': dimension, 'key': key, 'day': day, 'sessions': sessions,
+                        'seats_offered': offered, 'seats_sold': sold_count, 'updated_at': now
+                    }
+                    for (dimension, key, day), (sessions, offered, sold_count) in totals.items()
+                ])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return len(totals)
+
+
+def _copy_field(value) -> str:
+    # NULL - пустое поле без кавычек, всё остальное в кавычках, поэтому "" остаётся пустой строкой
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        items = ('"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value)
+        value = '{' + ','.join(items) + '}'
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
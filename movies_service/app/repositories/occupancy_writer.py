@@ -0,0 +1,124 @@
+import os
+import threading
+from datetime import date, datetime
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..database import SessionLocal, DEFAULT_CINEMA_ID, PRIMARY_SHARD, session_factories
+from ..schemas.movie import OccupancyRollup as DBOccupancyRollup
+
+OCCUPANCY_FLUSH_INTERVAL = float(os.getenv("OCCUPANCY_FLUSH_INTERVAL", "1"))
+
+
+
+def hall_key(cinema_id: str, hall_name: str) -> str:
+    # Залы основного кинотеатра сохраняют прежние ключи без префикса
+    return hall_name if cinema_id == DEFAULT_CINEMA_ID else f"{cinema_id}/{hall_name}"
+
+
+# Разрезы агрегатов: ключ строки для сеанса (фильм, кинотеатр, зал)
+OCCUPANCY_DIMENSIONS = {
+    'day': lambda movie_id, cinema_id, hall_name: '',
+    'cinema': lambda movie_id, cinema_id, hall_name: cinema_id,
+    'hall': lambda movie_id, cinema_id, hall_name: hall_key(cinema_id, hall_name),
+    'movie': lambda movie_id, cinema_id, hall_name: str(movie_id),
+}
+
+
+# Накопитель приращений заполняемости. Заказы одного дня иначе упирались бы в одну
+# строку агрегата, поэтому приращения складываются в памяти и раз в интервал
+# уходят одним upsert. Записываются только уже зафиксированные изменения.
+class OccupancyWriter:
+    def __init__(self, session_factory=SessionLocal, flush_interval: float = OCCUPANCY_FLUSH_INTERVAL):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str, date], list[int]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, movie_id: UUID, hall_name: str, start_time: datetime,
+               sessions: int = 0, seats_offered: int = 0, seats_sold: int = 0,
+               cinema_id: str = DEFAULT_CINEMA_ID):
+        day = start_time.date()
+        with self._lock:
+            for dimension, key in OCCUPANCY_DIMENSIONS.items():
+                totals = self._pending.setdefault((dimension, key(movie_id, cinema_id, hall_name), day), [0, 0, 0])
+                totals[0] += sessions
+                totals[1] += seats_offered
+                totals[2] += seats_sold
+        self._ensure_started()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self._upsert(pending)
+        except Exception:
+            # Возвращаем приращения в буфер, чтобы не потерять их до следующей попытки
+            with self._lock:
+                for row_key, (sessions, offered, sold) in pending.items():
+                    totals = self._pending.setdefault(row_key, [0, 0, 0])
+                    totals[0] += sessions
+                    totals[1] += offered
+                    totals[2] += sold
+            raise
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="occupancy-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def _upsert(self, pending: dict[tuple[str, str, date], list[int]]):
+        now = datetime.now()
+        # Строки в одном порядке во всех воркерах, чтобы upsert'ы не блокировали друг друга по кругу
+        rows = [
+            {
+                'dimension': dimension, 'key': key, 'day': day,
+                'sessions': sessions, 'seats_offered': offered, 'seats_sold': sold, 'updated_at': now
+            }
+            for (dimension, key, day), (sessions, offered, sold) in sorted(pending.items())
+        ]
+        stmt = pg_insert(DBOccupancyRollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBOccupancyRollup.dimension, DBOccupancyRollup.key, DBOccupancyRollup.day],
+            set_={
+                'sessions': DBOccupancyRollup.sessions + stmt.excluded.sessions,
+                'seats_offered': DBOccupancyRollup.seats_offered + stmt.excluded.seats_offered,
+                'seats_sold': DBOccupancyRollup.seats_sold + stmt.excluded.seats_sold,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db = self._session_factory()
+        try:
+            db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Агрегаты лежат в шарде сеанса, поэтому накопитель у каждого шарда свой
+occupancy_writers = {name: OccupancyWriter(factory) for name, factory in session_factories.items()}
+occupancy_writer = occupancy_writers[PRIMARY_SHARD]
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from sqlalchemy import insert
+from ..database import SessionLocal, PRIMARY_SHARD, session_factories
+from ..models.movie import Order
+from ..schemas.movie import Order as DBOrder, OrderItem as DBOrderItem, OrderHold as DBOrderHold
+
+ORDER_BATCH_SIZE = int(os.getenv("ORDER_BATCH_SIZE", "200"))
+ORDER_BATCH_WAIT_MS = float(os.getenv("ORDER_BATCH_WAIT_MS", "5"))
+ORDER_WRITE_TIMEOUT = float(os.getenv("ORDER_WRITE_TIMEOUT", "10"))
+
+
+# Write-behind с групповой фиксацией: заказы из параллельных запросов копятся
+# в очереди и пишутся одной транзакцией. Запрос ждёт свой Future, поэтому
+# ответ уходит клиенту только после COMMIT.
+class OrderWriter:
+    def __init__(self, session_factory=SessionLocal, batch_size: int = ORDER_BATCH_SIZE,
+                 batch_wait_ms: float = ORDER_BATCH_WAIT_MS):
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def write(self, order: Order, timeout: float = ORDER_WRITE_TIMEOUT):
+        # Ошибка отсюда значит, что заказ точно не записан: по ней вызывающий возвращает места
+        future = self.submit(order)
+        try:
+            future.result(timeout)
+        except FutureTimeoutError:
+            # До 3.11 это не встроенный TimeoutError. Заказ ещё в очереди - снимаем его.
+            # Если его пачка уже пишется, ждём COMMIT или ROLLBACK: иначе заказ сохранится после возврата мест
+            if future.cancel():
+                raise
+            future.result()
+
+    def submit(self, order: Order) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((order, future))
+        return future
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self._batch_wait
+            stop = False
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: list[tuple[Order, Future]]):
+        # Снятые по таймауту заказы не пишем; остальные отменить уже нельзя
+        batch = [(order, future) for order, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            self._insert([order for order, _ in batch])
+        except Exception:
+            # Один плохой заказ не должен ронять всю пачку: пишем по одному
+            for order, future in batch:
+                try:
+                    self._insert([order])
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            future.set_result(None)
+
+    def _insert(self, orders: list[Order]):
+        db = self._session_factory()
+        try:
+            db.execute(insert(DBOrder), [order.model_dump(exclude={'items', 'hold'}) for order in orders])
+            items = [
+                {**item.model_dump(), 'order_id': order.order_id}
+                for order in orders
+                for item in order.items
+            ]
+            if items:
+                db.execute(insert(DBOrderItem), items)
+            # Бронь пишется в той же транзакции, что и заказ: сборщик не увидит бронь без заказа
+            holds = [order.hold.model_dump() for order in orders if order.hold is not None]
+            if holds:
+                db.execute(insert(DBOrderHold), holds)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Заказ пишется в шард сеанса: у каждого шарда своя очередь и своя групповая фиксация
+order_writers = {name: OrderWriter(factory) for name, factory in session_factories.items()}
+order_writer = order_writers[PRIMARY_SHARD]
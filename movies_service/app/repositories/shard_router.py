@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+from uuid import UUID
+from ..database import PRIMARY_SHARD, session_factories, shard_for_cinema
+from .db_movie_repo import MovieRepo
+
+T = TypeVar("T")
+
+# Сколько последних сеансов помнить вместе с их шардом
+SESSION_SHARD_CACHE_SIZE = int(os.getenv("SESSION_SHARD_CACHE_SIZE", "100000"))
+
+
+# Маршрутизация по шардам: кинотеатр -> шард по настройке, сеанс -> шард по
+# кэшу или опросу всех шардов. Чтения без кинотеатра расходятся по шардам
+# параллельно, каждое в своём соединении.
+class ShardRouter:
+    def __init__(self, factories: dict = None, primary: str = PRIMARY_SHARD,
+                 cinema_router: Callable[[str], str] = shard_for_cinema,
+                 cache_size: int = SESSION_SHARD_CACHE_SIZE):
+        self._factories = factories if factories is not None else session_factories
+        self.primary = primary
+        self._cinema_router = cinema_router
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._session_shards: OrderedDict[UUID, str] = OrderedDict()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def shards(self) -> list[str]:
+        return list(self._factories)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self._factories) > 1
+
+    def repo(self, shard: str) -> MovieRepo:
+        return MovieRepo(self._factories[shard](), shard=shard)
+
+    def shard_for_cinema(self, cinema_id: str) -> str:
+        return self._cinema_router(cinema_id)
+
+    def remember(self, session_id: UUID, shard: str):
+        with self._lock:
+            self._session_shards[session_id] = shard
+            self._session_shards.move_to_end(session_id)
+            while len(self._session_shards) > self._cache_size:
+                self._session_shards.popitem(last=False)
+
+    def shard_for_session(self, session_id: UUID) -> str:
+        # Сеанс не переезжает между кинотеатрами, поэтому кэш не устаревает
+        if not self.sharded:
+            return self.primary
+        with self._lock:
+            shard = self._session_shards.get(session_id)
+        if shard is not None:
+            return shard
+        found = self.fan_out(lambda repo: repo.get_available_seats([session_id]))
+        for shard, seats in found.items():
+            if session_id in seats:
+                self.remember(session_id, shard)
+                return shard
+        raise KeyError(f"Session with id={session_id} not found")
+
+    def repo_for_session(self, session_id: UUID) -> MovieRepo:
+        return self.repo(self.shard_for_session(session_id))
+
+    def fan_out(self, fn: Callable[[MovieRepo], T]) -> dict[str, T]:
+        shards = self.shards
+        if len(shards) == 1:
+            return {shards[0]: self._call(shards[0], fn)}
+        executor = self._get_executor()
+        futures = {shard: executor.submit(self._call, shard, fn) for shard in shards}
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def find(self, fn: Callable[[MovieRepo], T]) -> T:
+        # Объект лежит ровно в одном шарде: в остальных fn бросает KeyError
+        error = None
+        for result in self.fan_out(lambda repo: _catch_key_error(fn, repo)).values():
+            if isinstance(result, KeyError):
+                error = result
+            else:
+                return result
+        raise error
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _call(self, shard: str, fn: Callable[[MovieRepo], T]) -> T:
+        repo = self.repo(shard)
+        try:
+            return fn(repo)
+        finally:
+            repo.db.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4 * len(self._factories), thread_name_prefix="shard")
+            return self._executor
+
+
+def _catch_key_error(fn, repo):
+    try:
+        return fn(repo)
+    except KeyError as e:
+        return e
+
+
+shard_router = ShardRouter()
@@ -1,6 +1,14 @@
-from sqlalchemy import Column, String, DateTime, Integer, ARRAY
-from sqlalchemy.dialects.postgresql import UUID
-from ..database import Base
+from sqlalchemy import Column, String, Date, DateTime, Integer, Numeric, LargeBinary, Index, func, literal_column
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from ..database import Base, DEFAULT_CINEMA_ID
+
+
+def search_vector(title, description):
+    # Выражение должно совпадать с индексом ix_movies_search, иначе индекс не используется
+    config = literal_column("'simple'::regconfig")
+    return func.setweight(func.to_tsvector(config, title), literal_column("'A'")).op('||')(
+        func.setweight(func.to_tsvector(config, description), literal_column("'B'"))
+    )
 
 
 class Movie(Base):
@@ -15,14 +23,161 @@ class Movie(Base):
     created_at = Column(DateTime, nullable=False)
     updated_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index('ix_movies_search', search_vector(title, description), postgresql_using='gin'),
+        Index('ix_movies_genre', genre, postgresql_using='gin'),
+    )
+
 
 class Session(Base):
     __tablename__ = 'sessions'
+    __table_args__ = (
+        # Расписание фильма за период и общее расписание за период
+        Index('ix_sessions_movie_id_start_time', 'movie_id', 'start_time'),
+        Index('ix_sessions_start_time', 'start_time'),
+        # Занятость залов кинотеатра при планировании
+        Index('ix_sessions_cinema_hall_start', 'cinema_id', 'hall_name', 'start_time'),
+    )
 
     session_id = Column(UUID(as_uuid=True), primary_key=True)
-    movie_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    movie_id = Column(UUID(as_uuid=True), nullable=False)
+    cinema_id = Column(String, nullable=False, server_default=DEFAULT_CINEMA_ID)
     start_time = Column(DateTime, nullable=False)
     hall_name = Column(String, nullable=False)
     available_seats = Column(Integer, nullable=False)
     created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    updated_at = Column(DateTime, nullable=True)
+
+
+class SeatMap(Base):
+    __tablename__ = 'seat_maps'
+
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    capacity = Column(Integer, nullable=False)
+    row_length = Column(Integer, nullable=False)
+    sold = Column(LargeBinary, nullable=False)
+    held = Column(LargeBinary, nullable=False)
+    next_hold_expiry = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class SeatHold(Base):
+    __tablename__ = 'seat_holds'
+
+    hold_id = Column(UUID(as_uuid=True), primary_key=True)
+    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    seats = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+
+# Витрина "сейчас в прокате": будущие сеансы вместе с данными фильма,
+# поддерживается при изменении сеансов, фильмов и заказов
+class NowShowing(Base):
+    __tablename__ = 'now_showing'
+
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    movie_id = Column(UUID(as_uuid=True), nullable=False)
+    title = Column(String, nullable=False)
+    poster_url = Column(String, nullable=False)
+    genre = Column(ARRAY(String), nullable=False)
+    duration_minutes = Column(Integer, nullable=False)
+    start_time = Column(DateTime, nullable=False, index=True)
+    cinema_id = Column(String, nullable=False, server_default=DEFAULT_CINEMA_ID)
+    hall_name = Column(String, nullable=False)
+    available_seats = Column(Integer, nullable=False)
+
+
+
+class Order(Base):
+    __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+    order_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    ticket_count = Column(Integer, nullable=False)
+    total_amount = Column(Numeric(10, 2), nullable=False)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class OrderItem(Base):
+    __tablename__ = 'order_items'
+
+    order_id = Column(UUID(as_uuid=True), primary_key=True)
+    line_no = Column(Integer, primary_key=True)
+    seat_label = Column(String, nullable=True)
+    price = Column(Numeric(10, 2), nullable=False)
+
+
+# Правила цены билета: пустое поле правила подходит под любое значение
+class PricingRule(Base):
+    __tablename__ = 'pricing_rules'
+
+    rule_id = Column(UUID(as_uuid=True), primary_key=True)
+    hall_name = Column(String, nullable=True)
+    movie_id = Column(UUID(as_uuid=True), nullable=True)
+    weekday = Column(Integer, nullable=True)
+    time_slot = Column(String, nullable=True)
+    price = Column(Numeric(10, 2), nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+# Сеансы в режиме "горячей" продажи: места списывает единственный актор на сеанс
+class HotSession(Base):
+    __tablename__ = 'hot_sessions'
+
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    enabled_at = Column(DateTime, nullable=False)
+
+
+# Временная бронь мест под неоплаченный заказ; просроченные возвращает фоновый сборщик
+class OrderHold(Base):
+    __tablename__ = 'order_holds'
+    __table_args__ = (
+        Index('ix_order_holds_active_expires_at', 'expires_at', postgresql_where=literal_column("status = 'active'")),
+    )
+
+    hold_id = Column(UUID(as_uuid=True), primary_key=True)
+    order_id = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    session_id = Column(UUID(as_uuid=True), nullable=False)
+    ticket_count = Column(Integer, nullable=False)
+    seats = Column(ARRAY(String), nullable=False, default=list)
+    expires_at = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class Hall(Base):
+    __tablename__ = 'halls'
+
+    cinema_id = Column(String, primary_key=True, server_default=DEFAULT_CINEMA_ID)
+    hall_name = Column(String, primary_key=True)
+    capacity = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+# Заполняемость по дням в разрезах day (ключ пустой), cinema, hall и movie;
+# пополняется приращениями при создании сеансов и заказах
+class OccupancyRollup(Base):
+    __tablename__ = 'occupancy_rollups'
+    __table_args__ = (
+        Index('ix_occupancy_rollups_dimension_day', 'dimension', 'day'),
+    )
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)
+    seats_offered = Column(Integer, nullable=False, default=0)
+    seats_sold = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
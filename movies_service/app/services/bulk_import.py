@@ -0,0 +1,171 @@
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Iterable, Iterator
+from uuid import uuid4
+from pydantic import BaseModel, ValidationError
+from ..models.movie import MovieImportRow, SessionImportRow, ImportResult, ImportLineError, Session
+from ..repositories.db_movie_repo import MovieRepo
+from ..repositories.shard_router import ShardRouter
+from .catalog_cache import catalog_cache
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def _movie_row(row: MovieImportRow, now: datetime) -> tuple:
+    return (row.film_id or uuid4(), row.title, row.description, row.duration_minutes,
+            row.genre, row.poster_url, now)
+
+
+def _session_row(row: SessionImportRow, now: datetime) -> tuple:
+    return (row.session_id or uuid4(), row.movie_id, row.cinema_id, row.start_time, row.hall_name,
+            row.available_seats, now)
+
+
+# вид импорта -> (модель строки, таблица, колонки COPY, преобразование в кортеж)
+IMPORT_KINDS = {
+    'movies': (
+        MovieImportRow, 'movies',
+        ['film_id', 'title', 'description', 'duration_minutes', 'genre', 'poster_url', 'created_at'],
+        _movie_row
+    ),
+    'sessions': (
+        SessionImportRow, 'sessions',
+        ['session_id', 'movie_id', 'cinema_id', 'start_time', 'hall_name', 'available_seats', 'created_at'],
+        _session_row
+    ),
+}
+# Фильмы пишутся upsert'ом по film_id: уже записанный фильм (повтор импорта, тот же id
+# в новой выгрузке) обновляется, а не отклоняет всю пачку. Одинаково с шардами и без
+IMPORT_UPSERT_KEYS = {'movies': 'film_id'}
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, dict | Exception]]:
+    if fmt == 'ndjson':
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, e
+    elif fmt == 'csv':
+        # Жанры в CSV перечисляются через "|", пустые ячейки считаются отсутствующими
+        reader = csv.DictReader(lines)
+        for record in reader:
+            record = {key: value for key, value in record.items() if value not in ('', None)}
+            if 'genre' in record:
+                record['genre'] = [genre.strip() for genre in record['genre'].split('|') if genre.strip()]
+            yield reader.line_num, record
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+class BulkImporter:
+    def __init__(self, movie_repo: MovieRepo, batch_size: int = IMPORT_BATCH_SIZE, shards: ShardRouter = None):
+        self.movie_repo = movie_repo
+        self.batch_size = batch_size
+        self.shards = shards if shards is not None and shards.sharded else None
+
+    def run(self, kind: str, fmt: str, lines: Iterable[str]) -> ImportResult:
+        if kind not in IMPORT_KINDS:
+            raise ValueError(f"Unsupported import kind: {kind}")
+        row_model, table, columns, to_row = IMPORT_KINDS[kind]
+
+        result = ImportResult(kind=kind, imported=0, failed=0, errors=[])
+        batch: list[tuple] = []
+        batch_lines: list[int] = []
+        now = datetime.now()
+
+        for line_no, record in read_records(lines, fmt):
+            if isinstance(record, Exception):
+                self._report(result, line_no, f"Invalid JSON: {record}")
+                continue
+            try:
+                row: BaseModel = row_model.model_validate(record)
+            except ValidationError as e:
+                self._report(result, line_no, _format_validation_error(e))
+                continue
+
+            batch.append(to_row(row, now))
+            batch_lines.append(line_no)
+            if len(batch) >= self.batch_size:
+                self._flush(result, table, columns, batch, batch_lines)
+
+        if batch:
+            self._flush(result, table, columns, batch, batch_lines)
+        if kind == 'movies' and result.imported:
+            catalog_cache.invalidate()
+        return result
+
+    def _flush(self, result: ImportResult, table: str, columns: list[str],
+               batch: list[tuple], batch_lines: list[int]):
+        if self.shards is None:
+            self._copy(result, self.movie_repo, table, columns, list(batch), list(batch_lines))
+        elif table == 'movies':
+            # Каталог нужен в каждом шарде; строки засчитываются, только если легли во все.
+            # Повтор импорта после сбоя одного шарда не падает на тех, где строки уже есть
+            failed = [
+                e for e in self.shards.fan_out(lambda repo: _try_copy(repo, table, columns, list(batch))).values()
+                if e is not None
+            ]
+            self._count(result, batch_lines, failed[0] if failed else None)
+        else:
+            # Сеансы раскладываются по шардам своих кинотеатров, пачка атомарна внутри шарда
+            cinema = columns.index('cinema_id')
+            groups: dict[str, tuple[list, list]] = {}
+            for row, line_no in zip(batch, batch_lines):
+                rows, lines = groups.setdefault(self.shards.shard_for_cinema(row[cinema]), ([], []))
+                rows.append(row)
+                lines.append(line_no)
+            for shard, (rows, lines) in groups.items():
+                repo = self.shards.repo(shard)
+                try:
+                    self._copy(result, repo, table, columns, rows, lines)
+                finally:
+                    repo.db.close()
+        batch.clear()
+        batch_lines.clear()
+
+    def _copy(self, result: ImportResult, repo: MovieRepo, table: str, columns: list[str],
+              rows: list[tuple], lines: list[int]):
+        error = _try_copy(repo, table, columns, rows)
+        if error is None and table == 'sessions':
+            repo.record_sessions_offered([Session(**dict(zip(columns, row))) for row in rows])
+        self._count(result, lines, error)
+
+    def _count(self, result: ImportResult, lines: list[int], error: Exception | None):
+        if error is None:
+            result.imported += len(lines)
+            return
+        # Пачка COPY атомарна: при ошибке БД отклоняются все её строки
+        message = str(error).strip().splitlines()[0] if str(error).strip() else type(error).__name__
+        for line_no in lines:
+            self._report(result, line_no, f"Batch rejected: {message}")
+
+    @staticmethod
+    def _report(result: ImportResult, line_no: int, error: str):
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(ImportLineError(line=line_no, error=error))
+
+
+def _try_copy(repo: MovieRepo, table: str, columns: list[str], rows: list[tuple]) -> Exception | None:
+    upsert_key = IMPORT_UPSERT_KEYS.get(table)
+    try:
+        if upsert_key is None:
+            repo.copy_rows(table, columns, rows)
+        else:
+            repo.copy_rows(table, columns, rows, upsert_key=upsert_key)
+    except Exception as e:
+        return e
+    return None
@@ -0,0 +1,53 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Callable
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+
+# Готовое JSON-тело каталога и его ETag, общие для всех запросов процесса.
+# Запись в каталог увеличивает версию и сбрасывает тело, TTL страхует
+# от изменений, сделанных другими воркерами.
+class CatalogCache:
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._version = 0
+        self._body: bytes | None = None
+        self._etag: str | None = None
+        self._loaded_at = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, render: Callable[[], bytes]) -> tuple[bytes, str]:
+        body, etag = self._body, self._etag
+        if body is not None and time.monotonic() - self._loaded_at < self._ttl:
+            return body, etag
+
+        with self._lock:
+            if self._body is not None and time.monotonic() - self._loaded_at < self._ttl:
+                return self._body, self._etag
+            version = self._version
+
+        body = render()
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+        with self._lock:
+            # Если каталог поменялся во время рендера, не кешируем устаревшее тело
+            if version == self._version:
+                self._body, self._etag = body, etag
+                self._loaded_at = time.monotonic()
+        return body, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._body = None
+            self._etag = None
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'value', 'max_end', 'height', 'left', 'right')
+
+    def __init__(self, start, end, value):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.max_end = end
+        self.height = 1
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node else 0
+
+
+def _update(node: _Node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rebalance(node: _Node) -> _Node:
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+# Интервальное дерево на AVL: ключ - начало, в узле хранится максимум концов поддерева.
+# Интервалы полуоткрытые [start, end), вставка и поиск пересечения за O(log n).
+class IntervalTree:
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start, end, value: Any = None):
+        if not start < end:
+            raise ValueError("Interval start must be before its end")
+        self._root = self._insert(self._root, _Node(start, end, value))
+        self._size += 1
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if new.start < node.start:
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _rebalance(node)
+
+    def find_overlap(self, start, end) -> Optional[tuple]:
+        node = self._root
+        while node is not None:
+            if node.start < end and start < node.end:
+                return node.start, node.end, node.value
+            # Если пересечение есть, то в левом поддереве оно найдётся всегда, когда его max_end > start
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            else:
+                node = node.right
+        return None
+
+
+# Индекс занятости залов: отдельное интервальное дерево на каждый зал
+class HallScheduleIndex:
+    def __init__(self):
+        self._halls: dict[str, IntervalTree] = {}
+
+    def add(self, hall_name: str, start: datetime, end: datetime, value: Any = None):
+        self._halls.setdefault(hall_name, IntervalTree()).insert(start, end, value)
+
+    def find_conflict(self, hall_name: str, start: datetime, end: datetime) -> Optional[tuple]:
+        tree = self._halls.get(hall_name)
+        return tree.find_overlap(start, end) if tree else None
+
+
+def round_up(moment: datetime, step_minutes: int) -> datetime:
+    step = timedelta(minutes=step_minutes)
+    midnight = datetime.combine(moment.date(), datetime.min.time())
+    remainder = (moment - midnight) % step
+    return moment if not remainder else moment + (step - remainder)
+
+
+def plan_sessions(
+    index: HallScheduleIndex,
+    movies: list[tuple[Any, int]],
+    hall_names: list[str],
+    days: list[date],
+    opening_time,
+    closing_time,
+    cleanup_minutes: int,
+    slot_step_minutes: int
+) -> tuple[list[tuple[Any, str, datetime]], int]:
+    # movies - пары (id фильма, длительность в минутах); фильмы идут по кругу,
+    # каждый зал начинает со своего фильма, чтобы премьеры не стартовали одновременно
+    placed = []
+    conflicts = 0
+    cleanup = timedelta(minutes=cleanup_minutes)
+
+    for day in days:
+        day_close = datetime.combine(day, closing_time)
+        for hall_number, hall_name in enumerate(hall_names):
+            rotation = hall_number
+            cursor = round_up(datetime.combine(day, opening_time), slot_step_minutes)
+            while cursor < day_close:
+                movie_id, duration_minutes = movies[rotation % len(movies)]
+                end = cursor + timedelta(minutes=duration_minutes)
+                conflict = index.find_conflict(hall_name, cursor, end + cleanup)
+                if conflict is not None:
+                    conflicts += 1
+                    cursor = round_up(max(conflict[1], cursor + timedelta(minutes=slot_step_minutes)), slot_step_minutes)
+                    continue
+
+                index.add(hall_name, cursor, end + cleanup, movie_id)
+                placed.append((movie_id, hall_name, cursor))
+                rotation += 1
+                cursor = round_up(end + cleanup, slot_step_minutes)
+
+    return placed, conflicts
@@ -0,0 +1,86 @@
+import os
+import threading
+from functools import partial
+from typing import Callable
+from prometheus_client import Counter, Gauge
+from ..database import PRIMARY_SHARD
+from ..repositories.db_movie_repo import MovieRepo
+from ..repositories.shard_router import shard_router
+
+HOLD_SWEEP_INTERVAL = float(os.getenv("HOLD_SWEEP_INTERVAL", "5"))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "200"))
+# Ограничение пачек за один проход, чтобы поток не застревал на большом завале
+HOLD_SWEEP_MAX_BATCHES = int(os.getenv("HOLD_SWEEP_MAX_BATCHES", "50"))
+
+HOLDS_RELEASED = Counter(
+    "order_holds_released_total",
+    "Expired order holds returned to available seats",
+    ["shard"]
+)
+
+HOLD_SWEEP_LAG = Gauge(
+    "order_hold_sweep_lag_seconds",
+    "How long the oldest released hold had been expired when the sweeper reached it",
+    ["shard"]
+)
+
+
+# Фоновый сборщик просроченных броней. Каждая пачка - отдельная транзакция
+# с FOR UPDATE SKIP LOCKED, поэтому его можно запускать в каждой реплике.
+# Брони лежат в шарде сеанса, поэтому на каждый шард свой сборщик.
+class HoldSweeper:
+    def __init__(self, repo_factory: Callable[[], MovieRepo] = partial(shard_router.repo, PRIMARY_SHARD),
+                 interval: float = HOLD_SWEEP_INTERVAL, batch_size: int = HOLD_SWEEP_BATCH_SIZE,
+                 max_batches: int = HOLD_SWEEP_MAX_BATCHES, shard: str = PRIMARY_SHARD):
+        self._repo_factory = repo_factory
+        self._shard = shard
+        self._interval = interval
+        self._batch_size = batch_size
+        self._max_batches = max_batches
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"hold-sweeper-{self._shard}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def sweep(self) -> int:
+        repo = self._repo_factory()
+        total = 0
+        try:
+            for _ in range(self._max_batches):
+                released, lag = repo.release_expired_order_holds(self._batch_size)
+                if not released:
+                    HOLD_SWEEP_LAG.labels(self._shard).set(0)
+                    break
+                total += released
+                HOLDS_RELEASED.labels(self._shard).inc(released)
+                HOLD_SWEEP_LAG.labels(self._shard).set(lag)
+                if released < self._batch_size:
+                    break
+        finally:
+            repo.db.close()
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.sweep()
+            except Exception:
+                # БД может быть временно недоступна - пробуем на следующем шаге
+                pass
+
+
+hold_sweepers = [
+    HoldSweeper(partial(shard_router.repo, shard), shard=shard) for shard in shard_router.shards
+]
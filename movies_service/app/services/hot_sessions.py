@@ -0,0 +1,253 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable
+from uuid import UUID
+from ..models.movie import Session
+from ..repositories.db_movie_repo import MovieRepo
+from ..repositories.shard_router import shard_router
+
+HOT_SESSION_BATCH_SIZE = int(os.getenv("HOT_SESSION_BATCH_SIZE", "500"))
+HOT_SESSION_CHECK_INTERVAL = float(os.getenv("HOT_SESSION_CHECK_INTERVAL", "2"))
+HOT_SESSION_TIMEOUT = float(os.getenv("HOT_SESSION_TIMEOUT", "10"))
+# Сколько раз перечитать счётчик, если места параллельно списал кто-то помимо актора
+HOT_SESSION_RELOADS = 3
+
+
+def _default_repo_factory(session_id: UUID) -> MovieRepo:
+    # Актор пишет в шард кинотеатра своего сеанса
+    return shard_router.repo_for_session(session_id)
+
+
+# Актор одного сеанса: держит счётчик мест в памяти и разбирает заявки из очереди
+# по одной. Пока идёт запись в БД, новые заявки копятся в очереди и следующей
+# пачкой уходят одним UPDATE. Заявка подтверждается только после COMMIT,
+# поэтому после падения процесса счётчик просто перечитывается из sessions.
+# Заявка с отрицательным числом мест - возврат мест (откат несохранённого заказа).
+class SessionActor:
+    def __init__(self, session_id: UUID, repo_factory: Callable[[UUID], MovieRepo], batch_size: int):
+        self.session_id = session_id
+        self.available: int | None = None
+        self._repo_factory = repo_factory
+        self._batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, ticket_count: int, future: Future):
+        self._queue.put_nowait((ticket_count, future))
+
+    def stop(self):
+        self._queue.put_nowait(None)
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = False
+            while len(batch) < self._batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._process(batch)
+            if stop:
+                return
+
+    async def _process(self, batch: list[tuple[int, Future]]):
+        loop = asyncio.get_running_loop()
+        # Заявки, снятые вызывающим по таймауту, не исполняем; остальные отменить уже нельзя
+        batch = [(ticket_count, future) for ticket_count, future in batch if future.set_running_or_notify_cancel()]
+        releases = [(-ticket_count, future) for ticket_count, future in batch if ticket_count < 0]
+        requests = [(ticket_count, future) for ticket_count, future in batch if ticket_count > 0]
+        if releases:
+            try:
+                self.available = await loop.run_in_executor(None, self._release, sum(c for c, _ in releases))
+            except Exception as e:
+                self.available = None
+                for _, future in releases:
+                    future.set_exception(e)
+            else:
+                for _, future in releases:
+                    future.set_result(self.available)
+        if not requests:
+            return
+
+        try:
+            fresh = False
+            if self.available is None:
+                self.available = await loop.run_in_executor(None, self._load)
+                fresh = True
+            for _ in range(HOT_SESSION_RELOADS):
+                granted, remaining = [], self.available
+                for ticket_count, future in requests:
+                    if ticket_count <= remaining:
+                        granted.append(future)
+                        remaining -= ticket_count
+                if len(granted) < len(requests) and not fresh:
+                    # Места могли вернуться в sessions мимо актора (сборщик броней):
+                    # перед отказом перечитываем счётчик
+                    self.available = await loop.run_in_executor(None, self._load)
+                    fresh = True
+                    continue
+                if not granted:
+                    break
+                total = self.available - remaining
+                try:
+                    session = await loop.run_in_executor(None, self._persist, total)
+                except ValueError:
+                    # В БД мест меньше, чем думал актор: перечитываем и раздаём заново
+                    self.available = await loop.run_in_executor(None, self._load)
+                    fresh = True
+                    continue
+                self.available = session.available_seats
+                for future in granted:
+                    future.set_result(session)
+                break
+        except Exception as e:
+            self.available = None
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for _, future in requests:
+            if not future.done():
+                future.set_exception(ValueError("Not enough available seats"))
+
+    def _load(self) -> int:
+        repo = self._repo_factory(self.session_id)
+        try:
+            return repo.get_session_by_id(self.session_id).available_seats
+        finally:
+            repo.db.close()
+
+    def _persist(self, ticket_count: int) -> Session:
+        repo = self._repo_factory(self.session_id)
+        try:
+            return repo.reserve_seats(self.session_id, ticket_count)
+        finally:
+            repo.db.close()
+
+    def _release(self, ticket_count: int) -> int:
+        repo = self._repo_factory(self.session_id)
+        try:
+            return repo.release_seats(self.session_id, ticket_count)
+        finally:
+            repo.db.close()
+
+
+# Реестр горячих сеансов. Акторы живут в отдельном потоке с event loop,
+# синхронные обработчики отдают им заявки и ждут результат. Список горячих
+# сеансов хранится в БД и перечитывается не чаще раза в интервал.
+class HotSessionRegistry:
+    def __init__(self, repo_factory: Callable[[UUID], MovieRepo] = _default_repo_factory,
+                 batch_size: int = HOT_SESSION_BATCH_SIZE,
+                 check_interval: float = HOT_SESSION_CHECK_INTERVAL):
+        self._repo_factory = repo_factory
+        self._batch_size = batch_size
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._actors: dict[UUID, SessionActor] = {}
+        self._hot: frozenset = frozenset()
+        self._checked_at: float | None = None
+
+    def refresh(self, movie_repo):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self._check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self._check_interval:
+                return
+            self._set_hot(frozenset(movie_repo.get_hot_session_ids()))
+            self._checked_at = time.monotonic()
+
+    def is_hot(self, session_id: UUID) -> bool:
+        return session_id in self._hot
+
+    def enable(self, session_id: UUID):
+        with self._lock:
+            self._set_hot(self._hot | {session_id})
+
+    def disable(self, session_id: UUID):
+        with self._lock:
+            self._set_hot(self._hot - {session_id})
+
+    def reserve(self, session_id: UUID, ticket_count: int, timeout: float = HOT_SESSION_TIMEOUT) -> Session:
+        future = self._submit(session_id, ticket_count)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # До 3.11 это не встроенный TimeoutError. Заявка ещё в очереди - снимаем её,
+            # чтобы она не списала места после ошибки. Если актор уже взял её в работу, дожидаемся исхода записи
+            if future.cancel():
+                raise
+            return future.result()
+
+    def release(self, session_id: UUID, ticket_count: int) -> int:
+        # Возврат идёт через актора, чтобы его счётчик не отстал от sessions.
+        # Отменять возврат нельзя, поэтому ждём без таймаута
+        return self._submit(session_id, -ticket_count).result()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            loop, thread = self._loop, self._thread
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            self._loop = self._thread = None
+
+    def _submit(self, session_id: UUID, ticket_count: int) -> Future:
+        future = Future()
+        self._ensure_started().call_soon_threadsafe(self._enqueue, session_id, ticket_count, future)
+        return future
+
+    def _enqueue(self, session_id: UUID, ticket_count: int, future: Future):
+        # Словарь акторов меняется только в потоке event loop
+        actor = self._actors.get(session_id)
+        if actor is None:
+            actor = self._actors[session_id] = SessionActor(session_id, self._repo_factory, self._batch_size)
+        actor.submit(ticket_count, future)
+
+    async def _retire(self, session_ids: frozenset):
+        for session_id in session_ids:
+            actor = self._actors.pop(session_id, None)
+            if actor is not None:
+                actor.stop()
+
+    async def _shutdown(self):
+        # Даём акторам дописать уже принятые заявки
+        actors = list(self._actors.values())
+        self._actors.clear()
+        for actor in actors:
+            actor.stop()
+        await asyncio.gather(*(actor._task for actor in actors), return_exceptions=True)
+
+    def _set_hot(self, hot: frozenset):
+        retired = self._hot - hot
+        self._hot = hot
+        if retired and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._retire(retired), self._loop)
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        loop = self._loop
+        if loop is not None:
+            return loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="hot-sessions", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+
+hot_sessions = HotSessionRegistry()
@@ -1,109 +1,636 @@
+import base64
+import hashlib
+import heapq
+import os
+from contextlib import contextmanager
+from typing import Iterable, Iterator
 from uuid import UUID, uuid4
-from datetime import datetime, timedelta
-from ..models.movie import Movie, Session, OrderRequest, ScheduleUpdateRequest, UpdateMovieRequest
+from datetime import date, datetime, timedelta
+from ..models.movie import (
+    Movie, Session, OrderRequest, ScheduleUpdateRequest, UpdateMovieRequest,
+    SeatHoldRequest, SeatHoldResponse, MoviesListResponse, ImportResult,
+    ScheduleGenerateRequest, ScheduleGenerateResponse, NowShowingMovie, Order, OrderItem, OrderHold,
+    PricingRule, CreatePricingRuleRequest, SeatAvailabilityRequest, SimilarMovie,
+    Hall, OccupancyReport, OccupancyRow
+)
+from ..database import DEFAULT_CINEMA_ID
 from ..repositories.db_movie_repo import MovieRepo
+from ..repositories.shard_router import shard_router
+from .bulk_import import BulkImporter
+from .catalog_cache import catalog_cache
+from .hall_schedule import HallScheduleIndex, plan_sessions
+from .pricing import pricing_engine
+from .hot_sessions import hot_sessions
+from .seat_bitmap import normalize_label
+from .seat_cache import seat_cache
+from .similar_movies import similar_movies
+from .streaming import stream_items
+
+HALL_CLEANUP_MINUTES = int(os.getenv("HALL_CLEANUP_MINUTES", "15"))
+# Сколько неоплаченный заказ держит места, прежде чем сборщик вернёт их в продажу
+ORDER_HOLD_TTL = int(os.getenv("ORDER_HOLD_TTL", "900"))
 
 
 class MovieService:
     def __init__(self):
+        # Основной шард: каталог фильмов, правила цен, горячие сеансы
         self.movie_repo = MovieRepo()
+        self.shards = shard_router
+        self.pricing = pricing_engine
+        self.hot_sessions = hot_sessions
+        self.seat_cache = seat_cache
+        self.similar_movies = similar_movies
+
+    @contextmanager
+    def _repo_for_cinema(self, cinema_id: str) -> Iterator[MovieRepo]:
+        if not self.shards.sharded:
+            yield self.movie_repo
+            return
+        # Соединение шарда берётся на один вызов сервиса и возвращается в пул, как в fan_out
+        repo = self.shards.repo(self.shards.shard_for_cinema(cinema_id))
+        try:
+            yield repo
+        finally:
+            repo.db.close()
+
+    @contextmanager
+    def _repo_for_session(self, session_id: UUID) -> Iterator[MovieRepo]:
+        if not self.shards.sharded:
+            yield self.movie_repo
+            return
+        repo = self.shards.repo_for_session(session_id)
+        try:
+            yield repo
+        finally:
+            repo.db.close()
+
+    def _fan_out(self, fn) -> list:
+        # Чтение без кинотеатра идёт во все шарды параллельно
+        if not self.shards.sharded:
+            return [fn(self.movie_repo)]
+        return list(self.shards.fan_out(fn).values())
+
+    def _find(self, fn):
+        if not self.shards.sharded:
+            return fn(self.movie_repo)
+        return self.shards.find(fn)
+
+    def _replicate(self, fn) -> Movie:
+        # Каталог фильмов есть в каждом шарде: сначала основной, ошибка в нём
+        # отменяет запись. Остальные шарды параллельно получают готовую строку
+        # upsert'ом по film_id: если какой-то шард упал, повтор запроса или
+        # следующая правка фильма догонит его, а не упрётся в дубликат ключа
+        result = fn(self.movie_repo)
+        if self.shards.sharded:
+            primary = self.shards.primary
+            self.shards.fan_out(lambda repo: None if repo.shard == primary else repo.upsert_movie(result))
+        return result
 
     def get_all_movies(self) -> list[Movie]:
         return self.movie_repo.get_all_movies()
 
+    def get_catalog(self) -> tuple[bytes, str]:
+        # Тело сериализуется один раз на версию каталога
+        return catalog_cache.get(
+            lambda: MoviesListResponse(movies=self.movie_repo.get_all_movies()).model_dump_json().encode()
+        )
+
+    def stream_movies(self, fmt: str) -> Iterator[bytes]:
+        # Выгрузка каталога без промежуточного списка: строки идут из курсора прямо в ответ
+        return stream_items(fmt, "movies", self.movie_repo.iter_movies())
+
+    def stream_schedule(
+        self,
+        fmt: str,
+        movie_id: UUID = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        hall_name: str = None,
+        cinema_id: str = None
+    ) -> Iterator[bytes]:
+        fetch = lambda repo: repo.iter_schedule(movie_id, date_from, date_to, hall_name, cinema_id)
+        if cinema_id is not None:
+            sessions = self._iter_cinema(cinema_id, fetch)
+        elif not self.shards.sharded:
+            sessions = fetch(self.movie_repo)
+        else:
+            # Курсоры шардов уже упорядочены, слияние держит в памяти по одной строке от каждого
+            sessions = heapq.merge(
+                *(self._iter_shard(shard, fetch) for shard in self.shards.shards),
+                key=lambda session: (session.start_time, session.session_id)
+            )
+        return stream_items(fmt, "schedule", sessions)
+
+    def _iter_cinema(self, cinema_id: str, fetch) -> Iterator:
+        with self._repo_for_cinema(cinema_id) as repo:
+            yield from fetch(repo)
+
+    def _iter_shard(self, shard: str, fetch) -> Iterator:
+        repo = self.shards.repo(shard)
+        try:
+            yield from fetch(repo)
+        finally:
+            repo.db.close()
+
+    def search_movies(
+        self,
+        text: str = None,
+        genres: list[str] = None,
+        match_all_genres: bool = True,
+        page: int = 1,
+        page_size: int = 20
+    ) -> tuple[list[Movie], bool]:
+        text = text.strip() if text else None
+        if not text and not genres:
+            raise ValueError("Search query or genre is required")
+
+        movies = self.movie_repo.search_movies(
+            text, genres, match_all_genres, page_size + 1, (page - 1) * page_size
+        )
+        return movies[:page_size], len(movies) > page_size
+
+    def get_now_showing(self, days: int = 7, sessions_per_movie: int = 5,
+                        cinema_id: str = None) -> list[NowShowingMovie]:
+        now = datetime.now()
+        date_to = now + timedelta(days=days)
+        if cinema_id is not None:
+            with self._repo_for_cinema(cinema_id) as repo:
+                return repo.get_now_showing(now, date_to, sessions_per_movie, cinema_id)
+
+        parts = self._fan_out(lambda repo: repo.get_now_showing(now, date_to, sessions_per_movie))
+        if len(parts) == 1:
+            return parts[0]
+        # Сеансы фильма из разных шардов сливаются по времени начала
+        movies: dict[UUID, NowShowingMovie] = {}
+        for part in parts:
+            for movie in part:
+                merged = movies.setdefault(movie.film_id, movie.model_copy(update={'sessions': []}))
+                merged.sessions.extend(movie.sessions)
+        for movie in movies.values():
+            movie.sessions = sorted(movie.sessions, key=lambda item: item.start_time)[:sessions_per_movie]
+        return sorted(movies.values(), key=lambda movie: movie.sessions[0].start_time)
+
+    def refresh_now_showing(self):
+        self._fan_out(lambda repo: repo.refresh_now_showing())
+
     def get_movie_by_id(self, movie_id: UUID) -> Movie:
         return self.movie_repo.get_movie_by_id(movie_id)
 
+    def get_movie_modified_at(self, movie_id: UUID) -> datetime:
+        return self.movie_repo.get_movie_modified_at(movie_id)
+
+    def get_session_modified_at(self, session_id: UUID) -> datetime:
+        with self._repo_for_session(session_id) as repo:
+            return repo.get_session_modified_at(session_id)
+
+    @staticmethod
+    def validators(*parts, modified_at: datetime) -> tuple[str, datetime]:
+        # Слабый ETag из ключа и отметки изменения: сравнивается без сериализации тела
+        raw = "|".join(str(part) for part in (*parts, modified_at.isoformat()))
+        return 'W/"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"', modified_at
+
+    def schedule_validators(self, sessions: list[Session], next_cursor: str | None) -> tuple[str, datetime | None]:
+        # Страница меняется, если меняется её состав или любой сеанс в ней
+        modified = [session.updated_at or session.created_at for session in sessions]
+        raw = "|".join(f"{session.session_id}:{stamp.isoformat()}" for session, stamp in zip(sessions, modified))
+        etag, _ = self.validators(raw, next_cursor, modified_at=max(modified, default=datetime.min))
+        return etag, max(modified, default=None)
+
+    def get_similar_movies(self, movie_id: UUID, k: int = 10) -> list[SimilarMovie]:
+        if not self.similar_movies.is_fresh():
+            self.similar_movies.load(self.movie_repo.get_all_movies())
+        if not self.similar_movies.contains(movie_id):
+            # Фильм мог появиться через другой воркер после сборки матрицы
+            self.similar_movies.upsert(self.movie_repo.get_movie_by_id(movie_id))
+
+        scored = self.similar_movies.similar(movie_id, k)
+        movies = {movie.film_id: movie for movie in self.movie_repo.get_movies_by_ids([i for i, _ in scored])}
+        return [SimilarMovie(movie=movies[i], score=score) for i, score in scored if i in movies]
+
+    def get_movies_batch(self, movie_ids: list[UUID]) -> tuple[list[Movie], list[UUID]]:
+        movie_ids = list(dict.fromkeys(movie_ids))
+        found = {movie.film_id: movie for movie in self.movie_repo.get_movies_by_ids(movie_ids)}
+        return (
+            [found[movie_id] for movie_id in movie_ids if movie_id in found],
+            [movie_id for movie_id in movie_ids if movie_id not in found]
+        )
+
+    def get_sessions_batch(self, session_ids: list[UUID]) -> tuple[list[Session], list[UUID]]:
+        session_ids = list(dict.fromkeys(session_ids))
+        found = {
+            session.session_id: session
+            for part in self._fan_out(lambda repo: repo.get_sessions_by_ids(session_ids))
+            for session in part
+        }
+        return (
+            [found[session_id] for session_id in session_ids if session_id in found],
+            [session_id for session_id in session_ids if session_id not in found]
+        )
+
+    def get_seat_availability_batch(self, request: SeatAvailabilityRequest) -> tuple[dict[UUID, int], list[UUID]]:
+        window = request.movie_id is not None or request.date_from is not None or request.date_to is not None
+        if request.session_ids:
+            if window:
+                raise ValueError("Pass either session_ids or a movie/date window, not both")
+            session_ids = list(dict.fromkeys(request.session_ids))
+            found, missing = self.seat_cache.get_many(session_ids)
+            if missing:
+                fetched = {}
+                for part in self._fan_out(lambda repo: repo.get_available_seats(missing)):
+                    fetched.update(part)
+                self.seat_cache.put_many(fetched)
+                found.update(fetched)
+            return (
+                {session_id: found[session_id] for session_id in session_ids if session_id in found},
+                [session_id for session_id in session_ids if session_id not in found]
+            )
+
+        if not window:
+            raise ValueError("Pass session_ids or a movie/date window")
+        date_from = request.date_from or datetime.now()
+        date_to = request.date_to or date_from + timedelta(days=7)
+        if date_to <= date_from:
+            raise ValueError("date_to must be after date_from")
+        if date_to - date_from > timedelta(days=31):
+            raise ValueError("Availability window must not exceed 31 days")
+        seats = {}
+        for part in self._fan_out(lambda repo: repo.get_available_seats_window(request.movie_id, date_from, date_to)):
+            seats.update(part)
+        self.seat_cache.put_many(seats)
+        return seats, []
+
     def get_movie_schedule(self, movie_id: UUID = None) -> list[Session]:
-        return self.movie_repo.get_schedule(movie_id)
+        parts = self._fan_out(lambda repo: repo.get_schedule(movie_id))
+        if len(parts) == 1:
+            return parts[0]
+        return sorted((session for part in parts for session in part), key=lambda session: session.start_time)
+
+    def get_schedule_page(
+        self,
+        movie_id: UUID = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        hall_name: str = None,
+        cursor: str = None,
+        limit: int = 100,
+        cinema_id: str = None
+    ) -> tuple[list[Session], str | None]:
+        after = self._decode_cursor(cursor) if cursor else None
+        # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+        fetch = lambda repo: repo.get_schedule_page(
+            movie_id, date_from, date_to, hall_name, after, limit + 1, cinema_id
+        )
+        if cinema_id is not None:
+            with self._repo_for_cinema(cinema_id) as repo:
+                sessions = fetch(repo)
+        else:
+            # Каждый шард отдаёт свою страницу в порядке курсора, общая - их слияние
+            parts = self._fan_out(fetch)
+            sessions = parts[0] if len(parts) == 1 else list(heapq.merge(
+                *parts, key=lambda session: (session.start_time, session.session_id)
+            ))[:limit + 1]
+        if len(sessions) <= limit:
+            return sessions, None
+        sessions = sessions[:limit]
+        return sessions, self._encode_cursor(sessions[-1])
+
+    @staticmethod
+    def _encode_cursor(session: Session) -> str:
+        raw = f"{session.start_time.isoformat()}|{session.session_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+        try:
+            start_time, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(start_time), UUID(session_id)
+        except ValueError:
+            raise ValueError("Invalid schedule cursor")
 
     def get_session_by_id(self, session_id: UUID) -> Session:
-        return self.movie_repo.get_session_by_id(session_id)
+        with self._repo_for_session(session_id) as repo:
+            return repo.get_session_by_id(session_id)
+
+    def _build_hall_index(
+        self, repo: MovieRepo, cinema_id: str, hall_names: list[str], date_from: datetime, date_to: datetime,
+        cleanup_minutes: int, exclude_session_id: UUID = None
+    ) -> HallScheduleIndex:
+        index = HallScheduleIndex()
+        bookings = repo.get_hall_bookings(cinema_id, hall_names, date_from, date_to, exclude_session_id)
+        for session_id, hall_name, start_time, duration_minutes in bookings:
+            end = start_time + timedelta(minutes=duration_minutes + cleanup_minutes)
+            index.add(hall_name, start_time, end, session_id)
+        return index
+
+    def generate_schedule(self, request: ScheduleGenerateRequest) -> ScheduleGenerateResponse:
+        if request.date_to < request.date_from:
+            raise ValueError("date_to must not be before date_from")
+        if (request.date_to - request.date_from).days > 31:
+            raise ValueError("Schedule can be generated for at most 31 days at once")
+
+        movies = {movie.film_id: movie for movie in self.movie_repo.get_movies_by_ids(request.movie_ids)}
+        missing = [str(movie_id) for movie_id in request.movie_ids if movie_id not in movies]
+        if missing:
+            raise KeyError(f"Movies not found: {', '.join(missing)}")
+
+        with self._repo_for_cinema(request.cinema_id) as repo:
+            rules = request.rules
+            days = [
+                request.date_from + timedelta(days=offset)
+                for offset in range((request.date_to - request.date_from).days + 1)
+            ]
+            days = [day for day in days if day.weekday() in rules.weekdays]
+            seats = {hall.hall_name: hall.seats for hall in request.halls}
+            hall_names = list(seats)
+            explicit = {hall_name: capacity for hall_name, capacity in seats.items() if capacity is not None}
+            if len(explicit) < len(seats):
+                # Вместимость не передана - берём из справочника залов
+                known = repo.get_hall_capacities(
+                    request.cinema_id, [name for name in hall_names if name not in explicit]
+                )
+                unknown = [name for name in hall_names if name not in explicit and name not in known]
+                if unknown:
+                    raise ValueError(f"Capacity is unknown for halls: {', '.join(unknown)}")
+                seats.update(known)
+
+            period_start = datetime.combine(request.date_from, datetime.min.time())
+            period_end = datetime.combine(request.date_to + timedelta(days=2), datetime.min.time())
+            index = self._build_hall_index(
+                repo, request.cinema_id, hall_names, period_start, period_end, rules.cleanup_minutes
+            )
+
+            placed, conflicts = plan_sessions(
+                index,
+                [(movie_id, movies[movie_id].duration_minutes) for movie_id in request.movie_ids],
+                hall_names,
+                days,
+                rules.opening_time,
+                rules.closing_time,
+                rules.cleanup_minutes,
+                rules.slot_step_minutes
+            )
+
+            now = datetime.now()
+            sessions = [
+                Session(
+                    session_id=uuid4(),
+                    movie_id=movie_id,
+                    cinema_id=request.cinema_id,
+                    start_time=start_time,
+                    hall_name=hall_name,
+                    available_seats=seats[hall_name],
+                    created_at=now
+                )
+                for movie_id, hall_name, start_time in placed
+            ]
+            if explicit:
+                repo.upsert_halls(request.cinema_id, explicit)
+            repo.create_sessions(sessions)
+            if sessions:
+                repo.refresh_now_showing(session_ids=[session.session_id for session in sessions])
+                if self.shards.sharded:
+                    for session in sessions:
+                        self.shards.remember(session.session_id, repo.shard)
+            return ScheduleGenerateResponse(created=len(sessions), skipped_conflicts=conflicts, sessions=sessions)
 
     def update_schedule(self, session_id: UUID, request: ScheduleUpdateRequest) -> Session:
-        session = self.movie_repo.get_session_by_id(session_id)
-        session.start_time = request.start_time
-        session.hall_name = request.hall_name
-        session.updated_at = datetime.now()
+        with self._repo_for_session(session_id) as repo:
+            session = repo.get_session_by_id(session_id)
+            movie = repo.get_movie_by_id(session.movie_id)
+            end = request.start_time + timedelta(minutes=movie.duration_minutes + HALL_CLEANUP_MINUTES)
+
+            index = self._build_hall_index(
+                repo, session.cinema_id, [request.hall_name], request.start_time, end, HALL_CLEANUP_MINUTES,
+                exclude_session_id=session_id
+            )
+            conflict = index.find_conflict(request.hall_name, request.start_time, end)
+            if conflict is not None:
+                raise ValueError(f"Hall {request.hall_name} is busy: overlaps session {conflict[2]}")
+
+            session.start_time = request.start_time
+            session.hall_name = request.hall_name
+            session.updated_at = datetime.now()
 
-        return self.movie_repo.update_session(session)
+            updated = repo.update_session(session)
+            repo.refresh_now_showing(session_ids=[session_id])
+            return updated
 
     def create_order(self, request: OrderRequest) -> dict:
-        session = self.movie_repo.get_session_by_id(request.session_id)
+        # Метки сравниваем после нормализации: "A1" и "a1" - одно место, а не два билета
+        selected = list(dict.fromkeys(normalize_label(seat) for seat in request.selected_seats))
+        if selected and len(selected) != request.ticket_count:
+            raise ValueError("Number of selected seats does not match ticket_count")
 
-        if session.available_seats < request.ticket_count:
-            raise ValueError("Not enough available seats")
+        # Правила цен проверяем до списания мест, чтобы ошибка БД не оставила места списанными
+        self.pricing.refresh(self.movie_repo)
 
-        # Обновляем доступные места
-        session.available_seats -= request.ticket_count
-        self.movie_repo.update_session(session)
+        # Заказ целиком живёт в шарде кинотеатра сеанса
+        with self._repo_for_session(request.session_id) as repo:
+            # Атомарно списываем места одним запросом, он же возвращает сеанс для расчёта цены
+            hot = False
+            if request.hold_id is not None:
+                # Заказ держит места из брони, а не из запроса: их сборщик и вернёт в карту
+                session, selected = repo.confirm_hold(
+                    request.session_id, request.hold_id, request.ticket_count, selected
+                )
+            elif selected:
+                session = repo.book_seats(request.session_id, selected, request.ticket_count)
+            else:
+                self.hot_sessions.refresh(self.movie_repo)
+                hot = self.hot_sessions.is_hot(request.session_id)
+                if hot:
+                    # Горячий сеанс: заявка встаёт в очередь актора и пишется в БД пачкой
+                    session = self.hot_sessions.reserve(request.session_id, request.ticket_count)
+                else:
+                    session = repo.reserve_seats(request.session_id, request.ticket_count)
 
-        # Расчет стоимости
-        ticket_price = 500  # Базовая цена
-        total_amount = ticket_price * request.ticket_count
+            self.seat_cache.update(session.session_id, session.available_seats)
 
-        return {
-            "order_id": uuid4(),
-            "status": "created",
-            "total_amount": total_amount
-        }
+            # Расчет стоимости
+            ticket_price = self.pricing.price(session.hall_name, session.movie_id, session.start_time)
+            total_amount = ticket_price * request.ticket_count
+
+            seats = selected or [None] * request.ticket_count
+            now = datetime.now()
+            order_id = uuid4()
+            # Заказ создаётся неоплаченным и держит места до expires_at
+            order = Order(
+                order_id=order_id,
+                user_id=request.user_id,
+                session_id=request.session_id,
+                ticket_count=request.ticket_count,
+                total_amount=total_amount,
+                status="pending",
+                created_at=now,
+                items=[
+                    OrderItem(line_no=line_no, seat_label=seat, price=ticket_price)
+                    for line_no, seat in enumerate(seats, 1)
+                ],
+                hold=OrderHold(
+                    hold_id=uuid4(),
+                    order_id=order_id,
+                    session_id=request.session_id,
+                    ticket_count=request.ticket_count,
+                    seats=selected,
+                    expires_at=now + timedelta(seconds=ORDER_HOLD_TTL),
+                    status="active",
+                    created_at=now
+                )
+            )
+            try:
+                repo.create_order(order)
+            except Exception:
+                # Заказ не сохранился - возвращаем списанные места; места горячего
+                # сеанса возвращаются через его актора
+                if hot:
+                    available_seats = self.hot_sessions.release(request.session_id, request.ticket_count)
+                else:
+                    available_seats = repo.release_seats(request.session_id, request.ticket_count, selected)
+                self.seat_cache.update(request.session_id, available_seats)
+                raise
+
+            return {
+                "order_id": order.order_id,
+                "status": order.status,
+                "total_amount": total_amount,
+                "expires_at": order.hold.expires_at
+            }
+
+    def confirm_order(self, order_id: UUID) -> Order:
+        # Шард заказа неизвестен: подтверждение сработает только там, где заказ есть
+        return self._find(lambda repo: repo.confirm_order(order_id))
+
+    def get_order_by_id(self, order_id: UUID) -> Order:
+        return self._find(lambda repo: repo.get_order_by_id(order_id))
+
+    def get_user_orders(self, user_id: UUID, page: int = 1, page_size: int = 20):
+        if not self.shards.sharded:
+            return self.movie_repo.get_user_orders(user_id, page, page_size)
+        # Из каждого шарда берём первые page * page_size заказов, страницу режем после слияния
+        parts = self.shards.fan_out(lambda repo: repo.get_user_orders(user_id, 1, page * page_size))
+        orders = heapq.merge(*(part[0] for part in parts.values()), key=lambda order: order.created_at, reverse=True)
+        total_items = sum(part[1] for part in parts.values())
+        total_pages = (total_items + page_size - 1) // page_size
+        return list(orders)[(page - 1) * page_size:page * page_size], total_items, total_pages
+
+    def get_seat_availability(self, session_id: UUID) -> tuple[bytes, int, int]:
+        with self._repo_for_session(session_id) as repo:
+            return repo.get_seat_availability(session_id)
+
+    def hold_seats(self, session_id: UUID, request: SeatHoldRequest) -> SeatHoldResponse:
+        with self._repo_for_session(session_id) as repo:
+            return repo.hold_seats(session_id, request.seats, request.ttl_seconds)
+
+    def confirm_hold(self, session_id: UUID, hold_id: UUID) -> dict:
+        with self._repo_for_session(session_id) as repo:
+            session, _ = repo.confirm_hold(session_id, hold_id)
+        self.seat_cache.update(session_id, session.available_seats)
+        return {"status": "confirmed", "available_seats": session.available_seats}
+
+    def release_hold(self, session_id: UUID, hold_id: UUID) -> dict:
+        with self._repo_for_session(session_id) as repo:
+            repo.release_hold(session_id, hold_id)
+        return {"status": "released"}
+
+    def set_hot_session(self, session_id: UUID, enabled: bool) -> dict:
+        if enabled:
+            with self._repo_for_session(session_id) as repo:
+                repo.get_session_by_id(session_id)
+        self.movie_repo.set_hot_session(session_id, enabled)
+        if enabled:
+            self.hot_sessions.enable(session_id)
+        else:
+            self.hot_sessions.disable(session_id)
+        return {"session_id": session_id, "hot": enabled}
+
+    def get_halls(self, cinema_id: str = None) -> list[Hall]:
+        if cinema_id is not None:
+            with self._repo_for_cinema(cinema_id) as repo:
+                return repo.get_halls(cinema_id)
+        halls = [hall for part in self._fan_out(lambda repo: repo.get_halls()) for hall in part]
+        return sorted(halls, key=lambda hall: (hall.cinema_id, hall.hall_name))
+
+    def set_hall_capacity(self, hall_name: str, capacity: int, cinema_id: str = DEFAULT_CINEMA_ID) -> Hall:
+        with self._repo_for_cinema(cinema_id) as repo:
+            return repo.upsert_halls(cinema_id, {hall_name: capacity})[0]
+
+    def get_occupancy_report(self, dimension: str, date_from: date, date_to: date, key: str = None) -> OccupancyReport:
+        if date_to < date_from:
+            raise ValueError("date_to must not be before date_from")
+        if (date_to - date_from).days > 366:
+            raise ValueError("Occupancy report covers at most 366 days")
+
+        parts = self._fan_out(lambda repo: repo.get_occupancy(dimension, date_from, date_to, key))
+        rows = parts[0] if len(parts) == 1 else self._merge_occupancy(parts)
+        for row in rows:
+            row.fill_rate = row.seats_sold / row.seats_offered if row.seats_offered else 0.0
+        offered = sum(row.seats_offered for row in rows)
+        sold = sum(row.seats_sold for row in rows)
+        return OccupancyReport(
+            dimension=dimension,
+            date_from=date_from,
+            date_to=date_to,
+            sessions=sum(row.sessions for row in rows),
+            seats_offered=offered,
+            seats_sold=sold,
+            fill_rate=sold / offered if offered else 0.0,
+            rows=rows
+        )
+
+    @staticmethod
+    def _merge_occupancy(parts: list[list[OccupancyRow]]) -> list[OccupancyRow]:
+        # Строки day и movie есть в каждом шарде и складываются
+        merged: dict[tuple, OccupancyRow] = {}
+        for part in parts:
+            for row in part:
+                total = merged.get((row.day, row.key))
+                if total is None:
+                    merged[(row.day, row.key)] = row.model_copy()
+                else:
+                    total.sessions += row.sessions
+                    total.seats_offered += row.seats_offered
+                    total.seats_sold += row.seats_sold
+        return [merged[day_key] for day_key in sorted(merged)]
+
+    def get_pricing_rules(self) -> list[PricingRule]:
+        return self.movie_repo.get_pricing_rules()
+
+    def create_pricing_rule(self, request: CreatePricingRuleRequest) -> PricingRule:
+        rule = PricingRule(rule_id=uuid4(), created_at=datetime.now(), **request.model_dump())
+        created = self.movie_repo.create_pricing_rule(rule)
+        self.pricing.invalidate()
+        return created
+
+    def delete_pricing_rule(self, rule_id: UUID) -> dict:
+        self.movie_repo.delete_pricing_rule(rule_id)
+        self.pricing.invalidate()
+        return {"status": "deleted"}
 
     def create_movie(self, movie: Movie) -> Movie:
-        return self.movie_repo.create_movie(movie)
+        created = self._replicate(lambda repo: repo.create_movie(movie))
+        catalog_cache.invalidate()
+        self.similar_movies.upsert(created)
+        return created
 
     def update_movie(self, movie_id: UUID, request: UpdateMovieRequest) -> Movie:
         movie = self.movie_repo.get_movie_by_id(movie_id)
 
-        update_data = request.dict(exclude_unset=True)
+        update_data = request.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(movie, key, value)
 
         movie.updated_at = datetime.now()
 
-        return self.movie_repo.update_movie(movie)
+        updated = self._replicate(lambda repo: repo.update_movie(movie))
+        catalog_cache.invalidate()
+        self.similar_movies.upsert(updated)
+        self._fan_out(lambda repo: repo.refresh_now_showing(movie_id=movie_id))
+        return updated
 
-    def add_sample_data(self):
-        # Проверяем, есть ли уже данные
-        existing_movies = self.movie_repo.get_all_movies()
-        if existing_movies:
-            return
-
-        # Добавляем тестовые фильмы
-        movies = [
-            Movie(
-                film_id=uuid4(),
-                title="Аватар: Путь воды",
-                description="Фантастический боевик о приключениях на планете Пандора",
-                duration_minutes=192,
-                genre=["фантастика", "боевик", "приключения"],
-                poster_url="https://example.com/avatar2.jpg",
-                created_at=datetime.now()
-            ),
-            Movie(
-                film_id=uuid4(),
-                title="Оппенгеймер",
-                description="Биографический фильм о создателе атомной бомбы",
-                duration_minutes=180,
-                genre=["биография", "история", "драма"],
-                poster_url="https://example.com/oppenheimer.jpg",
-                created_at=datetime.now()
-            )
-        ]
-
-        for movie in movies:
-            self.movie_repo.create_movie(movie)
-
-        # Добавляем тестовые сеансы
-        sessions = []
-        for movie in movies:
-            for i in range(3):
-                session = Session(
-                    session_id=uuid4(),
-                    movie_id=movie.film_id,
-                    start_time=datetime.now() + timedelta(days=i, hours=18),
-                    hall_name=f"Зал {i + 1}",
-                    available_seats=100,
-                    created_at=datetime.now()
-                )
-                sessions.append(session)
-                self.movie_repo.create_session(session)
\ No newline at end of file
+    def import_feed(self, kind: str, fmt: str, lines: Iterable[str]) -> ImportResult:
+        result = BulkImporter(self.movie_repo, shards=self.shards).run(kind, fmt, lines)
+        if kind == 'sessions' and result.imported:
+            self.refresh_now_showing()
+        if kind == 'movies' and result.imported:
+            self.similar_movies.invalidate()
+        return result
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from datetime import datetime
+from itertools import product
+from typing import Iterable
+from uuid import UUID
+from ..models.movie import PricingRule
+
+DEFAULT_TICKET_PRICE = float(os.getenv("DEFAULT_TICKET_PRICE", "500"))
+PRICING_RULES_CHECK_INTERVAL = float(os.getenv("PRICING_RULES_CHECK_INTERVAL", "5"))
+MAX_CACHED_QUOTES = 100_000
+
+# (слот, час начала включительно, час конца не включительно); всё остальное - ночь
+TIME_SLOTS = (('morning', 6, 12), ('day', 12, 17), ('evening', 17, 22))
+
+
+def time_slot(start_time: datetime) -> str:
+    for slot, hour_from, hour_to in TIME_SLOTS:
+        if hour_from <= start_time.hour < hour_to:
+            return slot
+    return 'night'
+
+
+# Все варианты ключа с подстановкой None вместо части полей: (зал, фильм, день недели, слот)
+_WILDCARD_MASKS = list(product((True, False), repeat=4))
+
+
+class _CompiledRules:
+    def __init__(self, rules: Iterable[PricingRule], default_price: float):
+        self.default_price = default_price
+        # ключ правила -> (приоритет, число заданных полей, цена); при равенстве побеждает более точное
+        self.rules: dict[tuple, tuple[int, int, float]] = {}
+        for rule in rules:
+            key = (rule.hall_name, rule.movie_id, rule.weekday, rule.time_slot)
+            rank = (rule.priority, sum(part is not None for part in key), rule.price)
+            if key not in self.rules or rank > self.rules[key]:
+                self.rules[key] = rank
+        # Конкретный ключ сеанса -> итоговая цена
+        self.quotes: dict[tuple, float] = {}
+
+    def resolve(self, key: tuple) -> float:
+        best = None
+        for mask in _WILDCARD_MASKS:
+            candidate = self.rules.get(tuple(part if keep else None for part, keep in zip(key, mask)))
+            if candidate is not None and (best is None or candidate > best):
+                best = candidate
+        return best[2] if best is not None else self.default_price
+
+
+# Правила из БД компилируются в словарь и пересобираются только при изменении версии
+# (число правил и время последней правки). Версия проверяется не чаще раза в интервал,
+# поэтому цена заказа - это поиск в словаре, а не запрос.
+class PricingEngine:
+    def __init__(self, default_price: float = DEFAULT_TICKET_PRICE,
+                 check_interval: float = PRICING_RULES_CHECK_INTERVAL):
+        self._lock = threading.Lock()
+        self._default_price = default_price
+        self._check_interval = check_interval
+        self._compiled = _CompiledRules([], default_price)
+        self._version = None
+        self._checked_at: float | None = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def compile(self, rules: Iterable[PricingRule], version=None):
+        compiled = _CompiledRules(rules, self._default_price)
+        with self._lock:
+            self._compiled = compiled
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def refresh(self, movie_repo):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self._check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self._check_interval:
+                return
+            version = movie_repo.get_pricing_rules_version()
+            if self._checked_at is not None and version == self._version:
+                self._checked_at = time.monotonic()
+                return
+            rules = movie_repo.get_pricing_rules()
+            self._compiled = _CompiledRules(rules, self._default_price)
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = None
+
+    def price(self, hall_name: str, movie_id: UUID, start_time: datetime) -> float:
+        compiled = self._compiled
+        key = (hall_name, movie_id, start_time.weekday(), time_slot(start_time))
+        quote = compiled.quotes.get(key)
+        if quote is None:
+            quote = compiled.resolve(key)
+            if len(compiled.quotes) >= MAX_CACHED_QUOTES:
+                compiled.quotes.clear()
+            compiled.quotes[key] = quote
+        return quote
+
+
+pricing_engine = PricingEngine()
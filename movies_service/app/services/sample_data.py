@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from ..models.movie import Movie, Session
+from ..repositories.db_movie_repo import MovieRepo
+
+
+def sample_catalog() -> tuple[list[Movie], list[Session]]:
+    now = datetime.now()
+    movies = [
+        Movie(
+            film_id=uuid4(),
+            title="Аватар: Путь воды",
+            description="Фантастический боевик о приключениях на планете Пандора",
+            duration_minutes=192,
+            genre=["фантастика", "боевик", "приключения"],
+            poster_url="https://example.com/avatar2.jpg",
+            created_at=now
+        ),
+        Movie(
+            film_id=uuid4(),
+            title="Оппенгеймер",
+            description="Биографический фильм о создателе атомной бомбы",
+            duration_minutes=180,
+            genre=["биография", "история", "драма"],
+            poster_url="https://example.com/oppenheimer.jpg",
+            created_at=now
+        )
+    ]
+
+    sessions = [
+        Session(
+            session_id=uuid4(),
+            movie_id=movie.film_id,
+            start_time=now + timedelta(days=i, hours=18),
+            hall_name=f"Зал {i + 1}",
+            available_seats=100,
+            created_at=now
+        )
+        for movie in movies
+        for i in range(3)
+    ]
+    return movies, sessions
+
+
+def seed_sample_data(movie_repo: MovieRepo, with_sessions: bool = True) -> bool:
+    # Пробуем одну строку, а не весь каталог; повторный запуск ничего не делает.
+    # Фильмы нужны в каждом шарде, сеансы - только в шарде их кинотеатра.
+    if movie_repo.has_movies():
+        return False
+    movies, sessions = sample_catalog()
+    return movie_repo.seed_catalog(movies, sessions if with_sessions else [])
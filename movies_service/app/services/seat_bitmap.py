@@ -0,0 +1,82 @@
+import re
+
+# Бит i карты мест соответствует месту с индексом i, старший бит первого байта - место 0.
+# Так карта совпадает с битовой строкой Postgres и легко читается клиентом.
+
+_SEAT_LABEL = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def bitmap_size(capacity: int) -> int:
+    return (capacity + 7) // 8
+
+
+def empty_bitmap(capacity: int) -> bytes:
+    return bytes(bitmap_size(capacity))
+
+
+def normalize_label(label: str) -> str:
+    # "a1" и " A1" - то же место, что "A1"
+    return label.strip().upper()
+
+
+def seat_index(label: str, row_length: int, capacity: int) -> int:
+    match = _SEAT_LABEL.match(normalize_label(label))
+    if match is None:
+        raise ValueError(f"Invalid seat label: {label}")
+
+    row = 0
+    for letter in match.group(1):
+        row = row * 26 + (ord(letter) - ord('A') + 1)
+    number = int(match.group(2))
+    if number < 1 or number > row_length:
+        raise ValueError(f"Invalid seat label: {label}")
+
+    index = (row - 1) * row_length + number - 1
+    if index >= capacity:
+        raise ValueError(f"Seat {label} does not exist in this hall")
+    return index
+
+
+def seat_label(index: int, row_length: int) -> str:
+    row, number = divmod(index, row_length)
+    letters = ""
+    row += 1
+    while row:
+        row, rem = divmod(row - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return f"{letters}{number + 1}"
+
+
+def make_mask(labels: list[str], row_length: int, capacity: int) -> bytes:
+    indexes = {seat_index(label, row_length, capacity) for label in labels}
+    value = 0
+    total_bits = bitmap_size(capacity) * 8
+    for index in indexes:
+        value |= 1 << (total_bits - 1 - index)
+    return value.to_bytes(bitmap_size(capacity), 'big')
+
+
+def mask_labels(mask: bytes, row_length: int) -> list[str]:
+    value = int.from_bytes(mask, 'big')
+    total_bits = len(mask) * 8
+    return [
+        seat_label(index, row_length)
+        for index in range(total_bits)
+        if value >> (total_bits - 1 - index) & 1
+    ]
+
+
+def bit_or(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, 'big') | int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+def bit_clear(a: bytes, mask: bytes) -> bytes:
+    return (int.from_bytes(a, 'big') & ~int.from_bytes(mask, 'big')).to_bytes(len(a), 'big')
+
+
+def intersects(a: bytes, b: bytes) -> bool:
+    return int.from_bytes(a, 'big') & int.from_bytes(b, 'big') != 0
+
+
+def count_bits(mask: bytes) -> int:
+    return bin(int.from_bytes(mask, 'big')).count('1')
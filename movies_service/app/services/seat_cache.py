@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+from uuid import UUID
+
+SEAT_CACHE_TTL = float(os.getenv("SEAT_CACHE_TTL", "2"))
+SEAT_CACHE_MAX_ENTRIES = int(os.getenv("SEAT_CACHE_MAX_ENTRIES", "100000"))
+
+
+# Остаток мест по сеансам. Заказы кладут сюда значение, которое вернул их UPDATE,
+# короткий TTL покрывает изменения из других воркеров и сборщика броней.
+class SeatAvailabilityCache:
+    def __init__(self, ttl: float = SEAT_CACHE_TTL, max_entries: int = SEAT_CACHE_MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: dict[UUID, tuple[int, float]] = {}
+
+    def get_many(self, session_ids: list[UUID]) -> tuple[dict[UUID, int], list[UUID]]:
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for session_id in session_ids:
+                entry = self._entries.get(session_id)
+                if entry is not None and now - entry[1] < self._ttl:
+                    found[session_id] = entry[0]
+                else:
+                    missing.append(session_id)
+        return found, missing
+
+    def put_many(self, seats: dict[UUID, int]):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) + len(seats) > self._max_entries:
+                self._entries = {
+                    session_id: entry for session_id, entry in self._entries.items()
+                    if now - entry[1] < self._ttl
+                }
+                if len(self._entries) + len(seats) > self._max_entries:
+                    self._entries.clear()
+            for session_id, available_seats in seats.items():
+                self._entries[session_id] = (available_seats, now)
+
+    def update(self, session_id: UUID, available_seats: int):
+        self.put_many({session_id: available_seats})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+seat_cache = SeatAvailabilityCache()
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from uuid import UUID
+import numpy as np
+from ..models.movie import Movie
+
+# Границы корзин длительности в минутах: до 90, 90-119, 120-149, от 150
+DURATION_BUCKETS = (90, 120, 150)
+# Вес совпадения по длительности относительно одного общего жанра
+DURATION_WEIGHT = float(os.getenv("SIMILAR_DURATION_WEIGHT", "0.5"))
+# Полная пересборка страхует от правок каталога в других воркерах
+SIMILAR_MOVIES_TTL = float(os.getenv("SIMILAR_MOVIES_TTL", "300"))
+
+
+def duration_bucket(duration_minutes: int) -> int:
+    return int(np.searchsorted(DURATION_BUCKETS, duration_minutes, side='right'))
+
+
+# Матрица признаков каталога: one-hot жанров и корзина длительности, строки нормированы,
+# поэтому косинусная близость - это одно матричное умножение. Новый фильм дописывает
+# строку, новый жанр - столбец; ёмкость растёт удвоением, как у списка.
+class SimilarMoviesIndex:
+    def __init__(self, ttl: float = SIMILAR_MOVIES_TTL):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._loaded_at: float | None = None
+        self._reset()
+
+    def _reset(self):
+        self._ids: list[UUID] = []
+        self._rows: dict[UUID, int] = {}
+        self._genres: dict[str, int] = {}
+        self._matrix = np.zeros((16, len(DURATION_BUCKETS) + 1), dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    def is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self._ttl
+
+    def load(self, movies: list[Movie]):
+        with self._lock:
+            self._reset()
+            for movie in movies:
+                self._upsert(movie)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def upsert(self, movie: Movie):
+        with self._lock:
+            if self._loaded_at is not None:
+                self._upsert(movie)
+
+    def contains(self, movie_id: UUID) -> bool:
+        return movie_id in self._rows
+
+    def similar(self, movie_id: UUID, k: int) -> list[tuple[UUID, float]]:
+        # Под блокировкой только снимок: строки дописываются в конец, а расширение
+        # матрицы создаёт новый массив, так что срез остаётся согласованным
+        with self._lock:
+            row = self._rows.get(movie_id)
+            if row is None:
+                raise KeyError(f"Movie with id={movie_id} not found")
+            ids = self._ids
+            size = len(ids)
+            matrix = self._matrix[:size]
+
+        k = min(k, size - 1)
+        if k <= 0:
+            return []
+        scores = matrix @ matrix[row]
+        scores[row] = -1.0
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def _upsert(self, movie: Movie):
+        genres = list(dict.fromkeys(movie.genre))
+        for genre in genres:
+            if genre not in self._genres:
+                self._genres[genre] = self._matrix.shape[1]
+                self._matrix = np.pad(self._matrix, ((0, 0), (0, 1)))
+
+        row = self._rows.get(movie.film_id)
+        if row is None:
+            row = len(self._ids)
+            if row == self._matrix.shape[0]:
+                self._matrix = np.pad(self._matrix, ((0, row), (0, 0)))
+            self._ids.append(movie.film_id)
+            self._rows[movie.film_id] = row
+
+        vector = np.zeros(self._matrix.shape[1], dtype=np.float32)
+        vector[duration_bucket(movie.duration_minutes)] = DURATION_WEIGHT
+        vector[[self._genres[genre] for genre in genres]] = 1.0
+        norm = np.linalg.norm(vector)
+        self._matrix[row] = vector / norm if norm else vector
+
+
+similar_movies = SimilarMoviesIndex()
@@ -0,0 +1,43 @@
+import os
+from typing import Iterable, Iterator
+from pydantic import BaseModel
+
+# Сколько строк сериализуется в один кусок ответа
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "500"))
+STREAM_FORMATS = ("ndjson", "json")
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def _chunks(items: Iterable[BaseModel], chunk_rows: int) -> Iterator[list[str]]:
+    # В памяти одновременно не больше chunk_rows сериализованных строк
+    chunk = []
+    for item in items:
+        chunk.append(item.model_dump_json())
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_ndjson(items: Iterable[BaseModel], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[bytes]:
+    for chunk in _chunks(items, chunk_rows):
+        yield ("\n".join(chunk) + "\n").encode()
+
+
+def stream_json(key: str, items: Iterable[BaseModel], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[bytes]:
+    # Тот же документ, что и у обычного ответа ({"movies": [...]}), но собирается по кускам
+    yield f'{{"{key}":['.encode()
+    separator = ""
+    for chunk in _chunks(items, chunk_rows):
+        yield (separator + ",".join(chunk)).encode()
+        separator = ","
+    yield b"]}"
+
+
+def stream_items(fmt: str, key: str, items: Iterable[BaseModel]) -> Iterator[bytes]:
+    if fmt == "ndjson":
+        return stream_ndjson(items)
+    if fmt == "json":
+        return stream_json(key, items)
+    raise ValueError(f"Unsupported stream format: {fmt}")
@@ -0,0 +1,112 @@
+"""Нагрузочный тест горячего сеанса: актор с пакетной записью против блокировки строки.
+
+Запуск из каталога movies_service против реального Postgres:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_hot_session --buyers 500
+
+Создаёт по сеансу на каждый режим, запускает N параллельных покупателей
+на один сеанс и сравнивает заказы в секунду, число транзакций и проданные места.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATABASE_URL, Base
+from app.models.movie import Session
+from app.repositories.db_movie_repo import MovieRepo
+from app.schemas.movie import Session as DBSession
+from app.services.hot_sessions import HotSessionRegistry
+
+
+def run_mode(hot: bool, make_session, buyers: int, seats: int, tickets: int, orders_per_buyer: int) -> dict:
+    setup = MovieRepo(make_session())
+    session = setup.create_session(Session(
+        session_id=uuid4(),
+        movie_id=uuid4(),
+        start_time=datetime.now() + timedelta(days=1),
+        hall_name="Benchmark hall",
+        available_seats=seats,
+        created_at=datetime.now()
+    ))
+    commits = 0
+
+    def counting_repo(session_id) -> MovieRepo:
+        nonlocal commits
+        commits += 1
+        return MovieRepo(make_session())
+
+    registry = HotSessionRegistry(repo_factory=counting_repo)
+
+    def buyer(_):
+        repo = None if hot else MovieRepo(make_session())
+        sold = 0
+        try:
+            for _ in range(orders_per_buyer):
+                try:
+                    if hot:
+                        registry.reserve(session.session_id, tickets)
+                    else:
+                        repo.reserve_seats(session.session_id, tickets)
+                    sold += tickets
+                except ValueError:
+                    pass
+        finally:
+            if repo is not None:
+                repo.db.close()
+        return sold
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        sold = sum(pool.map(buyer, range(buyers)))
+    elapsed = time.perf_counter() - started
+    registry.stop()
+
+    remaining = setup.get_session_by_id(session.session_id).available_seats
+    setup.db.query(DBSession).filter(DBSession.session_id == session.session_id).delete()
+    setup.db.commit()
+    setup.db.close()
+
+    attempts = buyers * orders_per_buyer
+    return {
+        'mode': 'hot session actor' if hot else 'row lock (conditional update)',
+        'rate': attempts / elapsed,
+        'elapsed': elapsed,
+        'transactions': commits if hot else attempts,
+        'sold': sold,
+        'remaining': remaining,
+        'oversold': max(0, sold - seats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--seats", type=int, default=1000)
+    parser.add_argument("--tickets", type=int, default=2)
+    parser.add_argument("--orders-per-buyer", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL, pool_size=min(args.buyers, 80), max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    failed = False
+    for hot in (False, True):
+        result = run_mode(hot, make_session, args.buyers, args.seats, args.tickets, args.orders_per_buyer)
+        print(f"mode:            {result['mode']}")
+        print(f"throughput:      {result['rate']:.0f} orders/sec ({result['elapsed']:.2f}s)")
+        print(f"transactions:    {result['transactions']}")
+        print(f"seats sold:      {result['sold']} of {args.seats}, remaining in DB: {result['remaining']}")
+        print(f"oversold seats:  {result['oversold']}")
+        print()
+        failed = failed or result['oversold'] > 0 or result['sold'] != args.seats - result['remaining']
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Нагрузочный тест списания мест при параллельных заказах.
+
+Запуск из каталога movies_service против реального Postgres:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_order_concurrency --buyers 300
+
+Создаёт один сеанс, запускает N параллельных покупателей и проверяет,
+что продано ровно столько мест, сколько было, и ни одним больше.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATABASE_URL, Base
+from app.models.movie import Session
+from app.repositories.db_movie_repo import MovieRepo
+from app.schemas.movie import Session as DBSession
+
+
+def legacy_reserve(repo: MovieRepo, session_id, ticket_count: int):
+    # Старый путь: чтение, вычитание в Python и запись всех колонок
+    session = repo.get_session_by_id(session_id)
+    if session.available_seats < ticket_count:
+        raise ValueError("Not enough available seats")
+    session.available_seats -= ticket_count
+    repo.update_session(session)
+
+
+def run(buyers: int, seats: int, tickets: int, orders_per_buyer: int, legacy: bool):
+    engine = create_engine(DATABASE_URL, pool_size=min(buyers, 80), max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    setup = MovieRepo(make_session())
+    session = setup.create_session(Session(
+        session_id=uuid4(),
+        movie_id=uuid4(),
+        start_time=datetime.now() + timedelta(days=1),
+        hall_name="Benchmark hall",
+        available_seats=seats,
+        created_at=datetime.now()
+    ))
+
+    def buyer(_):
+        repo = MovieRepo(make_session())
+        sold = 0
+        try:
+            for _ in range(orders_per_buyer):
+                try:
+                    if legacy:
+                        legacy_reserve(repo, session.session_id, tickets)
+                    else:
+                        repo.reserve_seats(session.session_id, tickets)
+                    sold += tickets
+                except ValueError:
+                    repo.db.rollback()
+        finally:
+            repo.db.close()
+        return sold
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        sold = sum(pool.map(buyer, range(buyers)))
+    elapsed = time.perf_counter() - started
+
+    remaining = setup.get_session_by_id(session.session_id).available_seats
+    attempts = buyers * orders_per_buyer
+    oversold = max(0, sold - seats)
+
+    print(f"mode:            {'legacy read-modify-write' if legacy else 'conditional update'}")
+    print(f"buyers:          {buyers}")
+    print(f"attempts:        {attempts} in {elapsed:.2f}s ({attempts / elapsed:.0f} orders/sec)")
+    print(f"seats sold:      {sold} of {seats}, remaining in DB: {remaining}")
+    print(f"lost updates:    {sold - (seats - remaining)}")
+    print(f"oversold seats:  {oversold}")
+
+    setup.db.query(DBSession).filter(DBSession.session_id == session.session_id).delete()
+    setup.db.commit()
+    setup.db.close()
+    return oversold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--seats", type=int, default=500)
+    parser.add_argument("--tickets", type=int, default=2)
+    parser.add_argument("--orders-per-buyer", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="прогнать старый путь для сравнения")
+    args = parser.parse_args()
+    oversold = run(args.buyers, args.seats, args.tickets, args.orders_per_buyer, args.legacy)
+    raise SystemExit(1 if oversold and not args.legacy else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Пропускная способность расчёта цены билета по скомпилированным правилам.
+
+Запуск из каталога movies_service, база данных не нужна:
+
+    python -m benchmarks.bench_pricing --quotes 100000 --rules 2000
+
+Компилирует синтетический набор правил и считает цены для случайных сеансов.
+Холодный проход разрешает каждый ключ заново, тёплый берёт цену из словаря.
+Код возврата 1, если тёплый проход медленнее --target котировок в секунду.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from app.models.movie import PricingRule
+from app.services.pricing import PricingEngine, TIME_SLOTS
+
+SLOTS = [slot for slot, _, _ in TIME_SLOTS] + ['night']
+
+
+def make_rules(count: int, halls: list[str], movies: list) -> list[PricingRule]:
+    rng = random.Random(1)
+    rules = []
+    for _ in range(count):
+        rules.append(PricingRule(
+            rule_id=uuid4(),
+            hall_name=rng.choice(halls) if rng.random() < 0.5 else None,
+            movie_id=rng.choice(movies) if rng.random() < 0.3 else None,
+            weekday=rng.randrange(7) if rng.random() < 0.4 else None,
+            time_slot=rng.choice(SLOTS) if rng.random() < 0.5 else None,
+            price=rng.randrange(300, 1200, 50),
+            priority=rng.randrange(3),
+            created_at=datetime.now()
+        ))
+    return rules
+
+
+def make_sessions(count: int, halls: list[str], movies: list) -> list[tuple]:
+    rng = random.Random(2)
+    start = datetime(2024, 3, 4, 8, 0)
+    return [
+        (rng.choice(halls), rng.choice(movies), start + timedelta(minutes=5 * rng.randrange(14 * 24 * 12)))
+        for _ in range(count)
+    ]
+
+
+def quote_all(engine: PricingEngine, sessions: list[tuple]) -> float:
+    started = time.perf_counter()
+    for hall_name, movie_id, start_time in sessions:
+        engine.price(hall_name, movie_id, start_time)
+    return time.perf_counter() - started
+
+
+def run(quotes: int, rules: int, halls: int, movies: int, target: float) -> bool:
+    hall_names = [f"Hall {number}" for number in range(1, halls + 1)]
+    movie_ids = [uuid4() for _ in range(movies)]
+    engine = PricingEngine()
+
+    started = time.perf_counter()
+    engine.compile(make_rules(rules, hall_names, movie_ids), version=(rules, datetime.now()))
+    compile_time = time.perf_counter() - started
+
+    sessions = make_sessions(quotes, hall_names, movie_ids)
+    cold = quote_all(engine, sessions)
+    warm = quote_all(engine, sessions)
+    warm_rate = quotes / warm
+
+    print(f"rules:           {rules} compiled in {compile_time * 1000:.1f}ms")
+    print(f"quotes:          {quotes} ({halls} halls, {movies} movies)")
+    print(f"cold pass:       {cold:.3f}s ({quotes / cold:.0f} quotes/sec)")
+    print(f"warm pass:       {warm:.3f}s ({warm_rate:.0f} quotes/sec)")
+    print(f"target:          {target:.0f} quotes/sec -> {'ok' if warm_rate >= target else 'FAIL'}")
+    return warm_rate >= target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=100_000)
+    parser.add_argument("--rules", type=int, default=2000)
+    parser.add_argument("--halls", type=int, default=12)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--target", type=float, default=10_000)
+    args = parser.parse_args()
+    ok = run(args.quotes, args.rules, args.halls, args.movies, args.target)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Задержка поиска похожих фильмов по матрице жанров.
+
+Запуск из каталога movies_service, база данных не нужна:
+
+    python -m benchmarks.bench_similar_movies --movies 100000 --queries 500
+
+Строит индекс на синтетическом каталоге и меряет top-k для случайных фильмов.
+Код возврата 1, если p99 превышает --target-ms.
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from app.models.movie import Movie
+from app.services.similar_movies import SimilarMoviesIndex
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+    "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Sci-Fi", "Sport",
+    "Thriller", "War", "Western", "Biography"
+]
+
+
+def make_movies(count: int) -> list[Movie]:
+    rng = random.Random(1)
+    now = datetime.now()
+    return [
+        Movie(
+            film_id=uuid4(),
+            title=f"Movie {number}",
+            description="",
+            duration_minutes=rng.randint(70, 200),
+            genre=rng.sample(GENRES, rng.randint(1, 4)),
+            poster_url="",
+            created_at=now
+        )
+        for number in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    movies = make_movies(args.movies)
+    index = SimilarMoviesIndex()
+    started = time.perf_counter()
+    index.load(movies)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for movie in movies[:1000]:
+        index.upsert(movie.model_copy(update={"duration_minutes": movie.duration_minutes + 30}))
+    upsert = (time.perf_counter() - started) / 1000
+
+    rng = random.Random(2)
+    timings = []
+    for movie in rng.sample(movies, args.queries):
+        started = time.perf_counter()
+        index.similar(movie.film_id, args.k)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+    print(f"movies:          {args.movies} ({len(GENRES)} genres)")
+    print(f"full build:      {build:.2f}s, incremental upsert: {upsert * 1e6:.0f}us")
+    print(f"top-{args.k} latency:  p50 {p50:.2f}ms, p99 {p99:.2f}ms")
+    print(f"target:          {args.target_ms:.0f}ms -> {'ok' if p99 <= args.target_ms else 'FAIL'}")
+    raise SystemExit(0 if p99 <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.database import Base, get_db
 from app.main import app
+from unittest.mock import Mock
+from app.services.movie_service import MovieService
+from app.services.pricing import PricingEngine
+from app.services.hot_sessions import HotSessionRegistry
+from app.services.seat_cache import SeatAvailabilityCache
+from app.services.similar_movies import SimilarMoviesIndex
 import os
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -53,4 +59,22 @@ def sample_session_data():
         "hall_number": 1,
         "price": 15.0,
         "available_seats": 100
-    }
\ No newline at end of file
+    }
+
+@pytest.fixture
+def mock_movie_repo():
+    repo = Mock()
+    repo.get_pricing_rules.return_value = []
+    repo.get_pricing_rules_version.return_value = (0, None)
+    repo.get_hot_session_ids.return_value = []
+    return repo
+
+@pytest.fixture
+def movie_service(mock_movie_repo):
+    service = MovieService()
+    service.movie_repo = mock_movie_repo
+    service.pricing = PricingEngine(default_price=500)
+    service.hot_sessions = HotSessionRegistry(repo_factory=Mock())
+    service.seat_cache = SeatAvailabilityCache(ttl=60)
+    service.similar_movies = SimilarMoviesIndex()
+    return service
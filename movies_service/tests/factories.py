@@ -0,0 +1,26 @@
+from uuid import uuid4
+from datetime import datetime
+from app.models.movie import Movie, Session
+
+
+def make_movie(genre, duration_minutes=120, title="Movie"):
+    return Movie(
+        film_id=uuid4(),
+        title=title,
+        description="Description",
+        duration_minutes=duration_minutes,
+        genre=genre,
+        poster_url="https://example.com/poster.jpg",
+        created_at=datetime.now()
+    )
+
+
+def make_session(session_id, available_seats, hall_name="Hall 1", start_time=datetime(2024, 3, 6, 19, 0)):
+    return Session(
+        session_id=session_id,
+        movie_id=uuid4(),
+        start_time=start_time,
+        hall_name=hall_name,
+        available_seats=available_seats,
+        created_at=datetime.now()
+    )
@@ -0,0 +1,70 @@
+import pytest
+from uuid import uuid4
+from app.services.bulk_import import BulkImporter
+
+
+class TestBulkImport:
+
+    @pytest.mark.unit
+    def test_ndjson_import_batches_and_reports_bad_lines(self, mock_movie_repo):
+        lines = [
+            '{"title": "A", "description": "d", "duration_minutes": 90, "genre": ["x"], "poster_url": "u"}\n',
+            '{"title": "B", "description": "d", "duration_minutes": -1, "genre": ["x"], "poster_url": "u"}\n',
+            '\n',
+            '{broken json\n',
+            '{"title": "C", "description": "d", "duration_minutes": 100, "genre": [], "poster_url": "u"}\n',
+            '{"title": "D", "description": "", "duration_minutes": 110, "genre": ["y"], "poster_url": "u"}\n',
+        ]
+
+        result = BulkImporter(mock_movie_repo, batch_size=2).run("movies", "ndjson", lines)
+
+        assert result.imported == 3
+        assert result.failed == 2
+        assert [error.line for error in result.errors] == [2, 4]
+        assert "duration_minutes" in result.errors[0].error
+        assert mock_movie_repo.copy_rows.call_count == 2
+        table, columns, rows = mock_movie_repo.copy_rows.call_args_list[0].args
+        assert mock_movie_repo.copy_rows.call_args_list[0].kwargs == {"upsert_key": "film_id"}
+        assert table == "movies"
+        assert columns[0] == "film_id"
+        assert [row[1] for row in rows] == ["A", "C"]
+
+    @pytest.mark.unit
+    def test_csv_session_import_parses_rows(self, mock_movie_repo):
+        movie_id = uuid4()
+        lines = [
+            "movie_id,start_time,hall_name,available_seats\n",
+            f"{movie_id},2024-05-01T18:00:00,Hall 1,120\n",
+            f"{movie_id},not-a-date,Hall 2,120\n",
+        ]
+
+        result = BulkImporter(mock_movie_repo).run("sessions", "csv", lines)
+
+        assert result.imported == 1
+        assert result.errors[0].line == 3
+        rows = mock_movie_repo.copy_rows.call_args.args[2]
+        assert rows[0][1] == movie_id
+        assert rows[0][2] == "main"
+        assert rows[0][4] == "Hall 1"
+        assert rows[0][5] == 120
+
+    @pytest.mark.unit
+    def test_rejected_batch_is_reported_per_line(self, mock_movie_repo):
+        mock_movie_repo.copy_rows.side_effect = Exception("duplicate key value violates unique constraint\nDETAIL: ...")
+        lines = [
+            "title,description,duration_minutes,genre,poster_url\n",
+            "A,d,90,drama|comedy,u\n",
+            "B,d,95,drama,u\n",
+        ]
+
+        result = BulkImporter(mock_movie_repo).run("movies", "csv", lines)
+
+        assert result.imported == 0
+        assert result.failed == 2
+        assert result.errors[0].error == "Batch rejected: duplicate key value violates unique constraint"
+        assert mock_movie_repo.copy_rows.call_args.args[2][0][4] == ["drama", "comedy"]
+
+    @pytest.mark.unit
+    def test_unknown_kind_is_rejected(self, mock_movie_repo):
+        with pytest.raises(ValueError, match="Unsupported import kind"):
+            BulkImporter(mock_movie_repo).run("halls", "ndjson", [])
@@ -0,0 +1,35 @@
+import random
+import pytest
+from app.services.hall_schedule import IntervalTree
+
+
+class TestIntervalTree:
+
+    @pytest.mark.unit
+    def test_find_overlap_matches_brute_force(self):
+        rng = random.Random(7)
+        tree = IntervalTree()
+        intervals = []
+        for i in range(500):
+            start = rng.randint(0, 10000)
+            end = start + rng.randint(1, 300)
+            tree.insert(start, end, i)
+            intervals.append((start, end))
+
+        for _ in range(500):
+            start = rng.randint(0, 10000)
+            end = start + rng.randint(1, 300)
+            expected = any(s < end and start < e for s, e in intervals)
+            found = tree.find_overlap(start, end)
+            assert (found is not None) == expected
+            if found is not None:
+                assert found[0] < end and start < found[1]
+
+    @pytest.mark.unit
+    def test_half_open_intervals_touching_do_not_overlap(self):
+        tree = IntervalTree()
+        tree.insert(10, 20, "a")
+        assert tree.find_overlap(20, 30) is None
+        assert tree.find_overlap(0, 10) is None
+        assert tree.find_overlap(19, 21) == (10, 20, "a")
+        assert len(tree) == 1
@@ -0,0 +1,31 @@
+import pytest
+from app.services.hold_sweeper import HoldSweeper
+from unittest.mock import Mock
+
+
+class TestHoldSweeper:
+
+    @pytest.mark.unit
+    def test_sweeps_in_bounded_batches_until_backlog_is_empty(self):
+        # Arrange
+        repo = Mock()
+        repo.release_expired_order_holds.side_effect = [(10, 42.0), (10, 30.0), (3, 5.0)]
+        sweeper = HoldSweeper(repo_factory=lambda: repo, batch_size=10)
+
+        # Act
+        released = sweeper.sweep()
+
+        # Assert
+        assert released == 23
+        assert repo.release_expired_order_holds.call_count == 3
+        repo.release_expired_order_holds.assert_called_with(10)
+        repo.db.close.assert_called_once()
+
+    @pytest.mark.unit
+    def test_sweep_stops_after_max_batches(self):
+        repo = Mock()
+        repo.release_expired_order_holds.return_value = (5, 1.0)
+        sweeper = HoldSweeper(repo_factory=lambda: repo, batch_size=5, max_batches=4)
+
+        assert sweeper.sweep() == 20
+        assert repo.release_expired_order_holds.call_count == 4
@@ -0,0 +1,150 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from uuid import uuid4
+from app.services.hot_sessions import HotSessionRegistry
+from factories import make_session
+from unittest.mock import Mock
+
+
+class _CounterRepo:
+    # Имитация строки sessions: условное списание и счётчик коммитов
+    def __init__(self, state):
+        self.state = state
+        self.db = Mock()
+
+    def get_session_by_id(self, session_id):
+        return make_session(session_id, self.state['seats'])
+
+    def reserve_seats(self, session_id, ticket_count):
+        with self.state['lock']:
+            self.state['commits'] += 1
+            if self.state['seats'] < ticket_count:
+                raise ValueError("Not enough available seats")
+            self.state['seats'] -= ticket_count
+            return make_session(session_id, self.state['seats'])
+
+    def release_seats(self, session_id, ticket_count):
+        with self.state['lock']:
+            self.state['seats'] += ticket_count
+            return self.state['seats']
+
+
+class TestHotSessions:
+
+    @staticmethod
+    def _registry(seats):
+        state = {'seats': seats, 'commits': 0, 'lock': threading.Lock()}
+        return HotSessionRegistry(repo_factory=lambda session_id: _CounterRepo(state)), state
+
+    @pytest.mark.unit
+    def test_concurrent_reservations_never_oversell(self):
+        # Arrange
+        registry, state = self._registry(seats=50)
+        session_id = uuid4()
+
+        def buy(_):
+            try:
+                registry.reserve(session_id, 2)
+                return 2
+            except ValueError:
+                return 0
+
+        # Act
+        try:
+            with ThreadPoolExecutor(max_workers=40) as pool:
+                sold = sum(pool.map(buy, range(100)))
+        finally:
+            registry.stop()
+
+        # Assert
+        assert sold == 50
+        assert state['seats'] == 0
+        assert state['commits'] <= 26  # заявки пишутся пачками, а не по одной
+
+    @pytest.mark.unit
+    def test_reloads_counter_after_external_write(self):
+        # Arrange
+        registry, state = self._registry(seats=10)
+        session_id = uuid4()
+        try:
+            registry.reserve(session_id, 2)
+            state['seats'] = 1  # места списал кто-то помимо актора
+
+            # Act & Assert
+            with pytest.raises(ValueError, match="Not enough available seats"):
+                registry.reserve(session_id, 2)
+            assert registry.reserve(session_id, 1).available_seats == 0
+        finally:
+            registry.stop()
+
+    @pytest.mark.unit
+    def test_refresh_tracks_hot_sessions(self):
+        repo = Mock()
+        session_id = uuid4()
+        repo.get_hot_session_ids.return_value = [session_id]
+        registry = HotSessionRegistry(repo_factory=Mock(), check_interval=0)
+
+        registry.refresh(repo)
+        assert registry.is_hot(session_id)
+        registry.disable(session_id)
+        assert not registry.is_hot(session_id)
+
+    @pytest.mark.unit
+    def test_reloads_counter_before_rejecting(self):
+        # Arrange
+        registry, state = self._registry(seats=4)
+        session_id = uuid4()
+        try:
+            registry.reserve(session_id, 4)
+            state['seats'] = 3  # сборщик броней вернул места прямо в sessions
+
+            # Act & Assert
+            assert registry.reserve(session_id, 3).available_seats == 0
+        finally:
+            registry.stop()
+
+    @pytest.mark.unit
+    def test_timed_out_request_does_not_take_seats(self):
+        # Arrange: первая пачка висит в БД, вторая заявка ждёт в очереди актора
+        registry, state = self._registry(seats=10)
+        session_id = uuid4()
+        release = threading.Event()
+        original = _CounterRepo.reserve_seats
+
+        def slow_reserve(repo, session_id, ticket_count):
+            release.wait(5)
+            return original(repo, session_id, ticket_count)
+
+        _CounterRepo.reserve_seats = slow_reserve
+        try:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                first = pool.submit(registry.reserve, session_id, 2)
+                time.sleep(0.05)
+
+                # Act
+                with pytest.raises(FutureTimeoutError):
+                    registry.reserve(session_id, 3, timeout=0.05)
+                release.set()
+                first.result(timeout=5)
+            registry.reserve(session_id, 1)
+
+            # Assert
+            assert state['seats'] == 7
+        finally:
+            _CounterRepo.reserve_seats = original
+            registry.stop()
+
+    @pytest.mark.unit
+    def test_release_goes_through_actor(self):
+        registry, state = self._registry(seats=5)
+        session_id = uuid4()
+        try:
+            registry.reserve(session_id, 5)
+
+            assert registry.release(session_id, 2) == 2
+            assert registry.reserve(session_id, 2).available_seats == 0
+            assert state['commits'] == 2
+        finally:
+            registry.stop()
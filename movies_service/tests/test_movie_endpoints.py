@@ -1,6 +1,8 @@
 import pytest
 from uuid import uuid4
 from datetime import datetime, timedelta
+from app.services.movie_service import MovieService
+from factories import make_movie, make_session
 
 
 @pytest.mark.integration
@@ -83,7 +85,7 @@ class TestMovieEndpoints:
             assert response.status_code == 200
             order = response.json()
             assert "order_id" in order
-            assert order["status"] == "created"
+            assert order["status"] == "pending"
             assert "total_amount" in order
     
     def test_create_order_insufficient_seats(self, client):
@@ -179,4 +181,76 @@ class TestMovieEndpoints:
             "genre": ["Action"]
         }
         response = client.post("/api/movies", json=movie_data)
-        assert response.status_code == 422
\ No newline at end of file
+        assert response.status_code == 422
+
+
+class TestConditionalGet:
+
+    @pytest.fixture
+    def client(self, movie_service, mock_movie_repo):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.endpoints.movie_router import movie_router
+
+        app = FastAPI()
+        app.include_router(movie_router, prefix="/api")
+        app.dependency_overrides[MovieService] = lambda: movie_service
+        return TestClient(app)
+
+    @pytest.mark.unit
+    def test_matching_etag_returns_304_without_loading_movie(self, client, mock_movie_repo):
+        # Arrange
+        movie = make_movie(["Drama"])
+        mock_movie_repo.get_movie_modified_at.return_value = movie.created_at
+        mock_movie_repo.get_movie_by_id.return_value = movie
+        first = client.get(f"/api/movies/{movie.film_id}")
+        mock_movie_repo.get_movie_by_id.reset_mock()
+
+        # Act
+        second = client.get(f"/api/movies/{movie.film_id}", headers={"If-None-Match": first.headers["etag"]})
+
+        # Assert
+        assert first.status_code == 200
+        assert first.json()["film_id"] == str(movie.film_id)
+        assert first.headers["cache-control"] == "public, max-age=60"
+        assert second.status_code == 304
+        assert second.headers["etag"] == first.headers["etag"]
+        mock_movie_repo.get_movie_by_id.assert_not_called()
+
+    @pytest.mark.unit
+    def test_if_modified_since_uses_second_precision(self, client, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        session = make_session(session_id, 10)
+        session.updated_at = datetime(2024, 3, 6, 12, 0, 0, 500000)
+        mock_movie_repo.get_session_modified_at.return_value = session.updated_at
+        mock_movie_repo.get_session_by_id.return_value = session
+        last_modified = client.get(f"/api/movies/sessions/{session_id}").headers["last-modified"]
+
+        # Act
+        same = client.get(f"/api/movies/sessions/{session_id}", headers={"If-Modified-Since": last_modified})
+        session.updated_at = mock_movie_repo.get_session_modified_at.return_value = datetime(2024, 3, 6, 12, 0, 5)
+        changed = client.get(f"/api/movies/sessions/{session_id}", headers={"If-Modified-Since": last_modified})
+
+        # Assert
+        assert same.status_code == 304
+        assert changed.status_code == 200
+        assert changed.json()["available_seats"] == 10
+
+    @pytest.mark.unit
+    def test_schedule_etag_changes_when_a_session_changes(self, client, mock_movie_repo):
+        # Arrange
+        sessions = [make_session(uuid4(), 10), make_session(uuid4(), 20)]
+        mock_movie_repo.get_schedule_page.return_value = sessions
+        etag = client.get("/api/movies/schedule").headers["etag"]
+
+        # Act
+        cached = client.get("/api/movies/schedule", headers={"If-None-Match": etag})
+        sessions[1].updated_at = datetime(2024, 3, 7, 9, 0)
+        changed = client.get("/api/movies/schedule", headers={"If-None-Match": etag})
+
+        # Assert
+        assert cached.status_code == 304
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()["schedule"]) == 2
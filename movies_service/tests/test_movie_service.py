@@ -1,23 +1,15 @@
 import pytest
 from uuid import uuid4
-from datetime import datetime, timedelta
-from app.models.movie import Movie, Session, OrderRequest, ScheduleUpdateRequest, UpdateMovieRequest
-from app.services.movie_service import MovieService
+from datetime import datetime, timedelta, date, time
+from app.models.movie import (
+    Movie, Session, OrderRequest, ScheduleUpdateRequest, UpdateMovieRequest, ScheduleGenerateRequest,
+    HallSpec, SlotRules, PricingRule, SeatAvailabilityRequest, OccupancyRow
+)
+from app.services.catalog_cache import catalog_cache
+from factories import make_movie, make_session
 from unittest.mock import Mock
 
 
-@pytest.fixture
-def mock_movie_repo():
-    return Mock()
-
-
-@pytest.fixture
-def movie_service(mock_movie_repo):
-    service = MovieService()
-    service.movie_repo = mock_movie_repo
-    return service
-
-
 class TestMovieService:
     
     @pytest.mark.unit
@@ -54,6 +46,76 @@ class TestMovieService:
         assert result[1].title == "Movie 2"
         mock_movie_repo.get_all_movies.assert_called_once()
     
+    @pytest.mark.unit
+    def test_get_catalog_is_cached_until_invalidated(self, movie_service, mock_movie_repo):
+        # Arrange
+        catalog_cache.invalidate()
+        movie = Movie(
+            film_id=uuid4(),
+            title="Cached Movie",
+            description="Description",
+            duration_minutes=100,
+            genre=["Drama"],
+            poster_url="https://example.com/cached.jpg",
+            created_at=datetime.now()
+        )
+        mock_movie_repo.get_all_movies.return_value = [movie]
+        mock_movie_repo.create_movie.return_value = movie
+        
+        # Act
+        body, etag = movie_service.get_catalog()
+        cached_body, cached_etag = movie_service.get_catalog()
+        movie_service.create_movie(movie)
+        movie_service.get_catalog()
+        
+        # Assert
+        assert b"Cached Movie" in body
+        assert cached_body is body
+        assert cached_etag == etag
+        assert mock_movie_repo.get_all_movies.call_count == 2
+        catalog_cache.invalidate()
+    
+    @pytest.mark.unit
+    def test_search_movies_paginates(self, movie_service, mock_movie_repo):
+        # Arrange
+        mock_movies = [
+            Movie(
+                film_id=uuid4(),
+                title=f"Space Movie {i}",
+                description="Description",
+                duration_minutes=120,
+                genre=["Sci-Fi"],
+                poster_url="https://example.com/space.jpg",
+                created_at=datetime.now()
+            )
+            for i in range(3)
+        ]
+        mock_movie_repo.search_movies.return_value = mock_movies
+        
+        # Act
+        movies, has_more = movie_service.search_movies("  space ", ["Sci-Fi"], page=2, page_size=2)
+        
+        # Assert
+        assert len(movies) == 2
+        assert has_more is True
+        mock_movie_repo.search_movies.assert_called_once_with("space", ["Sci-Fi"], True, 3, 2)
+    
+    @pytest.mark.unit
+    def test_search_movies_requires_criteria(self, movie_service, mock_movie_repo):
+        with pytest.raises(ValueError, match="Search query or genre is required"):
+            movie_service.search_movies("   ", None)
+        mock_movie_repo.search_movies.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_get_now_showing_reads_window(self, movie_service, mock_movie_repo):
+        mock_movie_repo.get_now_showing.return_value = []
+        
+        movie_service.get_now_showing(days=3, sessions_per_movie=4)
+        
+        date_from, date_to, per_movie = mock_movie_repo.get_now_showing.call_args.args
+        assert date_to - date_from == timedelta(days=3)
+        assert per_movie == 4
+    
     @pytest.mark.unit
     def test_get_movie_by_id_success(self, movie_service, mock_movie_repo):
         # Arrange
@@ -131,6 +193,97 @@ class TestMovieService:
         assert result[0].movie_id == movie_id
         mock_movie_repo.get_schedule.assert_called_once_with(movie_id)
     
+    @pytest.mark.unit
+    def test_get_schedule_page_returns_cursor(self, movie_service, mock_movie_repo):
+        # Arrange
+        base_time = datetime(2024, 1, 1, 10, 0)
+        mock_sessions = [
+            Session(
+                session_id=uuid4(),
+                movie_id=uuid4(),
+                start_time=base_time + timedelta(hours=i),
+                hall_name="Hall 1",
+                available_seats=100,
+                created_at=datetime.now()
+            )
+            for i in range(3)
+        ]
+        mock_movie_repo.get_schedule_page.return_value = mock_sessions
+        
+        # Act
+        page, next_cursor = movie_service.get_schedule_page(limit=2)
+        movie_service.get_schedule_page(cursor=next_cursor, limit=2)
+        
+        # Assert
+        assert len(page) == 2
+        assert next_cursor is not None
+        first_call, second_call = mock_movie_repo.get_schedule_page.call_args_list
+        assert first_call.args == (None, None, None, None, None, 3, None)
+        assert second_call.args[4] == (mock_sessions[1].start_time, mock_sessions[1].session_id)
+    
+    @pytest.mark.unit
+    def test_get_schedule_page_last_page(self, movie_service, mock_movie_repo):
+        mock_movie_repo.get_schedule_page.return_value = []
+        
+        page, next_cursor = movie_service.get_schedule_page(limit=10)
+        
+        assert page == []
+        assert next_cursor is None
+    
+    @pytest.mark.unit
+    def test_get_schedule_page_invalid_cursor(self, movie_service, mock_movie_repo):
+        with pytest.raises(ValueError, match="Invalid schedule cursor"):
+            movie_service.get_schedule_page(cursor="not-a-cursor")
+        mock_movie_repo.get_schedule_page.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_get_sessions_batch_reports_missing(self, movie_service, mock_movie_repo):
+        # Arrange
+        found_id, missing_id = uuid4(), uuid4()
+        mock_movie_repo.get_sessions_by_ids.return_value = [
+            Session(
+                session_id=found_id,
+                movie_id=uuid4(),
+                start_time=datetime.now() + timedelta(hours=1),
+                hall_name="Hall 1",
+                available_seats=50,
+                created_at=datetime.now()
+            )
+        ]
+        
+        # Act
+        sessions, missing = movie_service.get_sessions_batch([missing_id, found_id, missing_id])
+        
+        # Assert
+        assert [session.session_id for session in sessions] == [found_id]
+        assert missing == [missing_id]
+        mock_movie_repo.get_sessions_by_ids.assert_called_once_with([missing_id, found_id])
+    
+    @pytest.mark.unit
+    def test_get_movies_batch_keeps_request_order(self, movie_service, mock_movie_repo):
+        # Arrange
+        movies = [
+            Movie(
+                film_id=uuid4(),
+                title=f"Movie {i}",
+                description="Description",
+                duration_minutes=90,
+                genre=["Drama"],
+                poster_url="https://example.com/movie.jpg",
+                created_at=datetime.now()
+            )
+            for i in range(3)
+        ]
+        mock_movie_repo.get_movies_by_ids.return_value = movies
+        requested = [movies[2].film_id, movies[0].film_id, movies[1].film_id]
+        
+        # Act
+        result, missing = movie_service.get_movies_batch(requested)
+        
+        # Assert
+        assert [movie.film_id for movie in result] == requested
+        assert missing == []
+    
     @pytest.mark.unit
     def test_get_session_by_id(self, movie_service, mock_movie_repo):
         # Arrange
@@ -166,6 +319,8 @@ class TestMovieService:
         )
         mock_movie_repo.get_session_by_id.return_value = mock_session
         mock_movie_repo.update_session.return_value = mock_session
+        mock_movie_repo.get_movie_by_id.return_value = Mock(duration_minutes=120)
+        mock_movie_repo.get_hall_bookings.return_value = []
         
         new_start_time = datetime.now() + timedelta(hours=2)
         request = ScheduleUpdateRequest(
@@ -182,22 +337,104 @@ class TestMovieService:
         assert result.updated_at is not None
         mock_movie_repo.get_session_by_id.assert_called_once_with(session_id)
         mock_movie_repo.update_session.assert_called_once()
+        mock_movie_repo.refresh_now_showing.assert_called_once_with(session_ids=[session_id])
     
     @pytest.mark.unit
-    def test_create_order_success(self, movie_service, mock_movie_repo):
+    def test_update_schedule_rejects_hall_conflict(self, movie_service, mock_movie_repo):
         # Arrange
         session_id = uuid4()
-        user_id = uuid4()
-        mock_session = Session(
+        other_session_id = uuid4()
+        start_time = datetime(2024, 3, 1, 18, 0)
+        mock_movie_repo.get_session_by_id.return_value = Session(
             session_id=session_id,
             movie_id=uuid4(),
-            start_time=datetime.now() + timedelta(hours=1),
-            hall_name="Hall 1",
-            available_seats=10,
+            start_time=start_time - timedelta(days=1),
+            hall_name="Old Hall",
+            available_seats=100,
             created_at=datetime.now()
         )
-        mock_movie_repo.get_session_by_id.return_value = mock_session
-        mock_movie_repo.update_session.return_value = mock_session
+        mock_movie_repo.get_movie_by_id.return_value = Mock(duration_minutes=120)
+        mock_movie_repo.get_hall_bookings.return_value = [
+            (other_session_id, "Hall 2", start_time + timedelta(minutes=90), 100)
+        ]
+        request = ScheduleUpdateRequest(start_time=start_time, hall_name="Hall 2")
+        
+        # Act & Assert
+        with pytest.raises(ValueError, match="Hall Hall 2 is busy"):
+            movie_service.update_schedule(session_id, request)
+        assert mock_movie_repo.get_hall_bookings.call_args.args[4] == session_id
+        mock_movie_repo.update_session.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_generate_schedule_avoids_existing_sessions(self, movie_service, mock_movie_repo):
+        # Arrange
+        movie = Movie(
+            film_id=uuid4(),
+            title="Movie",
+            description="Description",
+            duration_minutes=100,
+            genre=["Drama"],
+            poster_url="https://example.com/movie.jpg",
+            created_at=datetime.now()
+        )
+        mock_movie_repo.get_movies_by_ids.return_value = [movie]
+        mock_movie_repo.get_hall_bookings.return_value = [
+            (uuid4(), "Hall 1", datetime(2024, 3, 4, 12, 0), 120)
+        ]
+        request = ScheduleGenerateRequest(
+            movie_ids=[movie.film_id],
+            halls=[HallSpec(hall_name="Hall 1", seats=150), HallSpec(hall_name="Hall 2", seats=80)],
+            date_from=date(2024, 3, 4),
+            date_to=date(2024, 3, 10),
+            rules=SlotRules(opening_time=time(10, 0), closing_time=time(22, 0), cleanup_minutes=20)
+        )
+        
+        # Act
+        result = movie_service.generate_schedule(request)
+        
+        # Assert
+        sessions = mock_movie_repo.create_sessions.call_args.args[0]
+        assert result.created == len(sessions) > 0
+        assert result.skipped_conflicts >= 1
+        assert {session.start_time.date() for session in sessions} == {
+            date(2024, 3, 4) + timedelta(days=i) for i in range(7)
+        }
+        for hall_name, seats in (("Hall 1", 150), ("Hall 2", 80)):
+            hall_sessions = sorted(
+                (session for session in sessions if session.hall_name == hall_name),
+                key=lambda session: session.start_time
+            )
+            assert all(session.available_seats == seats for session in hall_sessions)
+            for previous, current in zip(hall_sessions, hall_sessions[1:]):
+                assert current.start_time >= previous.start_time + timedelta(minutes=120)
+        first_day_hall_1 = [
+            session.start_time for session in sessions
+            if session.hall_name == "Hall 1" and session.start_time.date() == date(2024, 3, 4)
+        ]
+        for start_time in first_day_hall_1:
+            assert start_time + timedelta(minutes=120) <= datetime(2024, 3, 4, 12, 0) \
+                or start_time >= datetime(2024, 3, 4, 14, 20)
+    
+    @pytest.mark.unit
+    def test_generate_schedule_unknown_movie(self, movie_service, mock_movie_repo):
+        mock_movie_repo.get_movies_by_ids.return_value = []
+        request = ScheduleGenerateRequest(
+            movie_ids=[uuid4()],
+            halls=[HallSpec(hall_name="Hall 1", seats=100)],
+            date_from=date(2024, 3, 4),
+            date_to=date(2024, 3, 4)
+        )
+        
+        with pytest.raises(KeyError, match="Movies not found"):
+            movie_service.generate_schedule(request)
+        mock_movie_repo.create_sessions.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_create_order_success(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        user_id = uuid4()
+        mock_movie_repo.book_seats.return_value = make_session(session_id, 8)  # 10 - 2
         
         request = OrderRequest(
             user_id=user_id,
@@ -210,27 +447,341 @@ class TestMovieService:
         result = movie_service.create_order(request)
         
         # Assert
-        assert result["status"] == "created"
+        assert result["status"] == "pending"
         assert "order_id" in result
         assert result["total_amount"] == 1000  # 2 tickets * 500
-        assert mock_session.available_seats == 8  # 10 - 2
-        mock_movie_repo.get_session_by_id.assert_called_once_with(session_id)
-        mock_movie_repo.update_session.assert_called_once()
+        mock_movie_repo.book_seats.assert_called_once_with(session_id, ["A1", "A2"], 2)
+        mock_movie_repo.get_session_by_id.assert_not_called()
+        mock_movie_repo.update_session.assert_not_called()
+        order = mock_movie_repo.create_order.call_args.args[0]
+        assert order.order_id == result["order_id"]
+        assert order.user_id == user_id
+        assert [(item.line_no, item.seat_label, item.price) for item in order.items] == [
+            (1, "A1", 500), (2, "A2", 500)
+        ]
+        assert order.hold.order_id == order.order_id
+        assert order.hold.seats == ["A1", "A2"]
+        assert order.hold.status == "active"
+        assert result["expires_at"] == order.hold.expires_at > order.created_at
     
     @pytest.mark.unit
-    def test_create_order_insufficient_seats(self, movie_service, mock_movie_repo):
+    def test_create_order_rejects_same_seat_in_different_case(self, movie_service, mock_movie_repo):
+        request = OrderRequest(
+            user_id=uuid4(),
+            session_id=uuid4(),
+            selected_seats=["A1", " a1"],
+            ticket_count=2
+        )
+
+        with pytest.raises(ValueError, match="does not match ticket_count"):
+            movie_service.create_order(request)
+        mock_movie_repo.book_seats.assert_not_called()
+
+    @pytest.mark.unit
+    def test_create_order_returns_seats_when_order_write_fails(self, movie_service, mock_movie_repo):
         # Arrange
         session_id = uuid4()
-        user_id = uuid4()
-        mock_session = Session(
+        mock_movie_repo.book_seats.return_value = make_session(session_id, 9)
+        mock_movie_repo.create_order.side_effect = RuntimeError("database is down")
+        request = OrderRequest(
+            user_id=uuid4(),
             session_id=session_id,
-            movie_id=uuid4(),
-            start_time=datetime.now() + timedelta(hours=1),
-            hall_name="Hall 1",
-            available_seats=1,
-            created_at=datetime.now()
+            selected_seats=["C1"],
+            ticket_count=1
+        )
+        
+        # Act & Assert
+        with pytest.raises(RuntimeError):
+            movie_service.create_order(request)
+        mock_movie_repo.release_seats.assert_called_once_with(session_id, 1, ["C1"])
+    
+    @pytest.mark.unit
+    def test_create_order_without_seat_selection(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        mock_movie_repo.reserve_seats.return_value = make_session(session_id, 7)
+        
+        request = OrderRequest(
+            user_id=uuid4(),
+            session_id=session_id,
+            selected_seats=[],
+            ticket_count=3
+        )
+        
+        # Act
+        result = movie_service.create_order(request)
+        
+        # Assert
+        assert result["total_amount"] == 1500
+        mock_movie_repo.reserve_seats.assert_called_once_with(session_id, 3)
+        mock_movie_repo.book_seats.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_create_order_confirms_hold(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        hold_id = uuid4()
+        mock_movie_repo.confirm_hold.return_value = (make_session(session_id, 98), ["B3", "B4"])
+        
+        request = OrderRequest(
+            user_id=uuid4(),
+            session_id=session_id,
+            selected_seats=["B3", "B4"],
+            ticket_count=2,
+            hold_id=hold_id
+        )
+        
+        # Act
+        movie_service.create_order(request)
+        
+        # Assert
+        mock_movie_repo.confirm_hold.assert_called_once_with(session_id, hold_id, 2, ["B3", "B4"])
+        mock_movie_repo.book_seats.assert_not_called()
+
+    @pytest.mark.unit
+    def test_create_order_from_hold_keeps_held_seats(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        mock_movie_repo.confirm_hold.return_value = (make_session(session_id, 98), ["C7", "C8"])
+        mock_movie_repo.create_order.side_effect = RuntimeError("database is down")
+        request = OrderRequest(user_id=uuid4(), session_id=session_id, selected_seats=[], ticket_count=2, hold_id=uuid4())
+
+        # Act
+        with pytest.raises(RuntimeError):
+            movie_service.create_order(request)
+
+        # Assert: бронь заказа и компенсация оперируют местами из брони, а не из запроса
+        order = mock_movie_repo.create_order.call_args.args[0]
+        assert order.hold.seats == ["C7", "C8"]
+        assert [item.seat_label for item in order.items] == ["C7", "C8"]
+        mock_movie_repo.release_seats.assert_called_once_with(session_id, 2, ["C7", "C8"])
+    
+    @pytest.mark.unit
+    def test_create_order_uses_pricing_rules(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        session = make_session(session_id, 50, hall_name="IMAX", start_time=datetime(2024, 3, 9, 20, 0))
+        mock_movie_repo.reserve_seats.return_value = session
+        mock_movie_repo.get_pricing_rules_version.return_value = (1, datetime(2024, 3, 1))
+        mock_movie_repo.get_pricing_rules.return_value = [
+            PricingRule(rule_id=uuid4(), hall_name="IMAX", price=750, created_at=datetime.now())
+        ]
+        request = OrderRequest(user_id=uuid4(), session_id=session_id, selected_seats=[], ticket_count=2)
+
+        # Act
+        result = movie_service.create_order(request)
+
+        # Assert
+        assert result["total_amount"] == 1500
+        order = mock_movie_repo.create_order.call_args.args[0]
+        assert [item.price for item in order.items] == [750, 750]
+
+    @pytest.mark.unit
+    def test_create_order_goes_through_hot_session_actor(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        mock_movie_repo.get_hot_session_ids.return_value = [session_id]
+        hot = Mock()
+        hot.is_hot.return_value = True
+        hot.reserve.return_value = make_session(session_id, 40)
+        movie_service.hot_sessions = hot
+        request = OrderRequest(user_id=uuid4(), session_id=session_id, selected_seats=[], ticket_count=2)
+
+        # Act
+        result = movie_service.create_order(request)
+
+        # Assert
+        assert result["total_amount"] == 1000
+        hot.reserve.assert_called_once_with(session_id, 2)
+        mock_movie_repo.reserve_seats.assert_not_called()
+
+    @pytest.mark.unit
+    def test_failed_hot_order_returns_seats_through_actor(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        hot = Mock()
+        hot.is_hot.return_value = True
+        hot.reserve.return_value = make_session(session_id, 40)
+        hot.release.return_value = 42
+        movie_service.hot_sessions = hot
+        mock_movie_repo.create_order.side_effect = RuntimeError("database is down")
+        request = OrderRequest(user_id=uuid4(), session_id=session_id, selected_seats=[], ticket_count=2)
+
+        # Act & Assert
+        with pytest.raises(RuntimeError):
+            movie_service.create_order(request)
+        hot.release.assert_called_once_with(session_id, 2)
+        mock_movie_repo.release_seats.assert_not_called()
+
+    @pytest.mark.unit
+    def test_seat_availability_served_from_cache(self, movie_service, mock_movie_repo):
+        # Arrange
+        cached, fresh, unknown = uuid4(), uuid4(), uuid4()
+        movie_service.seat_cache.update(cached, 12)
+        mock_movie_repo.get_available_seats.return_value = {fresh: 30}
+        request = SeatAvailabilityRequest(session_ids=[fresh, cached, unknown, fresh])
+
+        # Act
+        seats, missing = movie_service.get_seat_availability_batch(request)
+
+        # Assert
+        assert list(seats.items()) == [(fresh, 30), (cached, 12)]
+        assert missing == [unknown]
+        mock_movie_repo.get_available_seats.assert_called_once_with([fresh, unknown])
+
+    @pytest.mark.unit
+    def test_order_updates_seat_availability_cache(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        movie_service.seat_cache.update(session_id, 10)
+        mock_movie_repo.reserve_seats.return_value = make_session(session_id, 7)
+        request = OrderRequest(user_id=uuid4(), session_id=session_id, selected_seats=[], ticket_count=3)
+
+        # Act
+        movie_service.create_order(request)
+        seats, _ = movie_service.get_seat_availability_batch(SeatAvailabilityRequest(session_ids=[session_id]))
+
+        # Assert
+        assert seats == {session_id: 7}
+        mock_movie_repo.get_available_seats.assert_not_called()
+
+    @pytest.mark.unit
+    def test_seat_availability_window(self, movie_service, mock_movie_repo):
+        movie_id = uuid4()
+        session_id = uuid4()
+        mock_movie_repo.get_available_seats_window.return_value = {session_id: 5}
+        request = SeatAvailabilityRequest(movie_id=movie_id, date_from=datetime(2024, 3, 4))
+
+        seats, missing = movie_service.get_seat_availability_batch(request)
+
+        assert seats == {session_id: 5} and missing == []
+        mock_movie_repo.get_available_seats_window.assert_called_once_with(
+            movie_id, datetime(2024, 3, 4), datetime(2024, 3, 11)
+        )
+        with pytest.raises(ValueError):
+            movie_service.get_seat_availability_batch(SeatAvailabilityRequest())
+        with pytest.raises(ValueError):
+            movie_service.get_seat_availability_batch(
+                SeatAvailabilityRequest(session_ids=[session_id], movie_id=movie_id)
+            )
+
+    @pytest.mark.unit
+    def test_get_similar_movies_builds_index_once(self, movie_service, mock_movie_repo):
+        # Arrange
+        target = make_movie(["Action", "Sci-Fi"])
+        close = make_movie(["Action", "Sci-Fi"], duration_minutes=125)
+        far = make_movie(["Drama"], duration_minutes=80)
+        mock_movie_repo.get_all_movies.return_value = [target, close, far]
+        mock_movie_repo.get_movies_by_ids.side_effect = lambda ids: [
+            movie for movie in (target, close, far) if movie.film_id in ids
+        ]
+
+        # Act
+        first = movie_service.get_similar_movies(target.film_id, k=2)
+        movie_service.get_similar_movies(target.film_id, k=2)
+
+        # Assert
+        assert [item.movie.film_id for item in first] == [close.film_id]
+        assert first[0].score == pytest.approx(1.0)
+        mock_movie_repo.get_all_movies.assert_called_once()
+
+    @pytest.mark.unit
+    def test_created_movie_is_added_to_similarity_index(self, movie_service, mock_movie_repo):
+        existing = make_movie(["Comedy"])
+        mock_movie_repo.get_all_movies.return_value = [existing]
+        mock_movie_repo.get_movies_by_ids.return_value = []
+        assert movie_service.get_similar_movies(existing.film_id) == []
+        new_movie = make_movie(["Comedy", "Romance"])
+        mock_movie_repo.create_movie.return_value = new_movie
+        mock_movie_repo.get_movies_by_ids.return_value = [new_movie]
+
+        movie_service.create_movie(new_movie)
+        result = movie_service.get_similar_movies(existing.film_id)
+
+        assert [item.movie.film_id for item in result] == [new_movie.film_id]
+        mock_movie_repo.get_all_movies.assert_called_once()
+
+    @pytest.mark.unit
+    def test_generate_schedule_takes_capacity_from_halls(self, movie_service, mock_movie_repo):
+        # Arrange
+        movie = make_movie(["Drama"], duration_minutes=100)
+        mock_movie_repo.get_movies_by_ids.return_value = [movie]
+        mock_movie_repo.get_hall_bookings.return_value = []
+        mock_movie_repo.get_hall_capacities.return_value = {"Hall 2": 80}
+        request = ScheduleGenerateRequest(
+            movie_ids=[movie.film_id],
+            halls=[HallSpec(hall_name="Hall 1", seats=120), HallSpec(hall_name="Hall 2")],
+            date_from=date(2024, 3, 4),
+            date_to=date(2024, 3, 4)
+        )
+
+        # Act
+        movie_service.generate_schedule(request)
+
+        # Assert
+        sessions = mock_movie_repo.create_sessions.call_args.args[0]
+        assert {(s.hall_name, s.available_seats) for s in sessions} == {("Hall 1", 120), ("Hall 2", 80)}
+        mock_movie_repo.get_hall_capacities.assert_called_once_with("main", ["Hall 2"])
+        mock_movie_repo.upsert_halls.assert_called_once_with("main", {"Hall 1": 120})
+
+    @pytest.mark.unit
+    def test_generate_schedule_rejects_unknown_hall_capacity(self, movie_service, mock_movie_repo):
+        movie = make_movie(["Drama"])
+        mock_movie_repo.get_movies_by_ids.return_value = [movie]
+        mock_movie_repo.get_hall_capacities.return_value = {}
+        request = ScheduleGenerateRequest(
+            movie_ids=[movie.film_id], halls=[HallSpec(hall_name="Hall 9")],
+            date_from=date(2024, 3, 4), date_to=date(2024, 3, 4)
+        )
+
+        with pytest.raises(ValueError, match="Hall 9"):
+            movie_service.generate_schedule(request)
+        mock_movie_repo.create_sessions.assert_not_called()
+
+    @pytest.mark.unit
+    def test_occupancy_report_reads_rollups(self, movie_service, mock_movie_repo):
+        # Arrange
+        mock_movie_repo.get_occupancy.return_value = [
+            OccupancyRow(key="Hall 1", day=date(2024, 3, 4), sessions=4, seats_offered=400, seats_sold=300),
+            OccupancyRow(key="Hall 1", day=date(2024, 3, 5), sessions=4, seats_offered=400, seats_sold=100),
+        ]
+
+        # Act
+        report = movie_service.get_occupancy_report("hall", date(2024, 3, 4), date(2024, 3, 5), "Hall 1")
+
+        # Assert
+        assert [row.fill_rate for row in report.rows] == [0.75, 0.25]
+        assert (report.sessions, report.seats_offered, report.seats_sold, report.fill_rate) == (8, 800, 400, 0.5)
+        mock_movie_repo.get_occupancy.assert_called_once_with("hall", date(2024, 3, 4), date(2024, 3, 5), "Hall 1")
+
+    @pytest.mark.unit
+    def test_confirm_order(self, movie_service, mock_movie_repo):
+        order_id = uuid4()
+        mock_movie_repo.confirm_order.side_effect = ValueError("Order hold has expired")
+
+        with pytest.raises(ValueError, match="expired"):
+            movie_service.confirm_order(order_id)
+        mock_movie_repo.confirm_order.assert_called_once_with(order_id)
+
+    @pytest.mark.unit
+    def test_create_order_seat_count_mismatch(self, movie_service, mock_movie_repo):
+        request = OrderRequest(
+            user_id=uuid4(),
+            session_id=uuid4(),
+            selected_seats=["A1", "A2"],
+            ticket_count=3
         )
-        mock_movie_repo.get_session_by_id.return_value = mock_session
+        
+        with pytest.raises(ValueError, match="does not match ticket_count"):
+            movie_service.create_order(request)
+        mock_movie_repo.book_seats.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_create_order_insufficient_seats(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        user_id = uuid4()
+        mock_movie_repo.book_seats.side_effect = ValueError("Not enough available seats")
         
         request = OrderRequest(
             user_id=user_id,
@@ -243,6 +794,23 @@ class TestMovieService:
         with pytest.raises(ValueError, match="Not enough available seats"):
             movie_service.create_order(request)
     
+    @pytest.mark.unit
+    def test_create_order_session_not_found(self, movie_service, mock_movie_repo):
+        # Arrange
+        session_id = uuid4()
+        mock_movie_repo.book_seats.side_effect = KeyError(f"Session with id={session_id} not found")
+        
+        request = OrderRequest(
+            user_id=uuid4(),
+            session_id=session_id,
+            selected_seats=["A1"],
+            ticket_count=1
+        )
+        
+        # Act & Assert
+        with pytest.raises(KeyError):
+            movie_service.create_order(request)
+    
     @pytest.mark.unit
     def test_create_movie(self, movie_service, mock_movie_repo):
         # Arrange
@@ -296,6 +864,7 @@ class TestMovieService:
         assert result.updated_at is not None
         mock_movie_repo.get_movie_by_id.assert_called_once_with(movie_id)
         mock_movie_repo.update_movie.assert_called_once()
+        mock_movie_repo.refresh_now_showing.assert_called_once_with(movie_id=movie_id)
     
     @pytest.mark.unit
     def test_update_movie_partial(self, movie_service, mock_movie_repo):
@@ -323,4 +892,4 @@ class TestMovieService:
         assert result.title == "Old Title"  # Should remain unchanged
         assert result.updated_at is not None
         mock_movie_repo.get_movie_by_id.assert_called_once_with(movie_id)
-        mock_movie_repo.update_movie.assert_called_once()
\ No newline at end of file
+        mock_movie_repo.update_movie.assert_called_once()
@@ -59,7 +59,7 @@ class TestMovieWorkflows:
         assert response.status_code == 200
         order_response = response.json()
         assert "order_id" in order_response
-        assert order_response["status"] == "created"
+        assert order_response["status"] == "pending"
         assert order_response["total_amount"] == 1000  # 2 tickets * 500
         
         # Step 6: Verify seats were deducted
@@ -104,7 +104,7 @@ class TestMovieWorkflows:
         # Verify all orders were created successfully
         assert len(orders) > 0
         for order in orders:
-            assert order["status"] == "created"
+            assert order["status"] == "pending"
             assert "order_id" in order
     
     def test_movie_schedule_update_workflow(self, client):
@@ -0,0 +1,57 @@
+import pytest
+from uuid import uuid4
+from datetime import datetime, timedelta, date
+from app.repositories.occupancy_writer import OccupancyWriter
+from unittest.mock import Mock
+
+
+class TestOccupancyWriter:
+
+    class _CapturingWriter(OccupancyWriter):
+        def __init__(self, fail=False):
+            super().__init__(session_factory=Mock(), flush_interval=3600)
+            self.fail = fail
+            self.flushed = []
+
+        def _upsert(self, pending):
+            if self.fail:
+                raise RuntimeError("database is down")
+            self.flushed.append(pending)
+
+    @pytest.mark.unit
+    def test_deltas_are_merged_per_dimension_and_day(self):
+        # Arrange
+        writer = self._CapturingWriter()
+        movie_id = uuid4()
+        start = datetime(2024, 3, 4, 19, 0)
+
+        # Act
+        writer.record(movie_id, "Hall 1", start, sessions=1, seats_offered=100)
+        writer.record(movie_id, "Hall 1", start, seats_sold=3)
+        writer.record(movie_id, "Hall 2", start + timedelta(days=1), seats_sold=2)
+        writer.record(movie_id, "Hall 1", start, seats_sold=4, cinema_id="north")
+        writer.stop()
+
+        # Assert
+        pending = writer.flushed[0]
+        assert pending[("day", "", date(2024, 3, 4))] == [1, 100, 7]
+        assert pending[("cinema", "main", date(2024, 3, 4))] == [1, 100, 3]
+        assert pending[("cinema", "north", date(2024, 3, 4))] == [0, 0, 4]
+        assert pending[("hall", "Hall 1", date(2024, 3, 4))] == [1, 100, 3]
+        assert pending[("hall", "north/Hall 1", date(2024, 3, 4))] == [0, 0, 4]
+        assert pending[("movie", str(movie_id), date(2024, 3, 4))] == [1, 100, 7]
+        assert pending[("hall", "Hall 2", date(2024, 3, 5))] == [0, 0, 2]
+        assert len(pending) == 10
+
+    @pytest.mark.unit
+    def test_failed_flush_keeps_deltas(self):
+        writer = self._CapturingWriter(fail=True)
+        writer.record(uuid4(), "Hall 1", datetime(2024, 3, 4, 19, 0), seats_sold=2)
+
+        with pytest.raises(RuntimeError):
+            writer.flush()
+        writer.record(uuid4(), "Hall 1", datetime(2024, 3, 4, 20, 0), seats_sold=1)
+        writer.fail = False
+        writer.stop()
+
+        assert writer.flushed[0][("hall", "Hall 1", date(2024, 3, 4))] == [0, 0, 3]
@@ -0,0 +1,117 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import pytest
+from uuid import uuid4
+from datetime import datetime
+from app.models.movie import Order, OrderItem
+from app.repositories.order_writer import OrderWriter
+from unittest.mock import Mock
+
+
+class TestOrderWriter:
+
+    @staticmethod
+    def _order(items=1):
+        return Order(
+            order_id=uuid4(),
+            user_id=uuid4(),
+            session_id=uuid4(),
+            ticket_count=items,
+            total_amount=500 * items,
+            status="pending",
+            created_at=datetime.now(),
+            items=[OrderItem(line_no=i + 1, price=500) for i in range(items)]
+        )
+
+    @pytest.mark.unit
+    def test_orders_are_committed_in_one_batch(self):
+        db = Mock()
+        writer = OrderWriter(session_factory=lambda: db, batch_size=10, batch_wait_ms=500)
+        futures = [writer.submit(self._order(items=2)) for _ in range(3)]
+
+        for future in futures:
+            future.result(timeout=5)
+        writer.stop()
+
+        orders_insert, items_insert = db.execute.call_args_list
+        assert len(orders_insert.args[1]) == 3
+        assert len(items_insert.args[1]) == 6
+        db.commit.assert_called_once()
+
+    @pytest.mark.unit
+    def test_failed_order_does_not_fail_the_batch(self):
+        bad = self._order()
+        good = self._order()
+
+        class FakeSession:
+            def execute(self, stmt, rows):
+                if any(row.get('order_id') == bad.order_id for row in rows):
+                    raise RuntimeError("duplicate key")
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+
+        writer = OrderWriter(session_factory=FakeSession, batch_size=10, batch_wait_ms=50)
+        bad_future = writer.submit(bad)
+        good_future = writer.submit(good)
+
+        assert good_future.result(timeout=5) is None
+        with pytest.raises(RuntimeError, match="duplicate key"):
+            bad_future.result(timeout=5)
+        writer.stop()
+
+    @pytest.mark.unit
+    def test_timed_out_order_is_not_written_later(self):
+        # Arrange: первая пачка висит в БД, второй заказ ждёт в очереди
+        written, release = [], threading.Event()
+
+        class SlowSession:
+            def execute(self, stmt, rows):
+                release.wait(5)
+                written.extend(row['order_id'] for row in rows if 'total_amount' in row)
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+
+        writer = OrderWriter(session_factory=SlowSession, batch_size=1, batch_wait_ms=0)
+        first = writer.submit(self._order(items=0))
+        late = self._order(items=0)
+
+        # Act
+        with pytest.raises(FutureTimeoutError):
+            writer.write(late, timeout=0.05)
+        release.set()
+        first.result(timeout=5)
+        writer.stop()
+
+        # Assert
+        assert late.order_id not in written
+
+    @pytest.mark.unit
+    def test_write_waits_for_batch_already_in_flight(self):
+        release = threading.Event()
+
+        class SlowSession:
+            def execute(self, stmt, rows):
+                release.wait(5)
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+
+        writer = OrderWriter(session_factory=SlowSession, batch_size=10, batch_wait_ms=0)
+        threading.Timer(0.2, release.set).start()
+
+        assert writer.write(self._order(items=0), timeout=0.05) is None
+        writer.stop()
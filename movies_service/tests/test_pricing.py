@@ -0,0 +1,89 @@
+import pytest
+from uuid import uuid4
+from datetime import datetime
+from app.models.movie import PricingRule
+from app.services.pricing import PricingEngine, time_slot
+from unittest.mock import Mock
+
+
+class TestPricingEngine:
+
+    @staticmethod
+    def _rule(price, priority=0, **fields):
+        return PricingRule(rule_id=uuid4(), price=price, priority=priority, created_at=datetime.now(), **fields)
+
+    @pytest.mark.unit
+    def test_time_slots(self):
+        assert time_slot(datetime(2024, 3, 4, 9, 0)) == 'morning'
+        assert time_slot(datetime(2024, 3, 4, 12, 0)) == 'day'
+        assert time_slot(datetime(2024, 3, 4, 21, 59)) == 'evening'
+        assert time_slot(datetime(2024, 3, 4, 23, 0)) == 'night'
+        assert time_slot(datetime(2024, 3, 4, 2, 0)) == 'night'
+
+    @pytest.mark.unit
+    def test_most_specific_rule_wins(self):
+        # Arrange
+        movie_id = uuid4()
+        engine = PricingEngine(default_price=500)
+        engine.compile([
+            self._rule(700, hall_name="IMAX"),
+            self._rule(900, hall_name="IMAX", time_slot="evening"),
+            self._rule(300, weekday=0, time_slot="morning"),
+            self._rule(1000, movie_id=movie_id),
+        ])
+
+        # Act & Assert (4 марта 2024 - понедельник)
+        assert engine.price("Hall 1", uuid4(), datetime(2024, 3, 4, 19, 0)) == 500
+        assert engine.price("IMAX", uuid4(), datetime(2024, 3, 4, 13, 0)) == 700
+        assert engine.price("IMAX", uuid4(), datetime(2024, 3, 4, 19, 0)) == 900
+        assert engine.price("Hall 1", uuid4(), datetime(2024, 3, 4, 10, 0)) == 300
+        assert engine.price("Hall 1", uuid4(), datetime(2024, 3, 5, 10, 0)) == 500
+        assert engine.price("Hall 1", movie_id, datetime(2024, 3, 5, 10, 0)) == 1000
+        # Правило на два поля точнее правила на фильм
+        assert engine.price("Hall 1", movie_id, datetime(2024, 3, 4, 10, 0)) == 300
+
+    @pytest.mark.unit
+    def test_priority_beats_specificity(self):
+        engine = PricingEngine(default_price=500)
+        engine.compile([
+            self._rule(900, hall_name="IMAX", weekday=5, time_slot="evening"),
+            self._rule(400, priority=10),
+        ])
+
+        assert engine.price("IMAX", uuid4(), datetime(2024, 3, 9, 19, 0)) == 400
+
+    @pytest.mark.unit
+    def test_refresh_rebuilds_only_when_version_changes(self):
+        # Arrange
+        repo = Mock()
+        repo.get_pricing_rules_version.return_value = (1, datetime(2024, 3, 1))
+        repo.get_pricing_rules.return_value = [self._rule(600)]
+        engine = PricingEngine(default_price=500, check_interval=0)
+
+        # Act
+        engine.refresh(repo)
+        engine.refresh(repo)
+        first_price = engine.price("Hall 1", uuid4(), datetime(2024, 3, 4, 19, 0))
+        repo.get_pricing_rules_version.return_value = (2, datetime(2024, 3, 2))
+        repo.get_pricing_rules.return_value = [self._rule(650)]
+        engine.refresh(repo)
+
+        # Assert
+        assert first_price == 600
+        assert engine.price("Hall 1", uuid4(), datetime(2024, 3, 4, 19, 0)) == 650
+        assert repo.get_pricing_rules.call_count == 2
+        assert repo.get_pricing_rules_version.call_count == 3
+
+    @pytest.mark.unit
+    def test_refresh_skips_probe_within_interval(self):
+        repo = Mock()
+        repo.get_pricing_rules_version.return_value = (0, None)
+        repo.get_pricing_rules.return_value = []
+        engine = PricingEngine(default_price=500, check_interval=60)
+
+        engine.refresh(repo)
+        engine.refresh(repo)
+        engine.invalidate()
+        engine.refresh(repo)
+
+        assert repo.get_pricing_rules_version.call_count == 2
@@ -0,0 +1,26 @@
+import pytest
+from app.services.sample_data import seed_sample_data
+from unittest.mock import Mock
+
+
+class TestSampleData:
+
+    @pytest.mark.unit
+    def test_seed_is_one_bulk_call(self):
+        repo = Mock()
+        repo.has_movies.return_value = False
+        repo.seed_catalog.return_value = True
+
+        assert seed_sample_data(repo) is True
+        movies, sessions = repo.seed_catalog.call_args.args
+        assert len(movies) == 2 and len(sessions) == 6
+        assert {session.movie_id for session in sessions} == {movie.film_id for movie in movies}
+        repo.get_all_movies.assert_not_called()
+
+    @pytest.mark.unit
+    def test_seed_skips_non_empty_catalog(self):
+        repo = Mock()
+        repo.has_movies.return_value = True
+
+        assert seed_sample_data(repo) is False
+        repo.seed_catalog.assert_not_called()
@@ -0,0 +1,38 @@
+import pytest
+from app.services import seat_bitmap
+
+
+class TestSeatBitmap:
+
+    @pytest.mark.unit
+    def test_seat_index_and_label_roundtrip(self):
+        for index in (0, 19, 20, 299, 26 * 20):
+            label = seat_bitmap.seat_label(index, 20)
+            assert seat_bitmap.seat_index(label, 20, 1000) == index
+        assert seat_bitmap.seat_label(0, 20) == "A1"
+        assert seat_bitmap.seat_label(21, 20) == "B2"
+
+    @pytest.mark.unit
+    def test_seat_index_rejects_unknown_seats(self):
+        with pytest.raises(ValueError):
+            seat_bitmap.seat_index("A21", 20, 300)
+        with pytest.raises(ValueError):
+            seat_bitmap.seat_index("Z1", 20, 300)
+        with pytest.raises(ValueError):
+            seat_bitmap.seat_index("1A", 20, 300)
+
+    @pytest.mark.unit
+    def test_mask_operations(self):
+        capacity = 300
+        sold = seat_bitmap.make_mask(["A1", "O20"], 20, capacity)
+        assert len(sold) == 38
+        assert sold[0] == 0b10000000
+        assert seat_bitmap.count_bits(sold) == 2
+        assert seat_bitmap.mask_labels(sold, 20) == ["A1", "O20"]
+
+        hold = seat_bitmap.make_mask(["A2", "A3"], 20, capacity)
+        assert not seat_bitmap.intersects(sold, hold)
+        taken = seat_bitmap.bit_or(sold, hold)
+        assert seat_bitmap.count_bits(taken) == 4
+        assert seat_bitmap.intersects(taken, seat_bitmap.make_mask(["A3"], 20, capacity))
+        assert seat_bitmap.bit_clear(taken, hold) == sold
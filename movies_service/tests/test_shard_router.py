@@ -0,0 +1,141 @@
+import threading
+import pytest
+from uuid import uuid4
+from datetime import datetime, timedelta
+from factories import make_movie, make_session
+from unittest.mock import Mock
+
+
+class _ShardRepo:
+    # Репозиторий-заглушка одного шарда: данные берутся из словаря shard -> значение
+    data: dict = {}
+    # Записи каталога: (shard, метод, аргументы)
+    writes: list = []
+
+    def __init__(self, db, shard):
+        self.db = db
+        self.shard = shard
+
+    def get_available_seats(self, session_ids):
+        return {session_id: seats for session_id, seats in self.data[self.shard].items() if session_id in session_ids}
+
+    def get_schedule_page(self, *args):
+        return self.data[self.shard]
+
+    def get_order_by_id(self, order_id):
+        order = self.data[self.shard].get(order_id)
+        if order is None:
+            raise KeyError(f"Order with id={order_id} not found")
+        return order
+
+    def get_session_by_id(self, session_id):
+        return self.data[self.shard][session_id]
+
+    def upsert_movie(self, movie):
+        self.writes.append((self.shard, "upsert_movie", movie))
+        return movie
+
+    def copy_rows(self, table, columns, rows, upsert_key=None):
+        self.writes.append((self.shard, "copy_rows", upsert_key))
+
+
+class TestShardRouter:
+
+    @pytest.fixture
+    def router(self, monkeypatch):
+        from app.repositories import shard_router
+        monkeypatch.setattr(shard_router, "MovieRepo", _ShardRepo)
+        router = shard_router.ShardRouter(factories={"north": Mock, "south": Mock}, primary="north")
+        yield router
+        router.close()
+
+    @pytest.mark.unit
+    def test_fan_out_queries_shards_concurrently(self, router):
+        # Оба вызова должны одновременно дойти до барьера, иначе он упадёт по таймауту
+        barrier = threading.Barrier(2, timeout=5)
+
+        result = router.fan_out(lambda repo: (barrier.wait(), repo.shard)[1])
+
+        assert result == {"north": "north", "south": "south"}
+
+    @pytest.mark.unit
+    def test_session_shard_is_found_once_and_cached(self, router):
+        session_id = uuid4()
+        _ShardRepo.data = {"north": {}, "south": {session_id: 10}}
+
+        assert router.shard_for_session(session_id) == "south"
+        _ShardRepo.data = {"north": {}, "south": {}}
+        assert router.shard_for_session(session_id) == "south"
+        with pytest.raises(KeyError):
+            router.shard_for_session(uuid4())
+
+    @pytest.mark.unit
+    def test_find_returns_object_from_its_shard(self, router):
+        order_id = uuid4()
+        _ShardRepo.data = {"north": {order_id: "order"}, "south": {}}
+
+        assert router.find(lambda repo: repo.get_order_by_id(order_id)) == "order"
+        with pytest.raises(KeyError):
+            router.find(lambda repo: repo.get_order_by_id(uuid4()))
+
+    @pytest.mark.unit
+    def test_schedule_page_merges_shards_in_cursor_order(self, router, movie_service):
+        # Arrange
+        start = datetime(2024, 3, 6, 10, 0)
+        north = [make_session(uuid4(), 10, start_time=start + timedelta(hours=hour)) for hour in (0, 2, 4)]
+        south = [make_session(uuid4(), 10, start_time=start + timedelta(hours=hour)) for hour in (1, 3, 5)]
+        _ShardRepo.data = {"north": north, "south": south}
+        movie_service.shards = router
+
+        # Act
+        page, next_cursor = movie_service.get_schedule_page(limit=4)
+
+        # Assert
+        assert [session.start_time.hour for session in page] == [10, 11, 12, 13]
+        assert next_cursor is not None
+        movie_service.movie_repo.get_schedule_page.assert_not_called()
+
+    @pytest.mark.unit
+    def test_movie_is_upserted_into_secondary_shards(self, router, movie_service):
+        # Arrange
+        movie = make_movie(["drama"])
+        movie_service.movie_repo.create_movie.return_value = movie
+        movie_service.shards = router
+        _ShardRepo.writes = []
+
+        # Act
+        movie_service.create_movie(movie)
+
+        # Assert: основной шард пишет через свой репозиторий, остальные - upsert'ом
+        movie_service.movie_repo.create_movie.assert_called_once_with(movie)
+        assert _ShardRepo.writes == [("south", "upsert_movie", movie)]
+
+    @pytest.mark.unit
+    def test_sharded_movie_import_upserts_into_every_shard(self, router, mock_movie_repo):
+        from app.services.bulk_import import BulkImporter
+        lines = ['{"title": "A", "description": "d", "duration_minutes": 90, "genre": ["x"], "poster_url": "u"}\n']
+        _ShardRepo.writes = []
+
+        result = BulkImporter(mock_movie_repo, shards=router).run("movies", "ndjson", lines)
+
+        assert result.imported == 1
+        assert sorted(_ShardRepo.writes) == [("north", "copy_rows", "film_id"), ("south", "copy_rows", "film_id")]
+        mock_movie_repo.copy_rows.assert_not_called()
+
+    @pytest.mark.unit
+    def test_session_repo_connection_is_closed_after_call(self, router, movie_service):
+        # Arrange
+        session_id = uuid4()
+        _ShardRepo.data = {"north": {}, "south": {session_id: "session"}}
+        router.remember(session_id, "south")
+        movie_service.shards = router
+        opened = []
+        original = router.repo
+        router.repo = lambda shard: opened.append(original(shard)) or opened[-1]
+
+        # Act
+        assert movie_service.get_session_by_id(session_id) == "session"
+
+        # Assert
+        assert [repo.shard for repo in opened] == ["south"]
+        opened[0].db.close.assert_called_once()
@@ -0,0 +1,55 @@
+import random
+import pytest
+from uuid import uuid4
+from app.services.similar_movies import SimilarMoviesIndex, DURATION_BUCKETS, DURATION_WEIGHT
+from factories import make_movie
+
+
+class TestSimilarMoviesIndex:
+
+    @pytest.mark.unit
+    def test_top_k_matches_brute_force_cosine(self):
+        # Arrange
+        rng = random.Random(7)
+        genres = ["Action", "Drama", "Comedy", "Horror", "Sci-Fi", "Romance", "Thriller"]
+        movies = [
+            make_movie(rng.sample(genres, rng.randint(1, 3)), duration_minutes=rng.randint(70, 190))
+            for _ in range(300)
+        ]
+        index = SimilarMoviesIndex()
+        index.load(movies[:200])
+        for movie in movies[200:]:
+            index.upsert(movie)
+        index.upsert(movies[0].model_copy(update={"genre": ["Western"]}))
+
+        # Act
+        target = movies[5]
+        result = index.similar(target.film_id, k=10)
+
+        # Assert
+        def vector(movie):
+            return set(movie.genre) | {("duration", sum(movie.duration_minutes >= b for b in DURATION_BUCKETS))}
+
+        def cosine(a, b):
+            va, vb = vector(a), vector(b)
+            weight = lambda f: DURATION_WEIGHT ** 2 if isinstance(f, tuple) else 1.0
+            dot = sum(weight(f) for f in va & vb)
+            norm = lambda v: sum(weight(f) for f in v) ** 0.5
+            return dot / (norm(va) * norm(vb))
+
+        current = {movie.film_id: movie for movie in movies}
+        current[movies[0].film_id] = movies[0].model_copy(update={"genre": ["Western"]})
+        expected = sorted(
+            (cosine(target, movie) for movie_id, movie in current.items() if movie_id != target.film_id),
+            reverse=True
+        )[:10]
+        assert [score for _, score in result] == pytest.approx(expected, abs=1e-5)
+
+    @pytest.mark.unit
+    def test_unknown_movie_raises_key_error(self):
+        index = SimilarMoviesIndex()
+        index.load([make_movie(["Drama"])])
+
+        with pytest.raises(KeyError):
+            index.similar(uuid4(), k=5)
+        assert index.similar(index._ids[0], k=5) == []
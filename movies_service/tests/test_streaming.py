@@ -0,0 +1,55 @@
+import json
+import pytest
+from uuid import uuid4
+from datetime import datetime
+from app.models.movie import Session, MoviesListResponse
+from app.services.streaming import stream_json
+from factories import make_movie, make_session
+
+
+class TestStreaming:
+
+    @pytest.mark.unit
+    def test_json_stream_matches_regular_response(self, movie_service, mock_movie_repo):
+        # Arrange
+        movies = [make_movie(["Drama"], title=f"Movie {i}") for i in range(7)]
+        mock_movie_repo.iter_movies.return_value = iter(movies)
+
+        # Act
+        chunks = list(stream_json("movies", movie_service.movie_repo.iter_movies(), chunk_rows=3))
+
+        # Assert
+        assert len(chunks) == 5
+        assert MoviesListResponse.model_validate_json(b"".join(chunks)) == MoviesListResponse(movies=movies)
+
+    @pytest.mark.unit
+    def test_json_stream_of_empty_result_is_valid(self):
+        assert json.loads(b"".join(stream_json("schedule", iter([])))) == {"schedule": []}
+
+    @pytest.mark.unit
+    def test_ndjson_schedule_stream_is_lazy(self, movie_service, mock_movie_repo):
+        # Arrange
+        pulled = []
+
+        def sessions():
+            for hour in range(5):
+                pulled.append(hour)
+                yield make_session(uuid4(), 10, start_time=datetime(2024, 3, 6, 10 + hour, 0))
+
+        mock_movie_repo.iter_schedule.return_value = sessions()
+
+        # Act
+        stream = movie_service.stream_schedule("ndjson")
+        nothing_read = pulled == []
+        first = next(stream)
+
+        # Assert
+        assert nothing_read
+        assert pulled == [0, 1, 2, 3, 4]
+        lines = first.decode().splitlines()
+        assert [Session.model_validate_json(line).start_time.hour for line in lines] == [10, 11, 12, 13, 14]
+
+    @pytest.mark.unit
+    def test_unknown_format_is_rejected_before_streaming(self, movie_service):
+        with pytest.raises(ValueError):
+            movie_service.stream_movies("xml")
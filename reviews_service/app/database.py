@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -17,5 +17,22 @@ def get_db():
         db.close()
 
 def init_db():
-    from .schemas.review import Review
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from .schemas.review import Review, ReviewStats
+    from .repositories.db_review_repo import dedupe_active_reviews
+    Base.metadata.create_all(bind=engine)
+    # create_all не добавляет колонки в уже существующие таблицы
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS flagged BOOLEAN NOT NULL DEFAULT false"))
+    # Уникальный индекс не построится поверх старых дублей: они убираются в той же
+    # транзакции под блокировкой записи, чтобы новые дубли не появились до индекса
+    unique = next(index for index in Review.__table__.indexes if index.name == 'ux_reviews_user_target_active')
+    with engine.begin() as conn:
+        if not inspect(conn).has_index('reviews', unique.name):
+            conn.execute(text("LOCK TABLE reviews IN SHARE ROW EXCLUSIVE MODE"))
+            # Пока ждали блокировку, индекс мог построить другой воркер
+            if not inspect(conn).has_index('reviews', unique.name):
+                dedupe_active_reviews(conn)
+                unique.create(bind=conn)
+    # create_all не добавляет индексы к уже существующим таблицам
+    for index in Review.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
\ No newline at end of file
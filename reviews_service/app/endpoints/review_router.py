@@ -1,7 +1,10 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
 from ..services.review_service import ReviewService
-from ..models.review import CreateReviewRequest, UpdateReviewRequest, ReviewListResponse, ReviewResponse
+from ..models.review import (
+    CreateReviewRequest, UpdateReviewRequest, ReviewListResponse, ReviewResponse, ReviewStatsResponse,
+    ReviewStatsBatchRequest, ReviewStatsBatchResponse, ReviewSort
+)
 from ..database import get_db
 
 review_router = APIRouter(prefix='/reviews', tags=['Reviews'])
@@ -14,9 +17,10 @@ def get_reviews(
     target_id: str = Query(..., description="ID фильма"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    sort: ReviewSort = Query(ReviewSort.NEWEST, description="newest, highest или lowest"),
     review_service: ReviewService = Depends(get_review_service)
 ):
-    reviews, total_items, total_pages = review_service.get_reviews_by_target(target_id, page, page_size)
+    reviews, total_items, total_pages = review_service.get_reviews_by_target(target_id, page, page_size, sort)
     return ReviewListResponse(
         items=reviews,
         page=page,
@@ -65,7 +69,14 @@ def delete_review(
     except KeyError as e:
         raise HTTPException(404, str(e))
 
-@review_router.get('/{target_id}/stats')
+@review_router.post('/stats/batch', response_model=ReviewStatsBatchResponse)
+def get_review_stats_batch(
+    request: ReviewStatsBatchRequest,
+    review_service: ReviewService = Depends(get_review_service)
+):
+    return ReviewStatsBatchResponse(stats=review_service.get_review_stats_batch(request.target_ids))
+
+@review_router.get('/{target_id}/stats', response_model=ReviewStatsResponse)
 def get_review_stats(
     target_id: str,
     review_service: ReviewService = Depends(get_review_service)
@@ -1,7 +1,10 @@
 from fastapi import FastAPI, Request
 from prometheus_client import Counter, Histogram, make_asgi_app
 from .endpoints.review_router import review_router
-from .database import init_db
+from .database import SessionLocal, init_db
+from .repositories.db_review_repo import ReviewRepo
+from .services.spam_filter import spam_filter
+from datetime import datetime
 import time
 
 app = FastAPI(
@@ -32,6 +35,16 @@ APP_INFO.labels(app_name="reviews-service", version="1.1.0").inc(0)
 @app.on_event("startup")
 def startup():
     init_db()
+    # Агрегат оценок заполняется из уже существующих отзывов один раз
+    db = SessionLocal()
+    try:
+        repo = ReviewRepo(db)
+        repo.backfill_stats()
+        # Индекс фильтра спама живёт в памяти: собираем его из отзывов за окно
+        if spam_filter.enabled:
+            spam_filter.load(repo.iter_recent_reviews(datetime.now() - spam_filter.window))
+    finally:
+        db.close()
 
 @app.get("/health")
 def health_check():
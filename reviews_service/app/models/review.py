@@ -1,7 +1,7 @@
 import enum
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, ConfigDict, Field
 
 
@@ -10,6 +10,12 @@ class ReviewStatus(enum.Enum):
     DELETED = 'deleted'
 
 
+class ReviewSort(enum.Enum):
+    NEWEST = 'newest'
+    HIGHEST = 'highest'
+    LOWEST = 'lowest'
+
+
 class Review(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -22,6 +28,7 @@ class Review(BaseModel):
     status: ReviewStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
+    flagged: bool = False
 
 
 class CreateReviewRequest(BaseModel):
@@ -47,6 +54,7 @@ class ReviewResponse(BaseModel):
     status: ReviewStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
+    flagged: bool = False
 
 
 class ReviewListResponse(BaseModel):
@@ -55,4 +63,19 @@ class ReviewListResponse(BaseModel):
     page: int
     page_size: int
     total_items: int
-    total_pages: int
\ No newline at end of file
+    total_pages: int
+
+
+class ReviewStatsResponse(BaseModel):
+    target_id: str
+    total_reviews: int
+    average_rating: float
+    rating_distribution: Dict[int, int]
+
+
+class ReviewStatsBatchRequest(BaseModel):
+    target_ids: List[str] = Field(min_length=1, max_length=500)
+
+
+class ReviewStatsBatchResponse(BaseModel):
+    stats: List[ReviewStatsResponse]
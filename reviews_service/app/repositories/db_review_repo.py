@@ -1,71 +1,229 @@
+from datetime import datetime
+from typing import Iterator
 from uuid import UUID
 from sqlalchemy.orm import Session as SASession
-from sqlalchemy import func
-from ..models.review import Review, ReviewStatus
-from ..schemas.review import Review as DBReview
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models.review import Review, ReviewSort, ReviewStatus, ReviewStatsResponse
+from ..schemas.review import Review as DBReview, ReviewStats as DBReviewStats
+
+RATINGS = range(1, 11)
+# Ключ advisory-блокировки первичного заполнения review_stats
+STATS_BACKFILL_LOCK_ID = 7_320_001
+# Порядок строк для каждой сортировки; совпадает с индексами ix_reviews_target_*
+REVIEW_ORDER = {
+    ReviewSort.NEWEST: (DBReview.created_at.desc(), DBReview.id.desc()),
+    ReviewSort.HIGHEST: (DBReview.rating.desc(), DBReview.created_at.desc(), DBReview.id.desc()),
+    ReviewSort.LOWEST: (DBReview.rating.asc(), DBReview.created_at.desc(), DBReview.id.desc()),
+}
+
+
+def stats_changes(old: Review | None, new: Review | None) -> list[tuple[int, int]]:
+    # Какие оценки и с каким знаком меняют агрегат: учитываются только активные отзывы
+    changes = []
+    if old is not None and old.status == ReviewStatus.ACTIVE:
+        changes.append((old.rating, -1))
+    if new is not None and new.status == ReviewStatus.ACTIVE:
+        changes.append((new.rating, 1))
+    if len(changes) == 2 and changes[0][0] == changes[1][0]:
+        return []
+    return changes
+
+
+def dedupe_active_reviews(conn) -> list[str]:
+    # До уникального индекса проверка и вставка гонялись и могли оставить несколько
+    # активных отзывов пользователя на фильм: остаётся самый новый, остальные удаляются.
+    # Заполненный агрегат пересчитывается по затронутым фильмам; пустой заполнит backfill_stats
+    ranked = select(
+        DBReview.id,
+        func.row_number().over(
+            partition_by=(DBReview.user_id, DBReview.target_id),
+            order_by=(DBReview.created_at.desc(), DBReview.id.desc())
+        ).label('seq')
+    ).where(DBReview.status == ReviewStatus.ACTIVE).subquery()
+    targets = sorted(set(conn.execute(
+        update(DBReview)
+        .where(DBReview.id == ranked.c.id, ranked.c.seq > 1)
+        .values(status=ReviewStatus.DELETED, updated_at=datetime.now())
+        .returning(DBReview.target_id)
+    ).scalars().all()))
+    if not targets:
+        return targets
+
+    fresh = select(
+        DBReview.target_id,
+        func.count(DBReview.id).label('total_reviews'),
+        func.sum(DBReview.rating).label('rating_sum'),
+        *(
+            func.count(DBReview.id).filter(DBReview.rating == rating).label(f'rating_{rating}')
+            for rating in RATINGS
+        )
+    ).where(
+        DBReview.status == ReviewStatus.ACTIVE, DBReview.target_id.in_(targets)
+    ).group_by(DBReview.target_id).subquery()
+    columns = ['total_reviews', 'rating_sum', *(f'rating_{rating}' for rating in RATINGS)]
+    conn.execute(
+        update(DBReviewStats)
+        .where(DBReviewStats.target_id == fresh.c.target_id)
+        .values({column: fresh.c[column] for column in columns})
+    )
+    return targets
+
+
+def stats_response(target_id: str, stats: DBReviewStats | None) -> ReviewStatsResponse:
+    total = stats.total_reviews if stats is not None else 0
+    return ReviewStatsResponse(
+        target_id=target_id,
+        total_reviews=total,
+        average_rating=round(stats.rating_sum / total, 2) if total else 0.0,
+        rating_distribution={
+            rating: getattr(stats, f'rating_{rating}') if stats is not None else 0 for rating in RATINGS
+        }
+    )
 
 
 class ReviewRepo:
     def __init__(self, db: SASession):
         self.db: SASession = db
 
-    def get_reviews_by_target(self, target_id: str, page: int, page_size: int):
+    def get_reviews_by_target(self, target_id: str, page: int, page_size: int,
+                              sort: ReviewSort = ReviewSort.NEWEST):
         query = self.db.query(DBReview).filter(
             DBReview.target_id == target_id,
             DBReview.status == ReviewStatus.ACTIVE
-        ).order_by(DBReview.created_at.desc())
+        ).order_by(*REVIEW_ORDER[sort])
 
-        total_items = query.count()
+        # Число активных отзывов уже лежит в агрегате, COUNT по таблице не нужен
+        total_items = self.get_review_stats(target_id).total_reviews
         total_pages = (total_items + page_size - 1) // page_size
 
         reviews = query.offset((page - 1) * page_size).limit(page_size).all()
-        return [Review.from_orm(review) for review in reviews], total_items, total_pages
+        return [Review.model_validate(review) for review in reviews], total_items, total_pages
+
+    def iter_recent_reviews(self, since: datetime, batch_size: int = 1000) -> Iterator[Review]:
+        # Для сборки индекса фильтра спама: активные отзывы по возрастанию даты, порциями
+        query = self.db.query(DBReview).filter(
+            DBReview.status == ReviewStatus.ACTIVE,
+            DBReview.created_at >= since
+        ).order_by(DBReview.created_at).execution_options(yield_per=batch_size)
+        for review in query:
+            yield Review.model_validate(review)
+            self.db.expunge(review)
 
     def get_review_by_id(self, id: UUID) -> Review:
         review = self.db.query(DBReview).filter(DBReview.id == id).first()
         if review is None:
             raise KeyError(f"Review with id={id} not found")
-        return Review.from_orm(review)
-
-    def get_reviews_by_user_and_target(self, user_id: UUID, target_id: str):
-        reviews = self.db.query(DBReview).filter(
-            DBReview.user_id == user_id,
-            DBReview.target_id == target_id,
-            DBReview.status == ReviewStatus.ACTIVE
-        ).all()
-        return [Review.from_orm(review) for review in reviews]
+        return Review.model_validate(review)
 
     def create_review(self, review: Review) -> Review:
-        db_review = DBReview(**review.dict())
-        self.db.add(db_review)
-        self.db.commit()
-        self.db.refresh(db_review)
-        return Review.from_orm(db_review)
+        # Проверку на повторный отзыв делает частичный уникальный индекс: параллельные
+        # запросы не проскочат между проверкой и вставкой, а конфликт стоит одного обращения
+        stmt = pg_insert(DBReview).values(**review.model_dump()).on_conflict_do_nothing(
+            index_elements=[DBReview.user_id, DBReview.target_id],
+            index_where=DBReview.status == ReviewStatus.ACTIVE
+        ).returning(*DBReview.__table__.columns)
+        try:
+            row = self.db.execute(stmt).first()
+            if row is None:
+                raise ValueError("User already reviewed this movie")
+            self._adjust_stats(review.target_id, stats_changes(None, review))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return Review(**row._mapping)
 
     def update_review(self, review: Review) -> Review:
-        db_review = self.db.query(DBReview).filter(DBReview.id == review.id).first()
-        if db_review is None:
+        # Строка блокируется, чтобы параллельные правки одного отзыва не посчитались в агрегате дважды.
+        # Сервис уже читал этот отзыв в той же сессии: populate_existing перечитывает
+        # значения из базы, иначе old взялся бы из identity map до блокировки
+        db_review = (
+            self.db.query(DBReview).filter(DBReview.id == review.id)
+            .with_for_update().populate_existing().first()
+        )
+        # Удаление могло пройти между чтением в сервисе и блокировкой: правка
+        # со старым статусом вернула бы отзыв в ACTIVE и в агрегат
+        if db_review is None or (
+            db_review.status == ReviewStatus.DELETED and review.status != ReviewStatus.DELETED
+        ):
+            self.db.rollback()
             raise KeyError(f"Review with id={review.id} not found")
+        old = Review.model_validate(db_review)
 
-        for key, value in review.dict().items():
-            setattr(db_review, key, value)
-
-        self.db.commit()
+        try:
+            for key, value in review.model_dump().items():
+                setattr(db_review, key, value)
+            self._adjust_stats(review.target_id, stats_changes(old, review))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         self.db.refresh(db_review)
-        return Review.from_orm(db_review)
-
-    def get_review_stats(self, target_id: str) -> dict:
-        stats = self.db.query(
-            func.count(DBReview.id).label('total_reviews'),
-            func.avg(DBReview.rating).label('average_rating')
-        ).filter(
-            DBReview.target_id == target_id,
-            DBReview.status == ReviewStatus.ACTIVE
-        ).first()
+        return Review.model_validate(db_review)
 
-        return {
+    def _adjust_stats(self, target_id: str, changes: list[tuple[int, int]]):
+        # Один upsert на все изменения: строка фильма создаётся при первом отзыве
+        if not changes:
+            return
+        values = {
             'target_id': target_id,
-            'total_reviews': stats.total_reviews or 0,
-            'average_rating': round(float(stats.average_rating or 0), 2),
-            'rating_distribution': {}  # можно добавить при необходимости
+            'total_reviews': sum(delta for _, delta in changes),
+            'rating_sum': sum(rating * delta for rating, delta in changes),
+            **{f'rating_{rating}': 0 for rating in RATINGS}
         }
+        for rating, delta in changes:
+            values[f'rating_{rating}'] += delta
+
+        stmt = pg_insert(DBReviewStats).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DBReviewStats.target_id],
+            set_={
+                column: getattr(DBReviewStats, column) + stmt.excluded[column]
+                for column in values if column != 'target_id' and values[column]
+            }
+        )
+        self.db.execute(stmt)
+
+    def get_review_stats(self, target_id: str) -> ReviewStatsResponse:
+        stats = self.db.get(DBReviewStats, target_id)
+        return stats_response(target_id, stats)
+
+    def get_review_stats_batch(self, target_ids: list[str]) -> dict[str, ReviewStatsResponse]:
+        # Одна выборка по первичному ключу на все фильмы страницы каталога
+        rows = self.db.query(DBReviewStats).filter(DBReviewStats.target_id.in_(target_ids)).all()
+        return {row.target_id: stats_response(row.target_id, row) for row in rows}
+
+    def backfill_stats(self) -> bool:
+        # Первичное заполнение агрегата из существующих отзывов. Если агрегат уже
+        # заполнен, запуск ничего не блокирует. Иначе SHARE-блокировка reviews
+        # останавливает запись на время пересчёта, чтобы агрегат не разошёлся с таблицей
+        if self._stats_filled():
+            self.db.rollback()
+            return False
+        try:
+            self.db.execute(select(func.pg_advisory_xact_lock(STATS_BACKFILL_LOCK_ID)))
+            self.db.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+            # Пока ждали блокировку, агрегат мог заполнить другой воркер
+            if self._stats_filled():
+                self.db.rollback()
+                return False
+            columns = ['target_id', 'total_reviews', 'rating_sum', *(f'rating_{rating}' for rating in RATINGS)]
+            source = select(
+                DBReview.target_id,
+                func.count(DBReview.id),
+                func.sum(DBReview.rating),
+                *(
+                    func.count(DBReview.id).filter(DBReview.rating == rating)
+                    for rating in RATINGS
+                )
+            ).where(DBReview.status == ReviewStatus.ACTIVE).group_by(DBReview.target_id)
+            self.db.execute(pg_insert(DBReviewStats).from_select(columns, source))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return True
+
+    def _stats_filled(self) -> bool:
+        return self.db.query(DBReviewStats.target_id).limit(1).first() is not None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, Integer
+from sqlalchemy import Boolean, Column, String, DateTime, Enum, Integer, Index, false
 from sqlalchemy.dialects.postgresql import UUID
 from ..database import Base
 from ..models.review import ReviewStatus
@@ -14,4 +14,48 @@ class Review(Base):
     text = Column(String, nullable=False)
     status = Column(Enum(ReviewStatus), nullable=False, default=ReviewStatus.ACTIVE)
     created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=True)
\ No newline at end of file
+    updated_at = Column(DateTime, nullable=True)
+    # Почти копия недавнего отзыва на тот же фильм (фильтр спама в режиме flag)
+    flagged = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        # Один активный отзыв пользователя на фильм; удалённые не мешают написать новый
+        Index(
+            'ux_reviews_user_target_active', 'user_id', 'target_id',
+            unique=True, postgresql_where=status == ReviewStatus.ACTIVE
+        ),
+        # Под каждую сортировку списка отзывов фильма свой индекс: страница читается
+        # по индексу без сортировки, id в конце делает порядок однозначным
+        Index(
+            'ix_reviews_target_newest', target_id, created_at.desc(), id.desc(),
+            postgresql_where=status == ReviewStatus.ACTIVE
+        ),
+        Index(
+            'ix_reviews_target_highest', target_id, rating.desc(), created_at.desc(), id.desc(),
+            postgresql_where=status == ReviewStatus.ACTIVE
+        ),
+        Index(
+            'ix_reviews_target_lowest', target_id, rating.asc(), created_at.desc(), id.desc(),
+            postgresql_where=status == ReviewStatus.ACTIVE
+        ),
+    )
+
+
+# Агрегат оценок по фильму: меняется в той же транзакции, что и сами отзывы,
+# поэтому статистика читается одной строкой по первичному ключу
+class ReviewStats(Base):
+    __tablename__ = 'review_stats'
+
+    target_id = Column(String, primary_key=True)
+    total_reviews = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    rating_6 = Column(Integer, nullable=False, default=0)
+    rating_7 = Column(Integer, nullable=False, default=0)
+    rating_8 = Column(Integer, nullable=False, default=0)
+    rating_9 = Column(Integer, nullable=False, default=0)
+    rating_10 = Column(Integer, nullable=False, default=0)
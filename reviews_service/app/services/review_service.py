@@ -1,21 +1,23 @@
 from uuid import UUID, uuid4
 from datetime import datetime
-from ..models.review import Review, ReviewStatus, CreateReviewRequest, UpdateReviewRequest
-from ..repositories.db_review_repo import ReviewRepo
+from ..models.review import (
+    Review, ReviewSort, ReviewStatus, CreateReviewRequest, UpdateReviewRequest, ReviewStatsResponse
+)
+from ..repositories.db_review_repo import ReviewRepo, stats_response
+from .spam_filter import SPAM_DETECTED, spam_filter
 
 
 class ReviewService:
     def __init__(self, db):
         self.review_repo = ReviewRepo(db)
+        self.spam_filter = spam_filter
 
-    def get_reviews_by_target(self, target_id: str, page: int = 1, page_size: int = 10):
-        return self.review_repo.get_reviews_by_target(target_id, page, page_size)
+    def get_reviews_by_target(self, target_id: str, page: int = 1, page_size: int = 10,
+                              sort: ReviewSort = ReviewSort.NEWEST):
+        return self.review_repo.get_reviews_by_target(target_id, page, page_size, sort)
 
     def create_review(self, user_id: UUID, request: CreateReviewRequest) -> Review:
-        existing_reviews = self.review_repo.get_reviews_by_user_and_target(user_id, request.target_id)
-        if existing_reviews:
-            raise ValueError("User already reviewed this movie")
-
+        # Повторный отзыв отсекает уникальный индекс, репозиторий отвечает ValueError
         review = Review(
             id=uuid4(),
             user_id=user_id,
@@ -26,7 +28,12 @@ class ReviewService:
             created_at=datetime.now(),
             updated_at=None
         )
-        return self.review_repo.create_review(review)
+        self._check_spam(review)
+        try:
+            return self.review_repo.create_review(review)
+        except Exception:
+            self.spam_filter.remove(review.target_id, review.id)
+            raise
 
     def update_review(self, review_id: UUID, user_id: UUID, request: UpdateReviewRequest) -> Review:
         review = self.review_repo.get_review_by_id(review_id)
@@ -40,8 +47,14 @@ class ReviewService:
         review.rating = request.rating
         review.text = request.text
         review.updated_at = datetime.now()
-
-        return self.review_repo.update_review(review)
+        # Правка текста проверяется так же, как новый отзыв
+        previous = self.spam_filter.entry(review.target_id, review.id)
+        self._check_spam(review)
+        try:
+            return self.review_repo.update_review(review)
+        except Exception:
+            self.spam_filter.restore(review.target_id, review.id, previous)
+            raise
 
     def delete_review(self, review_id: UUID, user_id: UUID) -> dict:
         review = self.review_repo.get_review_by_id(review_id)
@@ -53,7 +66,28 @@ class ReviewService:
         review.updated_at = datetime.now()
 
         self.review_repo.update_review(review)
+        self.spam_filter.remove(review.target_id, review.id)
         return {"status": "deleted"}
 
-    def get_review_stats(self, target_id: str) -> dict:
+    def _check_spam(self, review: Review):
+        # Отзыв попадает в индекс до записи в базу: одновременные копии увидят друг друга
+        if not self.spam_filter.enabled:
+            return
+        signature = self.spam_filter.signature(review.text)
+        duplicate = self.spam_filter.check_and_add(
+            review.target_id, review.id, review.updated_at or review.created_at, signature
+        )
+        if duplicate is not None:
+            SPAM_DETECTED.labels(mode=self.spam_filter.mode).inc()
+            if self.spam_filter.mode == "reject":
+                raise ValueError("Review is too similar to a recent review of this movie")
+        review.flagged = duplicate is not None
+
+    def get_review_stats(self, target_id: str) -> ReviewStatsResponse:
         return self.review_repo.get_review_stats(target_id)
+
+    def get_review_stats_batch(self, target_ids: list[str]) -> list[ReviewStatsResponse]:
+        # Порядок запроса сохраняется, фильмы без отзывов получают нулевую статистику
+        target_ids = list(dict.fromkeys(target_ids))
+        found = self.review_repo.get_review_stats_batch(target_ids)
+        return [found.get(target_id) or stats_response(target_id, None) for target_id in target_ids]
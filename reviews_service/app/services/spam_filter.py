@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable
+from uuid import UUID
+import numpy as np
+from prometheus_client import Counter
+from ..models.review import Review
+
+# reject - отклонять похожий отзыв, flag - сохранять с пометкой flagged, off - не проверять
+SPAM_FILTER_MODE = os.getenv("SPAM_FILTER_MODE", "reject")
+# Оценка сходства Жаккара по шинглам, начиная с которой отзыв считается копией
+SPAM_SIMILARITY = float(os.getenv("SPAM_SIMILARITY", "0.8"))
+# 128 хэш-функций = 16 полос по 8: пара с сходством 0.8 попадает в кандидаты с вероятностью ~95%
+SPAM_NUM_PERM = int(os.getenv("SPAM_NUM_PERM", "128"))
+SPAM_BANDS = int(os.getenv("SPAM_BANDS", "16"))
+SPAM_SHINGLE_SIZE = int(os.getenv("SPAM_SHINGLE_SIZE", "5"))
+# Короткие отзывы ("Отличный фильм!") совпадают и без всякой накрутки - их не проверяем
+SPAM_MIN_SHINGLES = int(os.getenv("SPAM_MIN_SHINGLES", "16"))
+# С чем сравнивать: отзывы фильма за последние часы, не больше заданного числа
+SPAM_WINDOW_HOURS = float(os.getenv("SPAM_WINDOW_HOURS", "24"))
+SPAM_MAX_PER_TARGET = int(os.getenv("SPAM_MAX_PER_TARGET", "5000"))
+
+SPAM_FILTER_MODES = ("reject", "flag", "off")
+if SPAM_FILTER_MODE not in SPAM_FILTER_MODES:
+    raise ValueError(f"Unknown spam filter mode {SPAM_FILTER_MODE}")
+
+SPAM_DETECTED = Counter(
+    "review_spam_detected_total",
+    "Reviews matched as near-duplicates of recent reviews",
+    ["mode"]
+)
+
+# Простое Мерсенна 2^31 - 1: a * x + b при x, a < 2^31 помещается в uint64
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SPAM_SHINGLE_SIZE) -> set[str]:
+    # Регистр, пунктуация и пробелы не влияют: "Ужас!!!" и "ужас" дают одни шинглы
+    normalized = " ".join(_WORD.findall(text.lower()))
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class _TargetIndex:
+    def __init__(self):
+        # id отзыва -> (created_at, сигнатура), в порядке добавления
+        self.entries: OrderedDict[UUID, tuple[datetime, np.ndarray]] = OrderedDict()
+        # (полоса, байты полосы) -> id отзывов
+        self.buckets: dict[tuple[int, bytes], set[UUID]] = {}
+
+
+# MinHash + LSH по отзывам каждого фильма. Сигнатура - минимумы 128 хэш-функций
+# по шинглам текста; доля совпавших позиций оценивает сходство Жаккара. Сигнатура
+# режется на полосы, и кандидатами становятся только отзывы с совпавшей полосой,
+# поэтому проверка не зависит от числа отзывов фильма. Индекс живёт в памяти
+# процесса и собирается из базы при старте.
+class SpamFilter:
+    def __init__(self, mode: str = SPAM_FILTER_MODE, similarity: float = SPAM_SIMILARITY,
+                 num_perm: int = SPAM_NUM_PERM, bands: int = SPAM_BANDS,
+                 shingle_size: int = SPAM_SHINGLE_SIZE, min_shingles: int = SPAM_MIN_SHINGLES,
+                 window: timedelta = timedelta(hours=SPAM_WINDOW_HOURS),
+                 max_per_target: int = SPAM_MAX_PER_TARGET, seed: int = 1):
+        if mode not in SPAM_FILTER_MODES:
+            raise ValueError(f"Unknown spam filter mode {mode}")
+        if num_perm % bands:
+            raise ValueError("SPAM_NUM_PERM must be divisible by SPAM_BANDS")
+        self.mode = mode
+        self.similarity = similarity
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._shingle_size = shingle_size
+        self._min_shingles = min_shingles
+        self.window = window
+        self._max_per_target = max_per_target
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._lock = threading.Lock()
+        self._targets: dict[str, _TargetIndex] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def signature(self, text: str) -> np.ndarray | None:
+        items = shingles(text, self._shingle_size)
+        if len(items) < self._min_shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(item.encode()) for item in items), dtype=np.uint64, count=len(items))
+        hashes %= _PRIME
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def check_and_add(self, target_id: str, review_id: UUID, created_at: datetime,
+                      signature: np.ndarray | None) -> UUID | None:
+        # Проверка и добавление под одной блокировкой: два одинаковых отзыва,
+        # пришедших одновременно, не пропустят друг друга. Возвращает id похожего отзыва.
+        # Копии в индекс не попадают: группу представляет первый отзыв, и при накрутке
+        # число кандидатов не растёт
+        if signature is None:
+            # Отредактированный отзыв стал слишком коротким - старая версия из индекса уходит
+            self.remove(target_id, review_id)
+            return None
+        with self._lock:
+            index = self._targets.setdefault(target_id, _TargetIndex())
+            self._evict(index, created_at)
+            duplicate = self._find(index, review_id, signature)
+            if duplicate is None:
+                self._add(index, review_id, created_at, signature)
+        return duplicate
+
+    def remove(self, target_id: str, review_id: UUID):
+        with self._lock:
+            index = self._targets.get(target_id)
+            if index is not None:
+                self._remove(index, review_id)
+                if not index.entries:
+                    del self._targets[target_id]
+
+    def entry(self, target_id: str, review_id: UUID) -> tuple[datetime, np.ndarray] | None:
+        with self._lock:
+            index = self._targets.get(target_id)
+            return index.entries.get(review_id) if index is not None else None
+
+    def restore(self, target_id: str, review_id: UUID, entry: tuple[datetime, np.ndarray] | None):
+        # Откат check_and_add: в индекс возвращается запись, снятая через entry()
+        if entry is None:
+            self.remove(target_id, review_id)
+            return
+        with self._lock:
+            self._add(self._targets.setdefault(target_id, _TargetIndex()), review_id, *entry)
+
+    def load(self, reviews: Iterable[Review]):
+        # Отзывы приходят по возрастанию created_at, окно отсчитывается от текущего времени
+        targets: dict[str, _TargetIndex] = {}
+        for review in reviews:
+            signature = self.signature(review.text)
+            if signature is not None:
+                index = targets.setdefault(review.target_id, _TargetIndex())
+                self._add(index, review.id, review.created_at, signature)
+                if len(index.entries) > self._max_per_target:
+                    self._remove(index, next(iter(index.entries)))
+        with self._lock:
+            self._targets = targets
+
+    def size(self, target_id: str) -> int:
+        index = self._targets.get(target_id)
+        return len(index.entries) if index is not None else 0
+
+    def _find(self, index: _TargetIndex, review_id: UUID, signature: np.ndarray) -> UUID | None:
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= index.buckets.get(key, set())
+        candidates.discard(review_id)
+        best, best_score = None, self.similarity
+        for candidate in candidates:
+            score = float(np.mean(index.entries[candidate][1] == signature))
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _add(self, index: _TargetIndex, review_id: UUID, created_at: datetime, signature: np.ndarray):
+        self._remove(index, review_id)
+        index.entries[review_id] = (created_at, signature)
+        for key in self._band_keys(signature):
+            index.buckets.setdefault(key, set()).add(review_id)
+
+    def _remove(self, index: _TargetIndex, review_id: UUID):
+        entry = index.entries.pop(review_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry[1]):
+            bucket = index.buckets[key]
+            bucket.discard(review_id)
+            if not bucket:
+                del index.buckets[key]
+
+    def _evict(self, index: _TargetIndex, now: datetime):
+        oldest = now - self.window
+        while index.entries:
+            review_id, (created_at, _) = next(iter(index.entries.items()))
+            if created_at >= oldest and len(index.entries) < self._max_per_target:
+                break
+            self._remove(index, review_id)
+
+    def _band_keys(self, signature: np.ndarray) -> list[tuple[int, bytes]]:
+        rows = self._rows
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self._bands)]
+
+
+spam_filter = SpamFilter()
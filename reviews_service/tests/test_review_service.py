@@ -1,9 +1,14 @@
 import pytest
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import Mock
 from ..app.services.review_service import ReviewService
-from ..app.models.review import Review, ReviewStatus, CreateReviewRequest, UpdateReviewRequest
+from ..app.repositories.db_review_repo import (
+    REVIEW_ORDER, ReviewRepo, dedupe_active_reviews, stats_changes, stats_response
+)
+from ..app.schemas.review import Review as DBReview
+from ..app.services.spam_filter import SpamFilter
+from ..app.models.review import Review, ReviewSort, ReviewStatus, CreateReviewRequest, UpdateReviewRequest
 
 # Мок сессии базы данных для конструктора сервиса
 @pytest.fixture
@@ -15,6 +20,8 @@ def mock_db():
 def review_service(mock_db):
     service = ReviewService(mock_db)
     service.review_repo = Mock()
+    # Фильтр спама проверяется отдельно, в остальных тестах он не мешает шаблонным текстам
+    service.spam_filter = SpamFilter(mode="off")
     return service
 
 @pytest.fixture
@@ -42,7 +49,6 @@ class TestReviewServiceUnit:
             text=sample_review.text
         )
 
-        review_service.review_repo.get_reviews_by_user_and_target.return_value = []
         review_service.review_repo.create_review.return_value = sample_review
 
         result = review_service.create_review(user_id, request)
@@ -56,7 +62,6 @@ class TestReviewServiceUnit:
         assert result.created_at is not None
         assert result.updated_at is None
 
-        review_service.review_repo.get_reviews_by_user_and_target.assert_called_once_with(user_id, sample_review.target_id)
         review_service.review_repo.create_review.assert_called_once()
 
     @pytest.mark.unit
@@ -69,14 +74,13 @@ class TestReviewServiceUnit:
             text=sample_review.text
         )
 
-        review_service.review_repo.get_reviews_by_user_and_target.return_value = [sample_review]
-        review_service.review_repo.create_review.reset_mock()
+        # Конфликт по уникальному индексу репозиторий превращает в ValueError
+        review_service.review_repo.create_review.side_effect = ValueError("User already reviewed this movie")
 
         with pytest.raises(ValueError, match="User already reviewed this movie"):
             review_service.create_review(user_id, request)
 
-        review_service.review_repo.get_reviews_by_user_and_target.assert_called_once()
-        review_service.review_repo.create_review.assert_not_called()
+        review_service.review_repo.create_review.assert_called_once()
 
     @pytest.mark.unit
     def test_create_review_different_ratings(self, review_service):
@@ -90,7 +94,6 @@ class TestReviewServiceUnit:
                 text=f"Review with rating {rating}"
             )
 
-            review_service.review_repo.get_reviews_by_user_and_target.return_value = []
             review_service.review_repo.create_review.side_effect = lambda r: Review(
                 id=uuid4(),
                 user_id=user_id,
@@ -211,3 +214,262 @@ class TestReviewServiceUnit:
 
         review_service.review_repo.get_review_by_id.assert_called_once()
         review_service.review_repo.update_review.assert_not_called()
+
+
+class TestReviewStats:
+
+    @pytest.mark.unit
+    def test_stats_changes_follow_review_lifecycle(self, sample_review):
+        """Создание, смена оценки и удаление меняют агрегат в нужных корзинах"""
+        rerated = sample_review.model_copy(update={"rating": 3})
+        deleted = rerated.model_copy(update={"status": ReviewStatus.DELETED})
+
+        assert stats_changes(None, sample_review) == [(8, 1)]
+        assert stats_changes(sample_review, rerated) == [(8, -1), (3, 1)]
+        assert stats_changes(rerated, deleted) == [(3, -1)]
+
+    @pytest.mark.unit
+    def test_stats_changes_ignore_text_edits_and_deleted_reviews(self, sample_review):
+        """Правка без смены оценки и изменения удалённых отзывов агрегат не трогают"""
+        edited = sample_review.model_copy(update={"text": "Changed my mind about the ending"})
+        deleted = sample_review.model_copy(update={"status": ReviewStatus.DELETED})
+
+        assert stats_changes(sample_review, edited) == []
+        assert stats_changes(deleted, deleted.model_copy(update={"rating": 2})) == []
+
+    @pytest.mark.unit
+    def test_stats_response_fills_distribution(self):
+        """Среднее считается из хранимой суммы, в распределении есть все оценки"""
+        row = Mock(total_reviews=3, rating_sum=22, **{f"rating_{r}": 0 for r in range(1, 11)})
+        row.rating_7 = 2
+        row.rating_8 = 1
+
+        stats = stats_response("movie_123", row)
+
+        assert stats.total_reviews == 3
+        assert stats.average_rating == 7.33
+        assert stats.rating_distribution == {**{r: 0 for r in range(1, 11)}, 7: 2, 8: 1}
+
+    @pytest.mark.unit
+    def test_stats_response_for_unknown_target_is_zero_filled(self):
+        """У фильма без отзывов строки агрегата ещё нет"""
+        stats = stats_response("movie_404", None)
+
+        assert stats.total_reviews == 0
+        assert stats.average_rating == 0.0
+        assert set(stats.rating_distribution) == set(range(1, 11))
+        assert sum(stats.rating_distribution.values()) == 0
+
+    @pytest.mark.unit
+    def test_stats_batch_keeps_order_and_zero_fills_unknown_targets(self, review_service):
+        """Один запрос в репозиторий на всю страницу, повторы схлопываются"""
+        known = stats_response("movie_1", Mock(total_reviews=1, rating_sum=9, **{f"rating_{r}": int(r == 9) for r in range(1, 11)}))
+        review_service.review_repo.get_review_stats_batch.return_value = {"movie_1": known}
+
+        stats = review_service.get_review_stats_batch(["movie_2", "movie_1", "movie_2"])
+
+        assert [item.target_id for item in stats] == ["movie_2", "movie_1"]
+        assert stats[0].total_reviews == 0 and sum(stats[0].rating_distribution.values()) == 0
+        assert stats[1].average_rating == 9.0
+        review_service.review_repo.get_review_stats_batch.assert_called_once_with(["movie_2", "movie_1"])
+
+
+    @pytest.mark.unit
+    def test_update_review_rereads_locked_row(self, sample_review):
+        """Чтение под блокировкой обновляет объект, уже загруженный в сессию"""
+        db = Mock()
+        locked = db.query.return_value.filter.return_value.with_for_update.return_value
+        locked.populate_existing.return_value.first.return_value = None
+
+        with pytest.raises(KeyError):
+            ReviewRepo(db).update_review(sample_review)
+
+        locked.populate_existing.assert_called_once()
+
+    @pytest.mark.unit
+    def test_update_does_not_revive_review_deleted_concurrently(self, sample_review):
+        """Правка, заблокировавшая уже удалённый отзыв, не возвращает его в агрегат"""
+        db = Mock()
+        locked = db.query.return_value.filter.return_value.with_for_update.return_value
+        locked.populate_existing.return_value.first.return_value = DBReview(
+            **{**sample_review.model_dump(), "status": ReviewStatus.DELETED}
+        )
+
+        with pytest.raises(KeyError):
+            ReviewRepo(db).update_review(sample_review)
+
+        db.execute.assert_not_called()
+        db.commit.assert_not_called()
+
+    @pytest.mark.unit
+    def test_dedupe_keeps_newest_active_review_and_recounts_stats(self):
+        """Лишние активные отзывы удаляются, агрегат пересчитывается только по их фильмам"""
+        from sqlalchemy.dialects import postgresql
+        conn = Mock()
+        conn.execute.return_value.scalars.return_value.all.return_value = ["movie_2", "movie_1", "movie_2"]
+
+        assert dedupe_active_reviews(conn) == ["movie_1", "movie_2"]
+
+        dedupe, recount = (
+            str(call.args[0].compile(dialect=postgresql.dialect())) for call in conn.execute.call_args_list
+        )
+        assert "row_number() OVER (PARTITION BY reviews.user_id, reviews.target_id" in dedupe
+        assert "ORDER BY reviews.created_at DESC, reviews.id DESC" in dedupe
+        assert recount.startswith("UPDATE review_stats SET")
+
+    @pytest.mark.unit
+    def test_dedupe_without_duplicates_leaves_stats_alone(self):
+        """Без дублей агрегат не трогается"""
+        conn = Mock()
+        conn.execute.return_value.scalars.return_value.all.return_value = []
+
+        assert dedupe_active_reviews(conn) == []
+        conn.execute.assert_called_once()
+
+    @pytest.mark.unit
+    def test_backfill_skips_locking_when_stats_exist(self):
+        """Перезапуск с заполненным агрегатом не блокирует таблицу"""
+        db = Mock()
+        db.query.return_value.limit.return_value.first.return_value = ("movie_1",)
+
+        assert ReviewRepo(db).backfill_stats() is False
+        db.execute.assert_not_called()
+
+
+class TestReviewListing:
+
+    @pytest.mark.unit
+    def test_get_reviews_passes_sort_to_repository(self, review_service, sample_review):
+        """Сортировка доходит до репозитория, по умолчанию сначала новые"""
+        review_service.review_repo.get_reviews_by_target.return_value = ([sample_review], 1, 1)
+
+        review_service.get_reviews_by_target("movie_123", 1, 10)
+        review_service.get_reviews_by_target("movie_123", 2, 5, ReviewSort.LOWEST)
+
+        calls = review_service.review_repo.get_reviews_by_target.call_args_list
+        assert calls[0].args == ("movie_123", 1, 10, ReviewSort.NEWEST)
+        assert calls[1].args == ("movie_123", 2, 5, ReviewSort.LOWEST)
+
+    @pytest.mark.unit
+    def test_every_sort_order_is_backed_by_partial_index(self):
+        """Каждый ORDER BY совпадает с индексом по target_id над активными отзывами"""
+        indexes = {
+            tuple(str(expr) for expr in index.expressions): index
+            for index in DBReview.__table__.indexes
+        }
+
+        for sort in ReviewSort:
+            key = ("reviews.target_id", *(str(expr) for expr in REVIEW_ORDER[sort]))
+            assert key in indexes, sort
+            assert not indexes[key].unique
+            assert "status" in str(indexes[key].dialect_options["postgresql"]["where"])
+
+
+BOMB_TEXT = "Worst movie of the decade, the plot makes no sense and the acting is terrible. Avoid it!"
+
+
+def _review(text, target_id="movie_123", created_at=None):
+    return Review(
+        id=uuid4(),
+        user_id=uuid4(),
+        target_id=target_id,
+        rating=1,
+        text=text,
+        status=ReviewStatus.ACTIVE,
+        created_at=created_at or datetime.now()
+    )
+
+
+class TestSpamFilter:
+
+    @pytest.mark.unit
+    def test_near_duplicate_is_found_and_different_text_is_not(self):
+        """Мелкие правки недавнего отзыва находятся, несвязанный текст - нет"""
+        spam = SpamFilter()
+        original = _review(BOMB_TEXT)
+        spam.load([original])
+        now = datetime.now()
+
+        tweaked = "worst movie of the decade!!! the plot makes no sense and the acting is terrible, avoid it"
+        other = "A slow but rewarding drama with a wonderful score and a great performance by the lead."
+
+        assert spam.check_and_add("movie_123", uuid4(), now, spam.signature(tweaked)) == original.id
+        assert spam.check_and_add("movie_123", uuid4(), now, spam.signature(other)) is None
+        assert spam.check_and_add("movie_456", uuid4(), now, spam.signature(BOMB_TEXT)) is None
+
+    @pytest.mark.unit
+    def test_short_texts_are_not_checked(self):
+        """Короткие шаблонные отзывы законно совпадают, фильтр их не проверяет"""
+        spam = SpamFilter()
+
+        assert spam.signature("Great movie!") is None
+        assert spam.check_and_add("movie_123", uuid4(), datetime.now(), None) is None
+
+    @pytest.mark.unit
+    def test_window_evicts_old_and_excess_reviews(self):
+        """В индексе остаются только недавние отзывы каждого фильма"""
+        spam = SpamFilter(window=timedelta(hours=1), max_per_target=2)
+        now = datetime.now()
+        old = _review(BOMB_TEXT, created_at=now - timedelta(hours=2))
+        spam.load([old])
+
+        assert spam.check_and_add("movie_123", uuid4(), now, spam.signature(BOMB_TEXT)) is None
+        for i in range(3):
+            spam.check_and_add("movie_123", uuid4(), now, spam.signature(f"{i} unrelated review number {i} " * 3))
+        assert spam.size("movie_123") == 2
+
+    @pytest.mark.unit
+    def test_create_review_rejects_near_duplicate(self, review_service):
+        """Режим reject отвечает ValueError, не обращаясь к базе"""
+        review_service.spam_filter = SpamFilter(mode="reject")
+        review_service.review_repo.create_review.side_effect = lambda review: review
+        review_service.create_review(uuid4(), CreateReviewRequest(target_id="movie_123", rating=1, text=BOMB_TEXT))
+
+        with pytest.raises(ValueError, match="too similar"):
+            review_service.create_review(
+                uuid4(), CreateReviewRequest(target_id="movie_123", rating=1, text=BOMB_TEXT.upper())
+            )
+
+        review_service.review_repo.create_review.assert_called_once()
+        assert review_service.spam_filter.size("movie_123") == 1
+
+    @pytest.mark.unit
+    def test_create_review_flags_near_duplicate(self, review_service):
+        """Режим flag сохраняет отзыв с flagged=True"""
+        review_service.spam_filter = SpamFilter(mode="flag")
+        review_service.review_repo.create_review.side_effect = lambda review: review
+        request = CreateReviewRequest(target_id="movie_123", rating=1, text=BOMB_TEXT)
+
+        first = review_service.create_review(uuid4(), request)
+        second = review_service.create_review(uuid4(), request)
+
+        assert first.flagged is False
+        assert second.flagged is True
+
+    @pytest.mark.unit
+    def test_failed_insert_is_removed_from_index(self, review_service):
+        """Отзыв, который база не приняла, не блокирует следующий"""
+        review_service.spam_filter = SpamFilter(mode="reject")
+        review_service.review_repo.create_review.side_effect = ValueError("User already reviewed this movie")
+        request = CreateReviewRequest(target_id="movie_123", rating=1, text=BOMB_TEXT)
+
+        with pytest.raises(ValueError, match="already reviewed"):
+            review_service.create_review(uuid4(), request)
+
+        assert review_service.spam_filter.size("movie_123") == 0
+
+    @pytest.mark.unit
+    def test_failed_update_restores_previous_text_in_index(self, review_service):
+        """Если база не приняла правку, в индексе остаётся старая сигнатура"""
+        spam = review_service.spam_filter = SpamFilter(mode="reject")
+        original = _review(BOMB_TEXT)
+        spam.load([original])
+        review_service.review_repo.get_review_by_id.return_value = original.model_copy()
+        review_service.review_repo.update_review.side_effect = RuntimeError("database is down")
+        edited = "A slow but rewarding drama with a wonderful score and a great performance by the lead."
+
+        with pytest.raises(RuntimeError):
+            review_service.update_review(original.id, original.user_id, UpdateReviewRequest(rating=5, text=edited))
+
+        assert spam.check_and_add("movie_123", uuid4(), datetime.now(), spam.signature(BOMB_TEXT)) == original.id
+        assert spam.check_and_add("movie_123", uuid4(), datetime.now(), spam.signature(edited)) is None